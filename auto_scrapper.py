@@ -18,10 +18,7 @@ STATS: cat /var/log/crispr_stats.json
 Author: Fazil Firdous
 """
 
-import mysql.connector
-import requests
 import time
-import hashlib
 import random
 import json
 import logging
@@ -29,11 +26,27 @@ import signal
 import sys
 import os
 import psutil
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple, Optional, Union
 import traceback
 from xml.etree import ElementTree as ET
 
+from biorxiv_harvester import BIORXIV_API, iter_biorxiv
+from db_pool import ConnectionPool, mysql_connect
+from gene_annotations import PRIORITY_GENES, open_gene_table, read_gene_list
+from guide_keys import guide_key
+from guide_pipeline import GuideSink, GuideWriter
+from http_cache import CachedSession
+from known_guides import KnownGuideFilter
+from metrics import Metrics, MetricsServer
+from off_target import open_engine
+from on_target import open_model
+from scheduler import Scheduler
+from storage import GuideStorage, open_storage
+
 # ==================== CONFIGURATION ====================
 ##### Update to your database if you want #####
 DB_CONFIG = {
@@ -47,15 +60,81 @@ DB_CONFIG = {
     'pool_size': 5
 }
 
+STORAGE_CONFIG = {
+    'backend': 'mysql',                 # 'mysql' or 'sqlite' (embedded local file)
+    'sqlite_path': 'crispr_guides.db',  # Database file for the sqlite backend
+    'key_scheme': 'md5',                # 'md5' (guide_hash) or 'packed' (guide_key BIGINT)
+    'known_guides_path': None,          # Local known-guide filter file (None = disabled)
+    'summary_tables': True,             # Maintain per-gene/source/cell-line summary tables on insert
+}
+
+DB_POOL_CONFIG = {
+    'pool_size': DB_CONFIG['pool_size'],  # Connections shared by cycle, writer and health checks
+    'acquire_timeout': 10,      # Seconds to wait for a free pooled connection
+    'pre_ping_after': 30,       # Ping a connection idle this long (seconds) before reuse
+    'idle_timeout': 600,        # Close connections idle longer than this (seconds)
+    'max_lifetime': 3600,       # Retire connections older than this (seconds)
+}
+
 SCRAPE_CONFIG = {
     'cycle_hours': 6,           # Run every 6 hours
+    'cycle_jitter_minutes': 5,  # Random 0..N minute delay per cycle (spreads load on the sources)
     'heartbeat_minutes': 15,    # Log heartbeat every 15 minutes
     'health_check_minutes': 30, # Database health check interval
+    'health_check_mode': 'light',   # 'light' (ping + estimates) or 'full' (COUNT(*) scans)
+    'schema_check_minutes': 360,    # How long a successful table-exists check is trusted
     'batch_size': 200,          # Insert batch size
-    'max_retries': 5,           # Max retries on error
-    'retry_delay': 300,         # 5 minutes between retries
+    'max_retries': 5,           # Max retries on error (DB connects, failed cycles)
+    'retry_delay': 300,         # 5 minutes between retries of a failed cycle
+    'resource_sample_seconds': 15,  # Background memory / CPU sampling interval
     'pubmed_batch': 100,        # PubMed papers per query
     'rate_limit_delay': 0.5,    # Delay between API calls (seconds)
+    'bulk_load': False,         # Stage + LOAD DATA LOCAL INFILE instead of executemany
+    'biorxiv_url': BIORXIV_API, # bioRxiv details API (point at a stub server for testing)
+    'biorxiv_prefetch': True,   # Fetch the next bioRxiv page while processing the current one
+    'state_file': '/var/lib/crispr_monitor/watermarks.json',  # Per-source high-water marks
+    'initial_lookback_days': 7, # Window for a source's first run
+    'queue_capacity': 2000,     # Guides buffered between scrapers and the DB writer thread
+    'efficiency_weights': None, # On-target model weights file (None = generated efficiencies)
+    'concurrent_sources': True, # Scrape all sources in parallel threads
+    'source_timeouts': {        # Per-source time budget in concurrent mode (seconds)
+        'PUBMED': 120,
+        'GITHUB': 60,
+        'ADDGENE': 30,
+        'BIORXIV': 90,
+        'BROAD': 30,
+    },
+}
+
+METRICS_CONFIG = {
+    'enabled': True,            # Serve Prometheus metrics at http://host:port/metrics
+    'host': '127.0.0.1',        # Local only; put a reverse proxy in front to expose it
+    'port': 9108,
+}
+
+GENE_CONFIG = {
+    'annotation_path': None,        # HGNC complete-set TSV or GTF (.gz ok); None = curated built-in genes
+    'biotypes': ['protein_coding'], # Gene types kept from the annotation
+    'cache_path': None,             # Parsed-table cache (None = '<annotation_path>.genes')
+    'priority_genes_path': None,    # Symbols to tag guides with, one per line (None = built-in cancer genes)
+}
+
+OFF_TARGET_CONFIG = {
+    'reference_fasta': None,    # Local FASTA to score off-targets against (None = generated scores)
+    'max_mismatches': 3,        # Mismatches searched per site
+    'workers': 1,               # Scoring processes (batches here are small)
+}
+
+HTTP_CACHE_CONFIG = {
+    'enabled': True,
+    'path': '/var/cache/crispr_monitor/http_cache.db',
+    'max_mb': 50,               # LRU eviction above this size
+    'default_ttl': 3600,        # Seconds before an entry is revalidated
+    'ttls': {                   # Per-source TTLs (seconds)
+        'PUBMED': 3600,
+        'GITHUB': 1800,
+        'BIORXIV': 6 * 3600,
+    },
 }
 
 # Logging setup
@@ -77,9 +156,9 @@ class CRISPRMonitor:
         self.cycle_count = 0
         self.total_guides_added = 0
         self.start_time = time.time()
-        self.last_heartbeat = time.time()
-        self.last_health_check = time.time()
-        self.last_cycle = time.time()
+        self.scheduler = Scheduler()
+        self.process = psutil.Process(os.getpid())
+        self.process.cpu_percent(None)  # Prime: later calls report usage since the previous one
         
         # Stats tracking
         self.stats = {
@@ -105,7 +184,51 @@ class CRISPRMonitor:
             'BROAD': {'enabled': True, 'last_check': None, 'guides_added': 0},
         }
         
-        # Gene priorities (for targeted scraping)
+        # Scraper per source (cycle order) and cooperative cancel flags
+        self.scrapers = {
+            'PUBMED': self._scrape_pubmed,
+            'GITHUB': self._scrape_github,
+            'ADDGENE': self._scrape_addgene,
+            'BIORXIV': self._scrape_biorxiv,
+            'BROAD': self._scrape_broad,
+        }
+        # Replaced every cycle; each scraper run keeps the event it started with
+        # (see _cancel_event), so a timed-out run stays cancelled
+        self.cancel_events = {source: threading.Event() for source in self.scrapers}
+        self._scrape_context = threading.local()
+        self.writer: Optional[GuideWriter] = None
+        self.stop_event = threading.Event()
+        
+        # (timestamp, guides added) per committed batch over the last 24h, for health checks
+        self.insert_log = deque()
+        self.schema_checked_at = 0.0
+        self.pool: Optional[ConnectionPool] = None
+        
+        # Per-stage duration histograms and counters (/metrics and crispr_stats.json)
+        self.metrics = Metrics()
+        self.metrics_server: Optional[MetricsServer] = None
+        
+        # Persisted high-water marks; pending ones advance only after their guides are committed
+        self.watermarks = self._load_watermarks()
+        self.pending_watermarks = {}
+        for source, mark in self.watermarks.items():
+            if source in self.sources and mark.get('last_check'):
+                self.sources[source]['last_check'] = datetime.fromisoformat(mark['last_check'])
+        
+        # Known-guide filter, kept across cycles and topped up on every connect
+        self.known_guides = None
+        if STORAGE_CONFIG['known_guides_path']:
+            self.known_guides = KnownGuideFilter(STORAGE_CONFIG['known_guides_path'])
+            self.known_guides.load()
+        
+        # Off-target engine and on-target model (scores are computed on the writer thread)
+        self.off_target = open_engine(OFF_TARGET_CONFIG['reference_fasta'],
+                                      OFF_TARGET_CONFIG['max_mismatches'],
+                                      OFF_TARGET_CONFIG['workers'])
+        self.efficiency_model = open_model(SCRAPE_CONFIG['efficiency_weights'])
+        
+        # Gene priorities (for targeted scraping), checked against the shared gene table
+        self.gene_table = open_gene_table(GENE_CONFIG)
         self.priority_genes = self._load_priority_genes()
         
         # Cell lines database
@@ -119,11 +242,24 @@ class CRISPRMonitor:
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
         
-        # HTTP session
-        self.session = requests.Session()
+        # HTTP session (with persistent conditional-request cache)
+        self.session = CachedSession(
+            HTTP_CACHE_CONFIG['path'] if HTTP_CACHE_CONFIG['enabled'] else None,
+            ttls=HTTP_CACHE_CONFIG['ttls'],
+            default_ttl=HTTP_CACHE_CONFIG['default_ttl'],
+            max_bytes=HTTP_CACHE_CONFIG['max_mb'] * 1024 * 1024
+        )
         self.session.headers.update({
             'User-Agent': 'ScienceCore-Bot/1.0 (fazilf@sciencecore.in)'
         })
+        self.session.metrics = self.metrics
+        
+        if METRICS_CONFIG['enabled']:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, METRICS_CONFIG['host'], METRICS_CONFIG['port'])
+                self.metrics_server.start()
+            except OSError as e:
+                logger.warning(f"Metrics endpoint disabled: {e}")
         
         logger.info("=" * 90)
         logger.info(" SCIENCECORE 24/7 CRISPR MONITOR INITIALIZED")
@@ -137,67 +273,167 @@ class CRISPRMonitor:
         """Handle shutdown signals"""
         logger.warning(f"Received signal {signum}, initiating graceful shutdown...")
         self.running = False
+        self.stop_event.set()
+        self.scheduler.stop()
+        for event in self.cancel_events.values():
+            event.set()
     
     def _load_priority_genes(self) -> List[str]:
-        """Load high-priority cancer genes"""
-        return [
-            'TP53', 'KRAS', 'EGFR', 'PIK3CA', 'BRAF', 'BRCA1', 'BRCA2', 'MYC', 'PTEN',
-            'ALK', 'RET', 'ROS1', 'MET', 'ERBB2', 'FGFR1', 'FGFR2', 'FGFR3', 'IDH1',
-            'IDH2', 'JAK2', 'KIT', 'PDGFRA', 'CDK4', 'CDK6', 'CDKN2A', 'CTNNB1',
-            'NOTCH1', 'RB1', 'STK11', 'VHL', 'ATM', 'ATR', 'CHEK1', 'CHEK2', 'MDM2',
-            'AKT1', 'HRAS', 'NRAS', 'APC', 'NF1', 'FBXW7', 'SMAD4', 'TSC1', 'TSC2',
-            'BAX', 'BCL2', 'ARID1A', 'POLE', 'MLH1', 'MSH2', 'PALB2', 'RAD51'
-        ]
+        """Load high-priority cancer genes (aliases mapped to approved symbols)"""
+        path = GENE_CONFIG['priority_genes_path']
+        requested = read_gene_list(path) if path else PRIORITY_GENES
+        genes = self.gene_table.resolve(requested)
+        unknown = [symbol for symbol in requested if self.gene_table.id(symbol) < 0]
+        if unknown:
+            logger.warning(f"{len(unknown)} priority genes not in {self.gene_table.source}, ignored: "
+                           f"{', '.join(unknown[:10])}")
+        if not genes:
+            logger.warning("No priority genes left, using the built-in list")
+            genes = list(PRIORITY_GENES)
+        logger.info(f"Priority genes: {len(genes)} of {len(self.gene_table):,} annotated genes")
+        return genes
+    
+    # ==================== WATERMARKS ====================
+    
+    def _load_watermarks(self) -> Dict:
+        """Load persisted per-source high-water marks"""
+        try:
+            with open(SCRAPE_CONFIG['state_file']) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Failed to load watermarks, starting fresh: {e}")
+            return {}
+    
+    def _set_watermark(self, source: str, mark: Dict):
+        """Stage a source's new watermark for this cycle (ignored once the source timed out)"""
+        cancel = self._cancel_event(source)
+        # A leftover run from an earlier cycle must not advance this cycle's watermark
+        if cancel is self.cancel_events[source] and not cancel.is_set():
+            self.pending_watermarks[source] = mark
+    
+    def _commit_watermarks(self):
+        """Advance watermarks for sources whose guides are committed, and persist them"""
+        if not self.pending_watermarks:
+            return
+        
+        now = datetime.now().isoformat()
+        for source, mark in self.pending_watermarks.items():
+            self.watermarks[source] = {**mark, 'last_check': now}
+        self.pending_watermarks = {}
+        
+        try:
+            path = SCRAPE_CONFIG['state_file']
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self.watermarks, f, indent=2)
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            logger.warning(f"Failed to save watermarks: {e}")
+    
+    def _window_start(self, source: str, field: str) -> str:
+        """Start date (YYYY-MM-DD) of a source's delta window"""
+        mark = self.watermarks.get(source, {}).get(field)
+        if mark:
+            return mark
+        lookback = timedelta(days=SCRAPE_CONFIG['initial_lookback_days'])
+        return (datetime.now() - lookback).strftime('%Y-%m-%d')
     
     # ==================== DATABASE ====================
     
-    def _connect_database(self) -> Optional[mysql.connector.MySQLConnection]:
-        """Connect to database with retry logic"""
-        for attempt in range(SCRAPE_CONFIG['max_retries']):
+    def _get_pool(self) -> Optional[ConnectionPool]:
+        """Shared MySQL connection pool (created on first use; None for sqlite)"""
+        if STORAGE_CONFIG['backend'] != 'mysql':
+            return None
+        if self.pool is None:
+            extra = {'allow_local_infile': True} if SCRAPE_CONFIG['bulk_load'] else {}
+            self.pool = ConnectionPool(
+                mysql_connect(DB_CONFIG, **extra),
+                size=DB_POOL_CONFIG['pool_size'],
+                acquire_timeout=DB_POOL_CONFIG['acquire_timeout'],
+                pre_ping_after=DB_POOL_CONFIG['pre_ping_after'],
+                idle_timeout=DB_POOL_CONFIG['idle_timeout'],
+                max_lifetime=DB_POOL_CONFIG['max_lifetime']
+            )
+        return self.pool
+    
+    def _connect_database(self, retries: Optional[int] = None) -> Optional[GuideStorage]:
+        """Check out a pooled database connection with retry logic"""
+        retries = retries or SCRAPE_CONFIG['max_retries']
+        for attempt in range(retries):
+            storage = None
             try:
-                conn = mysql.connector.connect(**DB_CONFIG)
+                storage = open_storage(STORAGE_CONFIG, DB_CONFIG, bulk_load=SCRAPE_CONFIG['bulk_load'],
+                                       pool=self._get_pool())
+                storage.metrics = self.metrics
                 logger.info(f"✅ Database connected (attempt {attempt + 1})")
-                return conn
-            except mysql.connector.Error as e:
+                if self.known_guides is not None:
+                    new_rows = self.known_guides.refresh(storage)
+                    storage.known_guides = self.known_guides
+                    logger.info(f" Known-guide filter: {len(self.known_guides):,} guides ({new_rows:,} new rows read)")
+                return storage
+            except Exception as e:
                 logger.error(f"❌ Database connection failed (attempt {attempt + 1}): {e}")
-                if attempt < SCRAPE_CONFIG['max_retries'] - 1:
-                    time.sleep(10 * (attempt + 1))  # Exponential backoff
+                if storage is not None:
+                    # Checked out but unusable (e.g. filter refresh failed): return it to the pool
+                    try:
+                        storage.close()
+                    except Exception:
+                        pass
+                if attempt < retries - 1:
+                    # Backoff that a shutdown signal interrupts
+                    if self.stop_event.wait(10 * (attempt + 1)):
+                        return None
                 else:
                     logger.critical("❌ Database connection failed after all retries!")
                     return None
         return None
     
-    def _health_check_database(self, conn) -> bool:
-        """Check database health"""
+    def _log_inserts(self, added: int):
+        """Record committed inserts in the rolling 24h insert log"""
+        now = time.time()
+        if added:
+            self.insert_log.append((now, added))
+        while self.insert_log and self.insert_log[0][0] < now - 86400:
+            self.insert_log.popleft()
+    
+    def _schema_ok(self, storage: GuideStorage) -> bool:
+        """Table-exists check, trusted for schema_check_minutes once it passes"""
+        if time.time() - self.schema_checked_at < SCRAPE_CONFIG['schema_check_minutes'] * 60:
+            return True
+        if not storage.has_table():
+            self.schema_checked_at = 0.0
+            return False
+        self.schema_checked_at = time.time()
+        return True
+    
+    def _health_check_database(self, storage: GuideStorage) -> bool:
+        """Check database health (light mode: ping, cached schema check, row estimate)"""
+        started = time.time()
         try:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Test connection
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            
-            # Check table exists
-            cursor.execute("SHOW TABLES LIKE 'crispr_guides_mega'")
-            if not cursor.fetchone():
-                logger.error("❌ Table 'crispr_guides_mega' does not exist!")
-                return False
-            
-            # Get table stats
-            cursor.execute("SELECT COUNT(*) as total FROM crispr_guides_mega")
-            total = cursor.fetchone()['total']
-            
-            # Get recent activity
-            cursor.execute("""
-                SELECT COUNT(*) as recent 
-                FROM crispr_guides_mega 
-                WHERE created_at >= NOW() - INTERVAL 24 HOUR
-            """)
-            recent = cursor.fetchone()['recent']
+            if SCRAPE_CONFIG['health_check_mode'] == 'full':
+                counts = storage.health_check()
+                if counts is None:
+                    logger.error("❌ Table 'crispr_guides_mega' does not exist!")
+                    return False
+                total, recent, approx = counts['total'], counts['recent'], ''
+            else:
+                storage.ping()
+                if not self._schema_ok(storage):
+                    logger.error("❌ Table 'crispr_guides_mega' does not exist!")
+                    return False
+                # 24h activity from this monitor's own insert log (resets on restart)
+                self._log_inserts(0)
+                total = storage.estimate_rows()
+                recent = sum(added for _, added in self.insert_log)
+                approx = '~'
             
+            probe_ms = (time.time() - started) * 1000
             self.stats['database_health'] = 'healthy'
-            logger.info(f" Database health check: OK (Total: {total:,}, Last 24h: {recent:,})")
-            
-            cursor.close()
+            self.stats['health_probe_ms'] = round(probe_ms, 1)
+            logger.info(f" Database health check: OK (Total: {approx}{total:,}, "
+                        f"Last 24h: {recent:,}, probe: {probe_ms:.0f} ms)")
             return True
             
         except Exception as e:
@@ -205,44 +441,27 @@ class CRISPRMonitor:
             self.stats['database_health'] = 'unhealthy'
             return False
     
-    def _generate_guide_hash(self, sequence: str) -> str:
-        """Generate unique hash for guide"""
-        return hashlib.md5(sequence.encode()).hexdigest()[:32]
+    def _generate_guide_hash(self, sequence: str) -> Union[int, str]:
+        """Generate unique key for guide (MD5 hex or packed BIGINT, per key_scheme)"""
+        started = time.perf_counter()
+        key = guide_key(sequence, STORAGE_CONFIG['key_scheme'])
+        self.metrics.observe('guide_key_seconds', time.perf_counter() - started)
+        return key
     
-    def _insert_guides_batch(self, cursor, guides: List[Dict]) -> Tuple[int, int]:
+    def _insert_guides_batch(self, storage: GuideStorage, guides: List[Dict]) -> Tuple[int, int]:
         """Batch insert guides"""
         if not guides:
             return 0, 0
         
-        sql = """
-            INSERT IGNORE INTO crispr_guides_mega 
-            (guide_hash, guide_sequence, gene_symbol, efficiency, gc_content, 
-             off_target_score, validation_status, source_database, paper_title, 
-             publication_date, cell_line, created_at, updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-        """
-        
-        values = []
-        for guide in guides:
-            values.append((
-                self._generate_guide_hash(guide['sequence']),
-                guide['sequence'],
-                guide['gene'],
-                guide['efficiency'],
-                guide['gc_content'],
-                guide['off_target'],
-                guide['validation'],
-                guide['source'],
-                guide.get('paper_title'),
-                guide.get('pub_date'),
-                guide.get('cell_line')
-            ))
-        
         try:
-            cursor.executemany(sql, values)
-            added = cursor.rowcount
-            duplicates = len(guides) - added
-            return added, duplicates
+            with self.metrics.time('insert_batch_seconds'):
+                if self.efficiency_model is not None:
+                    self.efficiency_model.score_into(guides)
+                if self.off_target is not None:
+                    self.off_target.score_into(guides)
+                added, dups = storage.insert_guides(guides)
+            self._log_inserts(added)
+            return added, dups
         except Exception as e:
             logger.error(f"❌ Batch insert error: {e}")
             return 0, len(guides)
@@ -251,6 +470,7 @@ class CRISPRMonitor:
     
     def _generate_quality_guide(self, gene: str, source: str) -> Dict:
         """Generate high-quality CRISPR guide"""
+        started = time.perf_counter()
         bases = ['A', 'T', 'C', 'G']
         
         # Start with GG (SpCas9)
@@ -304,7 +524,7 @@ class CRISPRMonitor:
         # Cell line
         cell_line = random.choice(self.cell_lines) if random.random() > 0.3 else None
         
-        return {
+        guide = {
             'sequence': sequence,
             'gene': gene,
             'efficiency': efficiency,
@@ -316,19 +536,34 @@ class CRISPRMonitor:
             'pub_date': pub_date,
             'cell_line': cell_line
         }
+        self.metrics.observe('guide_generation_seconds', time.perf_counter() - started)
+        return guide
     
     # ==================== SOURCE SCRAPERS ====================
     
+    def _rate_limit_wait(self, source: str, response=None, cancel: Optional[threading.Event] = None):
+        """Rate-limit pause that returns early when the source is cancelled"""
+        if getattr(response, 'from_cache', False):
+            return  # Served locally, no request made
+        (cancel or self._cancel_event(source)).wait(SCRAPE_CONFIG['rate_limit_delay'])
+    
     def _scrape_pubmed(self) -> List[Dict]:
         """Scrape PubMed for new CRISPR papers"""
         logger.info("📄 Scraping PubMed for new CRISPR papers...")
-        guides = []
+        guides = self._guide_sink('PUBMED')
         
         try:
             # Query PubMed for recent CRISPR papers
             base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
             
-            # Search for papers from last 7 days
+            # Delta window: from the last window end (inclusive, day granularity) to today.
+            # Papers already counted on the boundary day are skipped by PMID.
+            start_date = self._window_start('PUBMED', 'window_end')
+            end_date = datetime.now().strftime('%Y-%m-%d')
+            seen_ids = set(self.watermarks.get('PUBMED', {}).get('boundary_ids', []))
+            window_ids = set()
+            complete = True
+            
             query_terms = [
                 "CRISPR guide RNA",
                 "CRISPR knockout",
@@ -337,36 +572,60 @@ class CRISPRMonitor:
             ]
             
             for query in query_terms:
+                if self._cancel_event('PUBMED').is_set():
+                    break
+                
                 params = {
                     'db': 'pubmed',
                     'term': query,
-                    'retmax': 20,
-                    'reldate': 7,  # Last 7 days
-                    'sort': 'relevance'
+                    'retmax': SCRAPE_CONFIG['pubmed_batch'],
+                    'datetype': 'edat',
+                    'mindate': start_date.replace('-', '/'),
+                    'maxdate': end_date.replace('-', '/'),
+                    'sort': 'pub_date'
                 }
                 
                 try:
-                    response = self.session.get(base_url, params=params, timeout=15)
-                    time.sleep(SCRAPE_CONFIG['rate_limit_delay'])
+                    response = self.session.get(base_url, params=params, timeout=15, source='PUBMED')
+                    self._rate_limit_wait('PUBMED', response)
                     
-                    if response.status_code == 200:
-                        # Parse XML
-                        root = ET.fromstring(response.content)
-                        count = root.find('.//Count')
-                        if count is not None and int(count.text) > 0:
-                            logger.info(f"  Found {count.text} papers for '{query}'")
-                            
-                            # Generate guides for priority genes
-                            num_guides = min(int(count.text) * 3, 50)
-                            for _ in range(num_guides):
-                                gene = random.choice(self.priority_genes)
-                                guide = self._generate_quality_guide(gene, 'PUBMED_NEW')
-                                guides.append(guide)
+                    if response.status_code != 200:
+                        complete = False
+                        continue
+                    
+                    # Parse XML
+                    root = ET.fromstring(response.content)
+                    count = root.find('.//Count')
+                    ids = [node.text for node in root.findall('.//IdList/Id')]
+                    window_ids.update(ids)
+                    
+                    # New papers: unseen PMIDs plus any beyond retmax
+                    new_papers = len([pmid for pmid in ids if pmid not in seen_ids])
+                    if count is not None:
+                        new_papers += max(0, int(count.text) - len(ids))
+                    
+                    if new_papers > 0:
+                        logger.info(f"  Found {new_papers} new papers for '{query}' ({start_date} to {end_date})")
+                        
+                        # Generate guides for priority genes
+                        num_guides = min(new_papers * 3, 50)
+                        for _ in range(num_guides):
+                            gene = random.choice(self.priority_genes)
+                            guide = self._generate_quality_guide(gene, 'PUBMED_NEW')
+                            guides.append(guide)
                 
                 except Exception as e:
                     logger.warning(f"  PubMed query failed for '{query}': {e}")
+                    complete = False
                     continue
             
+            if complete:
+                self._set_watermark('PUBMED', {
+                    'window_end': end_date,
+                    # PMIDs seen this window; the next window re-reads end_date
+                    'boundary_ids': sorted(window_ids | seen_ids if start_date == end_date else window_ids)
+                })
+            
             logger.info(f"  ✅ PubMed: Generated {len(guides)} guides")
             self.sources['PUBMED']['last_check'] = datetime.now()
             
@@ -378,20 +637,22 @@ class CRISPRMonitor:
     def _scrape_github(self) -> List[Dict]:
         """Check GitHub for new CRISPR datasets"""
         logger.info(" Checking GitHub for new CRISPR datasets...")
-        guides = []
+        guides = self._guide_sink('GITHUB')
         
         try:
-            # Search GitHub API for recent CRISPR repos
+            # Search GitHub API for CRISPR repos pushed since the last run
             api_url = "https://api.github.com/search/repositories"
+            pushed_since = self.watermarks.get('GITHUB', {}).get('pushed_since', '2024-01-01')
+            run_started = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
             params = {
-                'q': 'CRISPR guide RNA pushed:>2024-01-01',
+                'q': f'CRISPR guide RNA pushed:>{pushed_since}',
                 'sort': 'updated',
                 'order': 'desc',
                 'per_page': 10
             }
             
-            response = self.session.get(api_url, params=params, timeout=15)
-            time.sleep(SCRAPE_CONFIG['rate_limit_delay'])
+            response = self.session.get(api_url, params=params, timeout=15, source='GITHUB')
+            self._rate_limit_wait('GITHUB', response)
             
             if response.status_code == 200:
                 data = response.json()
@@ -403,6 +664,8 @@ class CRISPRMonitor:
                     gene = random.choice(self.priority_genes)
                     guide = self._generate_quality_guide(gene, 'GITHUB_DATASET')
                     guides.append(guide)
+                
+                self._set_watermark('GITHUB', {'pushed_since': run_started})
             
             logger.info(f"  ✅ GitHub: Generated {len(guides)} guides")
             self.sources['GITHUB']['last_check'] = datetime.now()
@@ -415,7 +678,7 @@ class CRISPRMonitor:
     def _scrape_addgene(self) -> List[Dict]:
         """Check Addgene for new plasmids"""
         logger.info(" Checking Addgene for new CRISPR plasmids...")
-        guides = []
+        guides = self._guide_sink('ADDGENE')
         
         try:
             # Simulate checking Addgene (they don't have public API)
@@ -439,34 +702,52 @@ class CRISPRMonitor:
     def _scrape_biorxiv(self) -> List[Dict]:
         """Check bioRxiv for preprints"""
         logger.info("📰 Checking bioRxiv for CRISPR preprints...")
-        guides = []
+        guides = self._guide_sink('BIORXIV')
         
         try:
-            # bioRxiv API for recent CRISPR papers
-            base_url = "https://api.biorxiv.org/details/biorxiv"
-            
-            # Get papers from last 7 days
-            start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+            # Delta window from the last seen posting date (inclusive); DOIs already
+            # seen on that boundary date are skipped
+            start_date = self._window_start('BIORXIV', 'last_date')
             end_date = datetime.now().strftime('%Y-%m-%d')
+            seen_dois = set(self.watermarks.get('BIORXIV', {}).get('boundary_dois', []))
             
-            url = f"{base_url}/{start_date}/{end_date}/0/100"
+            # Stream every page of the window through the CRISPR filter
+            harvest = {}
+            crispr_papers = 0
+            last_date = start_date
+            boundary = set(seen_dois)
             
-            response = self.session.get(url, timeout=15)
-            time.sleep(SCRAPE_CONFIG['rate_limit_delay'])
-            
-            if response.status_code == 200:
-                data = response.json()
-                papers = data.get('collection', [])
+            # Prefetched pages are fetched on another thread: hand it this run's event
+            cancel = self._cancel_event('BIORXIV')
+            for paper in iter_biorxiv(self.session, start_date, end_date,
+                                      base_url=SCRAPE_CONFIG['biorxiv_url'],
+                                      prefetch=SCRAPE_CONFIG['biorxiv_prefetch'],
+                                      wait=lambda response: self._rate_limit_wait('BIORXIV', response, cancel),
+                                      cancel=cancel,
+                                      stats=harvest):
+                # Track the latest posting date seen, remembering that date's DOIs
+                date, doi = paper.get('date'), paper.get('doi')
+                if date and date > last_date:
+                    last_date, boundary = date, set()
+                if date == last_date and doi:
+                    boundary.add(doi)
                 
-                # Filter for CRISPR papers
-                crispr_papers = [p for p in papers if 'CRISPR' in p.get('title', '').upper()]
-                logger.info(f"  Found {len(crispr_papers)} CRISPR preprints")
+                if 'CRISPR' not in paper.get('title', '').upper() or doi in seen_dois:
+                    continue
                 
-                for _ in range(len(crispr_papers) * 5):
+                crispr_papers += 1
+                for _ in range(5):
                     gene = random.choice(self.priority_genes)
                     guide = self._generate_quality_guide(gene, 'BIORXIV_PREPRINT')
                     guides.append(guide)
             
+            logger.info(f"  Found {crispr_papers} new CRISPR preprints in {harvest['records']:,} of "
+                        f"{harvest['total']:,} records, {harvest['pages']} pages ({start_date} to {end_date})")
+            
+            # Only a fully read window advances the watermark
+            if harvest['records'] >= harvest['total']:
+                self._set_watermark('BIORXIV', {'last_date': last_date, 'boundary_dois': sorted(boundary)})
+            
             logger.info(f"  ✅ bioRxiv: Generated {len(guides)} guides")
             self.sources['BIORXIV']['last_check'] = datetime.now()
             
@@ -478,7 +759,7 @@ class CRISPRMonitor:
     def _scrape_broad(self) -> List[Dict]:
         """Check Broad Institute updates"""
         logger.info(" Checking Broad Institute for library updates...")
-        guides = []
+        guides = self._guide_sink('BROAD')
         
         try:
             # Simulate checking Broad GPP portal
@@ -503,6 +784,110 @@ class CRISPRMonitor:
     
     # ==================== CYCLE MANAGEMENT ====================
     
+    def _record_source(self, source: str, duration: float, guides: int, status: str):
+        """Record per-source timing in stats['by_source']"""
+        entry = self.stats['by_source'].setdefault(source, {
+            'runs': 0,
+            'timeouts': 0,
+            'errors': 0,
+            'guides': 0,
+            'total_duration_s': 0.0,
+            'last_duration_s': 0.0,
+            'last_status': None
+        })
+        entry['runs'] += 1
+        entry['guides'] += guides
+        entry['total_duration_s'] = round(entry['total_duration_s'] + duration, 2)
+        entry['last_duration_s'] = round(duration, 2)
+        entry['last_status'] = status
+        self.metrics.observe('scraper_seconds', duration, source=source, status=status)
+        self.metrics.inc('scraper_guides_total', guides, source=source)
+        if status == 'timeout':
+            entry['timeouts'] += 1
+        elif status == 'error':
+            entry['errors'] += 1
+    
+    def _cancel_event(self, source: str) -> threading.Event:
+        """Cancel event of the scraper run on this thread (the current cycle's outside a run)"""
+        cancel = getattr(self._scrape_context, 'cancel', None)
+        return cancel if cancel is not None else self.cancel_events[source]
+    
+    def _run_source(self, source: str, cancel: threading.Event) -> List[Dict]:
+        """Run one scraper and record its timing"""
+        started = time.time()
+        self._scrape_context.cancel = cancel
+        try:
+            guides = self.scrapers[source]()
+        finally:
+            self._scrape_context.cancel = None
+        # A source that already timed out was recorded by the cycle; drop its late result
+        if not cancel.is_set():
+            self._record_source(source, time.time() - started, len(guides), 'ok')
+        return guides
+    
+    def _collect_concurrently(self, sources: List[str]) -> Dict[str, List[Dict]]:
+        """Run sources in parallel threads, each under its own timeout"""
+        results = {}
+        started = time.time()
+        pool = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='scraper')
+        futures = {source: pool.submit(self._run_source, source, self.cancel_events[source])
+                   for source in sources}
+        
+        try:
+            for source, future in futures.items():
+                timeout = SCRAPE_CONFIG['source_timeouts'].get(source, 60)
+                remaining = max(0.0, started + timeout - time.time())
+                try:
+                    results[source] = future.result(timeout=remaining)
+                except FutureTimeout:
+                    # Threads cannot be killed: cancel cooperatively and move on
+                    self.cancel_events[source].set()
+                    future.cancel()
+                    logger.warning(f"⏱  {source} timed out after {timeout}s, continuing without it")
+                    self._record_source(source, time.time() - started, 0, 'timeout')
+                except Exception as e:
+                    logger.error(f"❌ {source} scraper crashed: {e}")
+                    self._record_source(source, time.time() - started, 0, 'error')
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        return results
+    
+    def _guide_sink(self, source: str) -> Union[GuideSink, List[Dict]]:
+        """Where a scraper puts its guides: the cycle's writer queue, or a plain list"""
+        if self.writer is None:
+            return []
+        return GuideSink(self.writer, self._cancel_event(source))
+    
+    def _collect_guides(self) -> int:
+        """Stream guides from every enabled source into the writer; returns guides collected"""
+        sources = [source for source in self.scrapers if self.sources[source]['enabled']]
+        if not sources:
+            return 0
+        
+        # Fresh events: clearing the old ones would revive runs abandoned last cycle
+        self.cancel_events = {**self.cancel_events, **{source: threading.Event() for source in sources}}
+        if not self.running:
+            for source in sources:
+                self.cancel_events[source].set()
+        self.pending_watermarks = {}
+        
+        if SCRAPE_CONFIG['concurrent_sources']:
+            results = self._collect_concurrently(sources)
+        else:
+            results = {source: self._run_source(source, self.cancel_events[source]) for source in sources}
+        
+        # Sources that timed out or crashed keep their old watermark
+        self.pending_watermarks = {source: mark for source, mark in self.pending_watermarks.items()
+                                   if source in results}
+        
+        collected = 0
+        for source in sources:
+            guides = len(results.get(source, []))
+            collected += guides
+            self.sources[source]['guides_added'] += guides
+        return collected
+    
     def _run_scrape_cycle(self) -> bool:
         """Execute one complete scraping cycle"""
         cycle_start = time.time()
@@ -523,91 +908,72 @@ class CRISPRMonitor:
                 self.stats['failed_cycles'] += 1
                 return False
             
-            cursor = db.cursor(dictionary=True)
-            
-            # Collect guides from all sources
-            all_guides = []
-            
-            # PubMed
-            if self.sources['PUBMED']['enabled']:
-                pubmed_guides = self._scrape_pubmed()
-                all_guides.extend(pubmed_guides)
-                self.sources['PUBMED']['guides_added'] += len(pubmed_guides)
-            
-            # GitHub
-            if self.sources['GITHUB']['enabled']:
-                github_guides = self._scrape_github()
-                all_guides.extend(github_guides)
-                self.sources['GITHUB']['guides_added'] += len(github_guides)
-            
-            # Addgene
-            if self.sources['ADDGENE']['enabled']:
-                addgene_guides = self._scrape_addgene()
-                all_guides.extend(addgene_guides)
-                self.sources['ADDGENE']['guides_added'] += len(addgene_guides)
-            
-            # bioRxiv
-            if self.sources['BIORXIV']['enabled']:
-                biorxiv_guides = self._scrape_biorxiv()
-                all_guides.extend(biorxiv_guides)
-                self.sources['BIORXIV']['guides_added'] += len(biorxiv_guides)
-            
-            # Broad
-            if self.sources['BROAD']['enabled']:
-                broad_guides = self._scrape_broad()
-                all_guides.extend(broad_guides)
-                self.sources['BROAD']['guides_added'] += len(broad_guides)
-            
-            logger.info(f"\n Total guides collected: {len(all_guides)}")
-            
-            # Insert in batches
-            total_added = 0
-            total_dups = 0
-            
-            for i in range(0, len(all_guides), SCRAPE_CONFIG['batch_size']):
-                batch = all_guides[i:i + SCRAPE_CONFIG['batch_size']]
-                added, dups = self._insert_guides_batch(cursor, batch)
+            # The pooled connection goes back even when the cycle fails part-way
+            try:
+                # Stream guides from all sources through the background writer
+                self.writer = GuideWriter(
+                    lambda batch: self._insert_guides_batch(db, batch),
+                    batch_size=SCRAPE_CONFIG['batch_size'],
+                    capacity=SCRAPE_CONFIG['queue_capacity']
+                )
+                self.writer.start()
+                try:
+                    collected = self._collect_guides()
+                finally:
+                    total_added, total_dups = self.writer.close()
+                    batches = self.writer.batches
+                    self.writer = None
+                
+                logger.info(f"\n Total guides collected: {collected} ({batches} batches written during collection)")
+                
+                # Merge anything staged by the bulk loader
+                added, dups = db.flush()
+                self._log_inserts(added)
                 total_added += added
                 total_dups += dups
-                db.commit()
-            
-            # Update stats
-            self.total_guides_added += total_added
-            self.stats['total_guides_added'] += total_added
-            self.stats['total_duplicates'] += total_dups
-            self.stats['successful_cycles'] += 1
-            
-            # Get database stats
-            cursor.execute("SELECT COUNT(*) as total FROM crispr_guides_mega")
-            db_total = cursor.fetchone()['total']
-            
-            cursor.execute("""
-                SELECT COUNT(DISTINCT gene_symbol) as genes 
-                FROM crispr_guides_mega 
-                WHERE gene_symbol != 'UNKNOWN'
-            """)
-            gene_count = cursor.fetchone()['genes']
-            
-            # Log results
-            duration = time.time() - cycle_start
-            logger.info(f"\n CYCLE #{self.cycle_count} RESULTS:")
-            logger.info(f"    Added: {total_added:,} new guides")
-            logger.info(f"     Duplicates: {total_dups:,}")
-            logger.info(f"     Database total: {db_total:,}")
-            logger.info(f"     Unique genes: {gene_count:,}")
-            logger.info(f"     Duration: {duration:.1f}s")
-            logger.info(f"     All-time total: {self.total_guides_added:,}")
-            logger.info("=" * 90)
+                
+                # Only advance watermarks once everything collected is committed
+                if db.write_errors:
+                    logger.warning(f"  {db.write_errors} batch write(s) failed, keeping previous watermarks")
+                    self.pending_watermarks = {}
+                else:
+                    self._commit_watermarks()
+                
+                # Update stats
+                self.total_guides_added += total_added
+                self.stats['total_guides_added'] += total_added
+                self.stats['total_duplicates'] += total_dups
+                self.stats['successful_cycles'] += 1
+                
+                # Get database stats
+                db_stats = db.table_stats()
+                db_total = db_stats['total']
+                gene_count = db_stats['genes']
+                
+                # Log results
+                duration = time.time() - cycle_start
+                logger.info(f"\n CYCLE #{self.cycle_count} RESULTS:")
+                logger.info(f"    Added: {total_added:,} new guides")
+                logger.info(f"     Duplicates: {total_dups:,}")
+                logger.info(f"     Database total: {db_total:,}")
+                logger.info(f"     Unique genes: {gene_count:,}")
+                logger.info(f"     Duration: {duration:.1f}s")
+                logger.info(f"     All-time total: {self.total_guides_added:,}")
+                logger.info("=" * 90)
+            finally:
+                db.close()
             
-            cursor.close()
-            db.close()
+            if self.known_guides is not None:
+                self.known_guides.save()
             
             # Save stats
+            self.metrics.observe('cycle_seconds', duration, result='ok')
             self._save_stats()
             
             return True
             
         except Exception as e:
+            self.metrics.observe('cycle_seconds', time.time() - cycle_start, result='failed')
             logger.error(f"❌ CYCLE #{self.cycle_count} FAILED!")
             logger.error(f"Error: {e}")
             logger.error(traceback.format_exc())
@@ -615,34 +981,42 @@ class CRISPRMonitor:
             self.stats['last_error'] = str(e)
             return False
     
+    def _sample_resources(self):
+        """Record memory and CPU usage (non-blocking: CPU is averaged since the last sample)"""
+        mem_usage = self.process.memory_info().rss / 1024 / 1024  # MB
+        cpu_usage = self.process.cpu_percent(None)
+        
+        self.stats['memory_usage_mb'] = round(mem_usage, 1)
+        self.stats['cpu_usage_percent'] = round(cpu_usage, 1)
+        self.metrics.set('process_resident_memory_mb', round(mem_usage, 1))
+        self.metrics.set('process_cpu_percent', round(cpu_usage, 1))
+    
     def _heartbeat(self):
         """Log heartbeat to show scraper is alive"""
         uptime = time.time() - self.start_time
         hours = int(uptime // 3600)
         minutes = int((uptime % 3600) // 60)
         
-        # Get system resources
-        process = psutil.Process(os.getpid())
-        mem_usage = process.memory_info().rss / 1024 / 1024  # MB
-        cpu_usage = process.cpu_percent(interval=1)
-        
-        self.stats['memory_usage_mb'] = round(mem_usage, 1)
-        self.stats['cpu_usage_percent'] = round(cpu_usage, 1)
-        
+        # Latest background resource sample
+        cycle = self.scheduler.jobs.get('cycle')
+        state = ' (cycle running)' if cycle is not None and cycle.running else ''
         logger.info(f"💓 Heartbeat - Uptime: {hours}h {minutes}m | "
-                   f"Cycles: {self.cycle_count} | "
+                   f"Cycles: {self.cycle_count}{state} | "
                    f"Total Added: {self.total_guides_added:,} | "
-                   f"Mem: {mem_usage:.1f}MB | "
-                   f"CPU: {cpu_usage:.1f}%")
+                   f"Mem: {self.stats['memory_usage_mb']:.1f}MB | "
+                   f"CPU: {self.stats['cpu_usage_percent']:.1f}%")
     
     def _health_check(self):
         """Perform comprehensive health check"""
         logger.info(" Performing health check...")
         
-        db = self._connect_database()
+        # One attempt: a pooled connection or a quick failure, never a long retry loop
+        db = self._connect_database(retries=1)
         if db:
-            self._health_check_database(db)
-            db.close()
+            try:
+                self._health_check_database(db)
+            finally:
+                db.close()
         else:
             logger.error("❌ Health check failed: Cannot connect to database")
             self.stats['database_health'] = 'unreachable'
@@ -652,6 +1026,11 @@ class CRISPRMonitor:
         try:
             self.stats['uptime_seconds'] = int(time.time() - self.start_time)
             self.stats['last_update'] = datetime.now().isoformat()
+            self.stats['http_cache'] = self.session.cache_stats()
+            self.stats['metrics'] = self.metrics.snapshot()
+            self.stats['schedule'] = self.scheduler.stats()
+            if self.pool is not None:
+                self.stats['db_pool'] = self.pool.pool_stats()
             
             with open('/var/log/crispr_stats.json', 'w') as f:
                 json.dump(self.stats, f, indent=2)
@@ -661,50 +1040,26 @@ class CRISPRMonitor:
     # ==================== MAIN LOOP ====================
     
     def run_continuously(self):
-        """Main 24/7 loop"""
-        cycle_interval = SCRAPE_CONFIG['cycle_hours'] * 3600
-        heartbeat_interval = SCRAPE_CONFIG['heartbeat_minutes'] * 60
-        health_interval = SCRAPE_CONFIG['health_check_minutes'] * 60
+        """Main 24/7 loop: sleeps until the next due job, each job on its own thread"""
+        self.scheduler.add('cycle', self._run_scrape_cycle,
+                           interval=SCRAPE_CONFIG['cycle_hours'] * 3600,
+                           delay=0,  # Run initial cycle immediately
+                           jitter=SCRAPE_CONFIG['cycle_jitter_minutes'] * 60,
+                           retry_interval=SCRAPE_CONFIG['retry_delay'],
+                           max_retries=SCRAPE_CONFIG['max_retries'])
+        self.scheduler.add('heartbeat', self._heartbeat, interval=SCRAPE_CONFIG['heartbeat_minutes'] * 60)
+        self.scheduler.add('health_check', self._health_check, interval=SCRAPE_CONFIG['health_check_minutes'] * 60)
+        self.scheduler.add('resources', self._sample_resources,
+                           interval=SCRAPE_CONFIG['resource_sample_seconds'], delay=0)
         
         logger.info(" Starting continuous monitoring loop...")
         
-        # Run initial cycle immediately
-        self._run_scrape_cycle()
-        self.last_cycle = time.time()
-        
-        while self.running:
-            try:
-                current_time = time.time()
-                
-                # Heartbeat
-                if current_time - self.last_heartbeat >= heartbeat_interval:
-                    self._heartbeat()
-                    self.last_heartbeat = current_time
-                
-                # Health check
-                if current_time - self.last_health_check >= health_interval:
-                    self._health_check()
-                    self.last_health_check = current_time
-                
-                # Scrape cycle
-                if current_time - self.last_cycle >= cycle_interval:
-                    success = self._run_scrape_cycle()
-                    self.last_cycle = current_time
-                    
-                    if not success:
-                        logger.warning(f"Cycle failed, waiting {SCRAPE_CONFIG['retry_delay']}s before continuing...")
-                        time.sleep(SCRAPE_CONFIG['retry_delay'])
-                
-                # Sleep briefly
-                time.sleep(1)
-                
-            except KeyboardInterrupt:
-                logger.info("Keyboard interrupt received")
-                self.running = False
-            except Exception as e:
-                logger.error(f"Unexpected error in main loop: {e}")
-                logger.error(traceback.format_exc())
-                time.sleep(60)  # Wait 1 minute before continuing
+        try:
+            self.scheduler.run()
+        except KeyboardInterrupt:
+            logger.info("Keyboard interrupt received")
+            self._signal_handler(signal.SIGINT, None)
+            self.scheduler.join()
         
         # Shutdown
         self._shutdown()
@@ -729,6 +1084,13 @@ class CRISPRMonitor:
         # Save final stats
         self._save_stats()
         
+        if self.pool is not None:
+            self.pool.close()
+        if self.off_target is not None:
+            self.off_target.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        
         logger.info("=" * 90)
         logger.info("✅ Shutdown complete")
         logger.info("=" * 90)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE BENCHMARKS
+Micro-benchmarks for the importer's and monitor's hot paths:
+- generate_library_guide / generate_library_block (importer generation)
+- _generate_quality_guide / _generate_guide_hash (monitor generation, keys)
+- insert_guides_batch / _insert_guides_batch (batch inserts)
+
+Every benchmark runs at each batch size for a few timed rounds after a
+warm-up round and reports the median as guides/sec (generation, hashing)
+or rows/sec (inserts). Inserts go to a throwaway SQLite file by default,
+or to a local MySQL stand-in with --backend mysql (DB_CONFIG of
+onetime_scrapper.py). Insert rows are generated before the clock starts.
+
+    python benchmarks.py --out bench.json
+    python benchmarks.py --baseline bench.json --tolerance 0.15
+
+Results are JSON; with --baseline, any benchmark slower than the baseline
+by more than the tolerance is reported and the exit status is 1.
+tests/test_benchmarks.py runs every case once through run_one under
+pytest, so a broken hot path fails the test suite without timing it.
+
+Author: Fazil Firdous
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+GENES = ['TP53', 'KRAS', 'EGFR', 'BRCA1', 'MYC', 'PTEN', 'BRAF', 'PIK3CA', 'CDKN2A', 'ATM']
+
+# name -> (unit, runner factory); a runner takes a batch size and returns a timed callable
+BENCHMARKS: Dict[str, Tuple[str, Callable]] = {}
+
+
+def benchmark(name: str, unit: str):
+    """Register a benchmark factory under a name"""
+    def register(factory):
+        BENCHMARKS[name] = (unit, factory)
+        return factory
+    return register
+
+
+class Context:
+    """Importer, monitor and storage objects shared by all benchmarks"""
+
+    def __init__(self, backend: str, key_scheme: str, workdir: str):
+        import auto_scrapper
+        import onetime_scrapper
+
+        storage_config = {
+            **onetime_scrapper.STORAGE_CONFIG,
+            'backend': backend,
+            'sqlite_path': os.path.join(workdir, 'bench.db'),
+            'key_scheme': key_scheme,
+            'known_guides_path': None,
+        }
+        auto_scrapper.STORAGE_CONFIG.update(key_scheme=key_scheme)
+        auto_scrapper.HTTP_CACHE_CONFIG['enabled'] = False
+        auto_scrapper.METRICS_CONFIG['enabled'] = False
+        auto_scrapper.SCRAPE_CONFIG['state_file'] = os.path.join(workdir, 'watermarks.json')
+
+        self.importer = onetime_scrapper.LibraryImporter(seed=0, verbose=False, storage_config=storage_config)
+        self.library = self.importer.libraries['BRUNELLO']
+        self.monitor = auto_scrapper.CRISPRMonitor()
+        self.storage = self.importer.storage
+        self.rng = np.random.default_rng(0)
+
+    def fresh_guides(self, count: int) -> List[Dict]:
+        """Guides not inserted before (new random sequences every call)"""
+        genes = [GENES[i % len(GENES)] for i in range(-(-count // self.library['guides_per_gene']))]
+        block = self.importer.generate_library_block(genes, self.library, self.rng)
+        return self.importer.block_to_guides(block, self.library)[:count]
+
+    def close(self):
+        self.storage.close()
+
+
+@benchmark('importer.generate_library_guide', 'guides')
+def _library_guide(ctx: Context, size: int):
+    def run():
+        for i in range(size):
+            ctx.importer.generate_library_guide(GENES[i % len(GENES)], ctx.library)
+    return run
+
+
+@benchmark('importer.generate_library_block', 'guides')
+def _library_block(ctx: Context, size: int):
+    genes = [GENES[i % len(GENES)] for i in range(-(-size // ctx.library['guides_per_gene']))]
+    return lambda: ctx.importer.block_to_guides(
+        ctx.importer.generate_library_block(genes, ctx.library, ctx.rng), ctx.library)
+
+
+@benchmark('monitor._generate_quality_guide', 'guides')
+def _quality_guide(ctx: Context, size: int):
+    def run():
+        for i in range(size):
+            ctx.monitor._generate_quality_guide(GENES[i % len(GENES)], 'BENCH')
+    return run
+
+
+@benchmark('monitor._generate_guide_hash', 'guides')
+def _guide_hash(ctx: Context, size: int):
+    sequences = [guide['sequence'] for guide in ctx.fresh_guides(size)]
+
+    def run():
+        for sequence in sequences:
+            ctx.monitor._generate_guide_hash(sequence)
+    return run
+
+
+@benchmark('importer.insert_guides_batch', 'rows')
+def _importer_insert(ctx: Context, size: int):
+    return lambda guides: ctx.importer.insert_guides_batch(guides)
+
+
+@benchmark('monitor._insert_guides_batch', 'rows')
+def _monitor_insert(ctx: Context, size: int):
+    return lambda guides: ctx.monitor._insert_guides_batch(ctx.storage, guides)
+
+
+def run_one(ctx: Context, name: str, size: int, rounds: int) -> Dict:
+    """Median of `rounds` timed runs (after one warm-up) for one benchmark and batch size"""
+    unit, factory = BENCHMARKS[name]
+    runner = factory(ctx, size)
+    inserts = unit == 'rows'
+
+    durations = []
+    for round_number in range(rounds + 1):
+        random.seed(round_number)
+        guides = ctx.fresh_guides(size) if inserts else None
+        started = time.perf_counter()
+        if inserts:
+            runner(guides)
+        else:
+            runner()
+        elapsed = time.perf_counter() - started
+        if round_number:  # round 0 warms caches and prepared statements
+            durations.append(elapsed)
+
+    median = statistics.median(durations)
+    return {
+        'name': name,
+        'batch_size': size,
+        'unit': unit,
+        'rounds': rounds,
+        'median_s': round(median, 6),
+        'best_s': round(min(durations), 6),
+        'per_sec': round(size / median, 1) if median else None,
+    }
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[Dict]:
+    """Benchmarks slower than the baseline by more than tolerance (fraction of per_sec)"""
+    previous = {(r['name'], r['batch_size']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result['name'], result['batch_size']))
+        if not before or not before.get('per_sec') or not result['per_sec']:
+            continue
+        ratio = result['per_sec'] / before['per_sec']
+        result['baseline_per_sec'] = before['per_sec']
+        result['ratio'] = round(ratio, 3)
+        if ratio < 1 - tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def run_suite(backend: str = 'sqlite', key_scheme: str = 'md5', batch_sizes=(100, 500, 2000),
+              rounds: int = 5, only: Optional[List[str]] = None) -> Dict:
+    """Run every (selected) benchmark at every batch size; returns the JSON report"""
+    names = [name for name in BENCHMARKS if not only or any(part in name for part in only)]
+    with tempfile.TemporaryDirectory(prefix='crispr_bench_') as workdir:
+        ctx = Context(backend, key_scheme, workdir)
+        try:
+            results = [run_one(ctx, name, size, rounds) for name in names for size in batch_sizes]
+        finally:
+            ctx.close()
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'backend': backend,
+            'key_scheme': key_scheme,
+            'rounds': rounds,
+        },
+        'results': results,
+    }
+
+
+def _print_table(results: List[Dict]):
+    print(f"{'benchmark':36} {'batch':>6} {'median ms':>10} {'per sec':>12} {'vs base':>8}", file=sys.stderr)
+    for r in results:
+        ratio = f"{r['ratio']:.2f}x" if 'ratio' in r else '-'
+        print(f"{r['name']:36} {r['batch_size']:>6} {r['median_s'] * 1000:>10.2f} "
+              f"{r['per_sec']:>12,.0f} {ratio:>8}", file=sys.stderr)
+
+
+def main():
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for guide generation, keys and inserts')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], default='sqlite',
+                        help='insert target (sqlite: throwaway file; mysql: DB_CONFIG stand-in)')
+    parser.add_argument('--key-scheme', choices=['md5', 'packed'], default='md5')
+    parser.add_argument('--batch-sizes', default='100,500,2000', help='comma-separated batch sizes')
+    parser.add_argument('--rounds', type=int, default=5, help='timed rounds per benchmark (median reported)')
+    parser.add_argument('--only', action='append', help='run benchmarks whose name contains this (repeatable)')
+    parser.add_argument('--out', metavar='JSON', help='write results here')
+    parser.add_argument('--baseline', metavar='JSON', help='compare against an earlier --out file')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed throughput drop vs the baseline (fraction)')
+    parser.add_argument('--list', action='store_true', help='list benchmarks and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (unit, _) in BENCHMARKS.items():
+            print(f"{name} ({unit}/sec)")
+        return 0
+
+    report = run_suite(args.backend, args.key_scheme,
+                       [int(size) for size in args.batch_sizes.split(',')], args.rounds, args.only)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report['results'], json.load(f), args.tolerance)
+        report['regressions'] = [(r['name'], r['batch_size'], r['ratio']) for r in regressions]
+
+    _print_table(report['results'])
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    for r in regressions:
+        print(f"❌ Regression: {r['name']} @ {r['batch_size']}: {r['per_sec']:,.0f}/s "
+              f"vs {r['baseline_per_sec']:,.0f}/s baseline ({r['ratio']:.2f}x)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE BIORXIV HARVESTER
+Cursor-driven streaming reader for the bioRxiv details API
+(/details/biorxiv/{start}/{end}/{cursor}):
+- Walks every page of the window using messages[0].total / count
+- Yields records one at a time, so memory stays bounded by two pages
+- Prefetches the next page in a background thread while the current
+  one is being processed
+- The base URL is a parameter, so it can run against a local stub server
+
+Author: Fazil Firdous
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional
+
+BIORXIV_API = 'https://api.biorxiv.org/details/biorxiv'
+PAGE_SIZE = 100  # Records per page served by the details API
+
+
+class HarvestError(RuntimeError):
+    """A page could not be fetched; the window was only partly read"""
+
+
+def _page_info(data: Dict, cursor: int) -> Dict:
+    """Cursor, count and total from a page's messages block"""
+    messages = data.get('messages') or [{}]
+    message = messages[0]
+    if message.get('status') not in (None, 'ok'):
+        raise HarvestError(f"bioRxiv error at cursor {cursor}: {message.get('status')}")
+    collection = data.get('collection') or []
+    return {
+        'cursor': int(message.get('cursor', cursor)),
+        'count': int(message.get('count', len(collection))),
+        'total': int(message.get('total', 0))
+    }
+
+
+def iter_biorxiv(session, start_date: str, end_date: str, base_url: str = BIORXIV_API,
+                 timeout: int = 15, prefetch: bool = True,
+                 wait: Optional[Callable] = None,
+                 cancel: Optional[threading.Event] = None,
+                 stats: Optional[Dict] = None) -> Iterator[Dict]:
+    """Yield every bioRxiv record posted between start_date and end_date (YYYY-MM-DD)
+
+    wait(response) is called after each page request (rate limiting).
+    Stops early, without error, once cancel is set; raises HarvestError
+    if a page fails, so callers know the window was not fully read.
+    stats, if given, receives pages / records / total counts.
+    """
+    def fetch(cursor: int) -> Dict:
+        try:
+            response = session.get(f"{base_url.rstrip('/')}/{start_date}/{end_date}/{cursor}",
+                                   timeout=timeout, source='BIORXIV')
+        except Exception as e:
+            raise HarvestError(f"bioRxiv request failed at cursor {cursor}: {e}") from e
+        if wait is not None:
+            wait(response)
+        if response.status_code != 200:
+            raise HarvestError(f"bioRxiv returned HTTP {response.status_code} at cursor {cursor}")
+        return response.json()
+
+    stats = stats if stats is not None else {}
+    stats.update(pages=0, records=0, total=0)
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='biorxiv') if prefetch else None
+
+    try:
+        cursor = 0
+        data = fetch(cursor)
+        while True:
+            info = _page_info(data, cursor)
+            collection = data.get('collection') or []
+            stats['pages'] += 1
+            stats['total'] = info['total']
+
+            next_cursor = info['cursor'] + (info['count'] or len(collection))
+            more = bool(collection) and next_cursor < info['total']
+
+            # Request the next page before handing this one out
+            pending = pool.submit(fetch, next_cursor) if more and pool else None
+
+            for record in collection:
+                if cancel is not None and cancel.is_set():
+                    return
+                stats['records'] += 1
+                yield record
+
+            if not more or (cancel is not None and cancel.is_set()):
+                return
+
+            cursor = next_cursor
+            data = pending.result() if pending else fetch(cursor)
+    finally:
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
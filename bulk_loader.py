@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE BULK LOADER
+Staged bulk ingestion for crispr_guides_mega:
+- Streams guides into a local TSV staging file
+- LOAD DATA LOCAL INFILE into a temporary staging table
+- Merges with one set-based INSERT IGNORE ... SELECT
+- Reports exact added / duplicate counts
+
+Needs 'allow_local_infile': True on the client connection
+and local_infile=ON on the MySQL server.
+
+Author: Fazil Firdous
+"""
+
+import os
+import logging
+import tempfile
+from typing import Dict, List, Tuple, Union
+
+from guide_keys import KEY_COLUMNS, batch_keys
+from guide_stats import SUMMARY_TABLES, merge_sql
+
+STAGE_TABLE = 'crispr_guides_stage'
+FIRST_TABLE = 'crispr_guides_stage_first'
+SKIP_CHUNK = 1000  # Stage ids per DELETE when trimming rows the merge did not add
+
+DATA_COLUMNS = (
+    'guide_sequence', 'gene_symbol', 'efficiency', 'gc_content',
+    'off_target_score', 'validation_status', 'source_database', 'paper_title',
+    'publication_date', 'cell_line', 'locus'
+)
+
+# Key scheme whose column is also written when a table has both key columns
+OTHER_SCHEME = {'md5': 'packed', 'packed': 'md5'}
+
+STAGE_DDL = f"""
+    CREATE TEMPORARY TABLE IF NOT EXISTS {STAGE_TABLE} (
+        stage_id INT AUTO_INCREMENT PRIMARY KEY,
+        guide_hash VARCHAR(32),
+        guide_key BIGINT,
+        guide_sequence VARCHAR(25),
+        gene_symbol VARCHAR(50),
+        efficiency DECIMAL(5,2),
+        gc_content DECIMAL(5,2),
+        off_target_score DECIMAL(5,2),
+        validation_status VARCHAR(20),
+        source_database VARCHAR(100),
+        paper_title VARCHAR(255),
+        publication_date DATE,
+        cell_line VARCHAR(50),
+        locus VARCHAR(100)
+    )
+"""
+
+# MySQL cannot open a temporary table twice in one statement, so the first
+# staged row of each key is collected in a second temporary table
+FIRST_DDL = f"CREATE TEMPORARY TABLE IF NOT EXISTS {FIRST_TABLE} (stage_id INT PRIMARY KEY)"
+
+logger = logging.getLogger(__name__)
+
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def guide_columns(key_scheme: str, both_keys: bool = False) -> Tuple[str, ...]:
+    """Insert column order for a key scheme: key column first, then DATA_COLUMNS
+
+    both_keys appends the other scheme's key column, so writers on either
+    scheme hit the same unique index once a table has both.
+    """
+    columns = (KEY_COLUMNS[key_scheme],) + DATA_COLUMNS
+    if both_keys:
+        columns += (KEY_COLUMNS[OTHER_SCHEME[key_scheme]],)
+    return columns
+
+
+def guide_row(guide: Dict, key: Union[int, str]) -> Tuple:
+    """Build a guide_columns()-ordered row from a guide dict and its key"""
+    return (
+        key,
+        guide['sequence'],
+        guide['gene'],
+        guide['efficiency'],
+        guide['gc_content'],
+        guide['off_target'],
+        guide['validation'],
+        guide['source'],
+        guide.get('paper_title'),
+        guide.get('pub_date'),
+        guide.get('cell_line'),
+        guide.get('locus')
+    )
+
+
+def guide_rows(guides: List[Dict], key_scheme: str, both_keys: bool = False) -> List[Tuple]:
+    """guide_columns()-ordered rows for a batch, keys computed in one vectorized pass per scheme"""
+    sequences = [guide['sequence'] for guide in guides]
+    keys = batch_keys(sequences, key_scheme)
+    if not both_keys:
+        return [guide_row(guide, key) for guide, key in zip(guides, keys)]
+    others = batch_keys(sequences, OTHER_SCHEME[key_scheme])
+    return [guide_row(guide, key) + (other,) for guide, key, other in zip(guides, keys, others)]
+
+
+def _tsv_field(value) -> str:
+    """Format one value for LOAD DATA (\\N is NULL)"""
+    if value is None:
+        return '\\N'
+    return str(value).translate(_TSV_ESCAPES)
+
+
+class BulkLoader:
+    """Stage guides in a TSV file and merge them into crispr_guides_mega in one pass"""
+
+    def __init__(self, conn, key_scheme: str = 'md5', max_rows: int = 100000, summaries: bool = False,
+                 both_keys: bool = False):
+        self.conn = conn
+        self.key_scheme = key_scheme
+        self.both_keys = both_keys
+        self.summaries = summaries
+        self.max_rows = max_rows
+        self.staged_rows = 0
+        self.stage_file = None
+        self.stage_path = None
+        self.last_error = None
+        self.flushes = 0
+
+    def _open_stage_file(self):
+        fd, self.stage_path = tempfile.mkstemp(prefix='crispr_stage_', suffix='.tsv')
+        self.stage_file = os.fdopen(fd, 'w', encoding='utf-8', newline='\n')
+        self.staged_rows = 0
+
+    def add(self, guides: List[Dict]) -> Tuple[int, int]:
+        """Stream guides into the staging file; merges automatically every max_rows"""
+        if self.stage_file is None:
+            self._open_stage_file()
+
+        write = self.stage_file.write
+        for row in guide_rows(guides, self.key_scheme, self.both_keys):
+            write('\t'.join(map(_tsv_field, row)) + '\n')
+        self.staged_rows += len(guides)
+
+        if self.staged_rows >= self.max_rows:
+            return self.flush()
+        return 0, 0
+
+    def flush(self) -> Tuple[int, int]:
+        """LOAD DATA the staging file and merge it; returns (added, duplicates)"""
+        if self.stage_file is None:
+            return 0, 0
+
+        path = self.stage_path
+        expected = self.staged_rows
+        self.stage_file.close()
+        self.stage_file = None
+        self.last_error = None
+        self.flushes += 1
+
+        try:
+            if expected == 0:
+                return 0, 0
+
+            columns = ', '.join(guide_columns(self.key_scheme, self.both_keys))
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute(STAGE_DDL)
+                cursor.execute(f"DELETE FROM {STAGE_TABLE}")
+
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {STAGE_TABLE} "
+                    f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                    f"LINES TERMINATED BY '\\n' ({columns})",
+                    (path,)
+                )
+                staged = cursor.rowcount
+                if staged != expected:
+                    raise RuntimeError(f"LOAD DATA staged {staged} of {expected} rows")
+
+                if self.summaries:
+                    unique, existing = self._prepare_summaries(cursor)
+
+                cursor.execute(
+                    f"INSERT IGNORE INTO crispr_guides_mega ({columns}, created_at, updated_at) "
+                    f"SELECT {columns}, NOW(), NOW() FROM {STAGE_TABLE}"
+                )
+                added = cursor.rowcount
+                if self.summaries:
+                    self._fold_summaries(cursor, existing, added < unique - len(existing))
+                cursor.execute(f"DELETE FROM {STAGE_TABLE}")
+                self.conn.commit()
+            except Exception as e:
+                logger.error(f"❌ Bulk load error: {e}")
+                self.last_error = e
+                self.conn.rollback()
+                return 0, expected
+            finally:
+                cursor.close()
+
+            return added, staged - added
+        finally:
+            os.unlink(path)
+
+    def _prepare_summaries(self, cursor) -> Tuple[int, List[int]]:
+        """Keep the first staged row per key; returns (rows left, stage ids of keys already stored)
+
+        The stored-key check is a plain consistent read: DML joins would
+        read the live table, not the transaction snapshot _fold_summaries
+        compares against.
+        """
+        key = KEY_COLUMNS[self.key_scheme]
+        cursor.execute(FIRST_DDL)
+        cursor.execute(f"DELETE FROM {FIRST_TABLE}")
+        cursor.execute(f"INSERT INTO {FIRST_TABLE} SELECT MIN(stage_id) FROM {STAGE_TABLE} GROUP BY {key}")
+        unique = cursor.rowcount
+        cursor.execute(
+            f"DELETE s FROM {STAGE_TABLE} s LEFT JOIN {FIRST_TABLE} f ON f.stage_id = s.stage_id "
+            f"WHERE f.stage_id IS NULL"
+        )
+        cursor.execute(f"SELECT s.stage_id FROM {STAGE_TABLE} s JOIN crispr_guides_mega m ON m.{key} = s.{key}")
+        return unique, [row[0] for row in cursor.fetchall()]
+
+    def _fold_summaries(self, cursor, existing: List[int], raced: bool):
+        """Trim the stage to the rows the merge inserted and fold them into the summary tables
+
+        raced: the merge added fewer rows than the check predicted, so
+        another writer committed some keys meanwhile, or a row hit the
+        other scheme's key index. Those keys are visible neither in the
+        snapshot nor through our insert.
+        """
+        key = KEY_COLUMNS[self.key_scheme]
+        skipped = list(existing)
+        if raced:
+            cursor.execute(
+                f"SELECT s.stage_id FROM {STAGE_TABLE} s LEFT JOIN crispr_guides_mega m ON m.{key} = s.{key} "
+                f"WHERE m.{key} IS NULL"
+            )
+            skipped += [row[0] for row in cursor.fetchall()]
+        for start in range(0, len(skipped), SKIP_CHUNK):
+            chunk = skipped[start:start + SKIP_CHUNK]
+            cursor.execute(f"DELETE FROM {STAGE_TABLE} WHERE stage_id IN ({', '.join(['%s'] * len(chunk))})",
+                           chunk)
+
+        for table in SUMMARY_TABLES:
+            cursor.execute(merge_sql(table, STAGE_TABLE))
+
+    def close(self):
+        """Drop any unmerged staging file"""
+        if self.stage_file is not None:
+            path = self.stage_path
+            self.stage_file.close()
+            self.stage_file = None
+            os.unlink(path)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE CONNECTION POOL
+Long-lived MySQL connections for the 24/7 monitor, shared by the scrape
+cycle, its background writer and the health checks:
+- Up to pool_size connections; acquire() blocks up to acquire_timeout
+  for a free slot instead of opening (and handshaking) a new connection
+- Connections idle longer than pre_ping_after are pinged before reuse
+- Idle connections are evicted after idle_timeout, and every connection
+  is retired after max_lifetime (server wait_timeout, failovers)
+- Counters for crispr_stats.json
+
+mysql.connector.pooling's pool has no blocking acquire, validation,
+idle eviction or lifetime, so this pool manages plain connections.
+
+Author: Fazil Firdous
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+POOL_ARGS = ('pool_name', 'pool_size', 'pool_reset_session')
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(RuntimeError):
+    """No connection became free within the acquire timeout"""
+
+
+def mysql_connect(db_config: Dict, **extra) -> Callable[[], Any]:
+    """Connection factory for mysql.connector (pool arguments stripped)"""
+    import mysql.connector
+
+    config = {key: value for key, value in db_config.items() if key not in POOL_ARGS}
+    config.update(extra)
+    return lambda: mysql.connector.connect(**config)
+
+
+class ConnectionPool:
+    """Bounded pool of validated, age-limited database connections"""
+
+    def __init__(self, connect: Callable[[], Any], size: int = 5, acquire_timeout: float = 10.0,
+                 pre_ping_after: float = 30.0, idle_timeout: float = 600.0, max_lifetime: float = 3600.0):
+        self.connect = connect
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.pre_ping_after = pre_ping_after
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle: List[Tuple[Any, float, float]] = []  # (conn, created, last_used), most recent last
+        self._created: Dict[int, float] = {}             # in-use connection -> created
+        self.closed = False
+        self.counters = {'created': 0, 'reused': 0, 'pings': 0, 'ping_failures': 0,
+                         'evicted': 0, 'timeouts': 0}
+
+    def acquire(self, timeout: float = None):
+        """Check out a live connection; raises PoolTimeout if none frees up in time"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self.counters['timeouts'] += 1
+            raise PoolTimeout(f"no database connection free after {timeout}s ({self.size} in use)")
+
+        try:
+            conn, created = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._created[id(conn)] = created
+        return conn
+
+    def _checkout(self) -> Tuple[Any, float]:
+        self.prune()
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                conn = self.connect()
+                with self._lock:
+                    self.counters['created'] += 1
+                return conn, time.time()
+
+            conn, created, last_used = entry
+            if time.time() - last_used >= self.pre_ping_after and not self._ping(conn):
+                self._discard(conn)
+                continue
+            with self._lock:
+                self.counters['reused'] += 1
+            return conn, created
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection; discard=True closes it (e.g. after an error)"""
+        now = time.time()
+        with self._lock:
+            created = self._created.pop(id(conn), now)
+        if discard or self.closed or now - created >= self.max_lifetime:
+            self._discard(conn)
+        else:
+            with self._lock:
+                self._idle.append((conn, created, now))
+        self._slots.release()
+
+    def prune(self) -> int:
+        """Close idle connections past idle_timeout or max_lifetime; returns how many"""
+        now = time.time()
+        with self._lock:
+            expired = [entry for entry in self._idle
+                       if now - entry[2] >= self.idle_timeout or now - entry[1] >= self.max_lifetime]
+            self._idle = [entry for entry in self._idle if entry not in expired]
+            self.counters['evicted'] += len(expired)
+        for conn, _, _ in expired:
+            self._close(conn)
+        return len(expired)
+
+    def _ping(self, conn) -> bool:
+        with self._lock:
+            self.counters['pings'] += 1
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.info(f"Dropping stale pooled connection: {e}")
+            with self._lock:
+                self.counters['ping_failures'] += 1
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self.counters['evicted'] += 1
+        self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def pool_stats(self) -> Dict:
+        """Counters and current occupancy"""
+        with self._lock:
+            return {**self.counters, 'size': self.size,
+                    'in_use': len(self._created), 'idle': len(self._idle)}
+
+    def close(self):
+        """Close every idle connection (in-use ones are closed on release)"""
+        with self._lock:
+            self.closed = True
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._close(conn)
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE GENE ANNOTATIONS
+Genome-scale gene table shared by the library importer and the monitor,
+loaded from a local annotation file instead of hand-typed gene lists:
+
+- HGNC complete-set TSV (hgnc_complete_set.txt) or Ensembl / GENCODE GTF,
+  optionally gzipped, parsed one line at a time (a GTF only has its
+  'gene' records split, so a full GENCODE file never sits in memory)
+- Symbols are interned into a sorted id table; chromosome, start, end,
+  strand and gene type are compact NumPy columns indexed by gene id, and
+  HGNC alias / previous symbols resolve to the approved symbol
+- The parsed table is cached in a '<annotation>.genes' binary sidecar
+  (rebuilt when the annotation file or the gene type filter changes),
+  so later starts read one small file instead of re-parsing
+- Without an annotation file the curated built-in gene list is used
+
+    python gene_annotations.py hgnc_complete_set.txt
+    python gene_annotations.py gencode.v44.annotation.gtf.gz --biotype protein_coding --biotype lncRNA
+
+Author: Fazil Firdous
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import struct
+import hashlib
+import argparse
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b'CRGGENE\x01'
+VERSION = 1
+ALIGN = 64
+_PREAMBLE = struct.Struct('<8sIIQ')
+
+DEFAULT_BIOTYPES = ('protein_coding',)
+
+# HGNC locus groups -> GTF-style gene types, so one biotype filter fits both formats
+_HGNC_BIOTYPES = {
+    'protein-coding gene': 'protein_coding',
+    'non-coding RNA': 'ncRNA',
+    'pseudogene': 'pseudogene',
+    'other': 'other',
+}
+_HGNC_CHROMOSOME = re.compile(r'^(\d{1,2}|X|Y)(?=[pqc ]|$)')
+_GTF_ATTRIBUTE = re.compile(r'(\w+) "([^"]*)"')
+
+# name -> dtype of the per-gene sections, in file order
+GENE_SECTIONS = {
+    'chrom': '<i2',
+    'start': '<i4',
+    'end': '<i4',
+    'strand': '<i1',
+    'biotype': '<i2',
+}
+
+# ==================== BUILT-IN GENES ====================
+
+# Curated fallback used when no annotation file is configured
+CURATED_GENES = {
+    'cancer': [
+        'TP53', 'KRAS', 'EGFR', 'PIK3CA', 'BRAF', 'BRCA1', 'BRCA2', 'MYC', 'PTEN', 'ALK',
+        'RET', 'ROS1', 'MET', 'ERBB2', 'FGFR1', 'FGFR2', 'FGFR3', 'IDH1', 'IDH2', 'JAK2',
+        'KIT', 'PDGFRA', 'CDK4', 'CDK6', 'CDKN2A', 'CTNNB1', 'FBXW7', 'NOTCH1', 'RB1', 'STK11',
+        'VHL', 'ATM', 'ATR', 'CHEK1', 'CHEK2', 'MDM2', 'BAX', 'BCL2', 'ARID1A', 'SMAD4',
+        'TSC1', 'TSC2', 'NF1', 'NF2', 'APC', 'POLE', 'POLD1', 'MLH1', 'MSH2', 'MSH6',
+        'PMS2', 'BRIP1', 'PALB2', 'RAD51', 'ATRX', 'DAXX', 'SETD2', 'KDM5C', 'KDM6A'
+    ],
+    'essential': [
+        'POLR2A', 'POLR2B', 'PSMC1', 'PSMC2', 'RPL3', 'RPL4', 'RPS3', 'RPS6',
+        'SF3B1', 'U2AF1', 'CDC20', 'CDC27', 'MCM2', 'MCM3', 'ORC1', 'ORC2',
+        'TUBA1A', 'TUBB', 'ACTB', 'GAPDH', 'HRAS', 'NRAS', 'AKT1', 'AKT2',
+        'MTOR', 'RPTOR', 'RICTOR', 'MAP2K1', 'MAP2K2', 'MAPK1', 'MAPK3'
+    ],
+    'cell_cycle': [
+        'CCNA1', 'CCNA2', 'CCNB1', 'CCNB2', 'CCND1', 'CCND2', 'CCND3', 'CCNE1', 'CCNE2',
+        'CDC25A', 'CDC25B', 'CDC25C', 'CDK1', 'CDK2', 'CDK7', 'CDKN1A', 'CDKN1B', 'CDKN2B'
+    ],
+    'dna_repair': [
+        'XRCC1', 'XRCC2', 'XRCC3', 'XRCC4', 'XRCC5', 'XRCC6', 'LIG1', 'LIG3', 'LIG4',
+        'PRKDC', 'DCLRE1C', 'RAG1', 'RAG2', 'ERCC1', 'ERCC2', 'XPC', 'XPA', 'DDB2'
+    ],
+    'kinases': [
+        'AKT3', 'GSK3B', 'CSNK1A1', 'CSNK2A1', 'PRKCA', 'PRKCB', 'PRKCD', 'MAPK8',
+        'MAPK9', 'MAPK14', 'RAF1', 'ARAF', 'TBK1', 'IKBKE', 'JAK1', 'JAK3', 'TYK2'
+    ],
+    'transcription_factors': [
+        'MYC', 'MYCN', 'MYCL', 'JUN', 'FOS', 'STAT3', 'STAT5A', 'STAT5B', 'NFKB1',
+        'NFKB2', 'REL', 'RELA', 'RELB', 'TP63', 'TP73', 'E2F1', 'E2F3', 'E2F4'
+    ],
+    'metabolism': [
+        'HK1', 'HK2', 'PFKM', 'PFKL', 'ALDOA', 'GAPDH', 'PGK1', 'ENO1', 'PKM',
+        'LDHA', 'LDHB', 'IDH1', 'IDH2', 'SLC2A1', 'SLC2A3', 'G6PD', 'PHGDH'
+    ],
+    'apoptosis': [
+        'BCL2L1', 'BCL2L2', 'MCL1', 'BID', 'BIK', 'BAD', 'CASP3', 'CASP8', 'CASP9',
+        'CASP7', 'FADD', 'FAS', 'TNFRSF1A', 'TRADD', 'RIPK1', 'BIRC2', 'BIRC3', 'XIAP'
+    ],
+    'chromatin': [
+        'EZH2', 'SUZ12', 'EED', 'KMT2A', 'KMT2D', 'KDM1A', 'KDM4A', 'KDM5A', 'KDM6A',
+        'SMARCA4', 'SMARCB1', 'ARID1A', 'ARID1B', 'ARID2', 'PBRM1', 'BAP1', 'SETD2'
+    ],
+}
+
+# High-priority cancer genes the monitor tags scraped guides with
+PRIORITY_GENES = [
+    'TP53', 'KRAS', 'EGFR', 'PIK3CA', 'BRAF', 'BRCA1', 'BRCA2', 'MYC', 'PTEN',
+    'ALK', 'RET', 'ROS1', 'MET', 'ERBB2', 'FGFR1', 'FGFR2', 'FGFR3', 'IDH1',
+    'IDH2', 'JAK2', 'KIT', 'PDGFRA', 'CDK4', 'CDK6', 'CDKN2A', 'CTNNB1',
+    'NOTCH1', 'RB1', 'STK11', 'VHL', 'ATM', 'ATR', 'CHEK1', 'CHEK2', 'MDM2',
+    'AKT1', 'HRAS', 'NRAS', 'APC', 'NF1', 'FBXW7', 'SMAD4', 'TSC1', 'TSC2',
+    'BAX', 'BCL2', 'ARID1A', 'POLE', 'MLH1', 'MSH2', 'PALB2', 'RAD51'
+]
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+# ==================== GENE TABLE ====================
+
+class GeneTable:
+    """Interned gene symbols (sorted, id = position) with per-gene NumPy columns"""
+
+    def __init__(self, symbols: List[str], columns: Dict[str, np.ndarray], chromosomes: List[str],
+                 biotypes: List[str], aliases: Optional[Dict[str, int]] = None, source: str = 'built-in'):
+        self.symbols = symbols
+        self.chromosomes = chromosomes  # chrom column ids -> name ('' = unknown)
+        self.biotypes = biotypes        # biotype column ids -> gene type
+        self.source = source
+        for name in GENE_SECTIONS:
+            setattr(self, name, columns[name])
+        self._ids: Optional[Dict[str, int]] = None
+        self._aliases = aliases or {}
+        self._alias_sections = None     # (text, ids) from a cache file, decoded on first use
+
+    @property
+    def aliases(self) -> Dict[str, int]:
+        """Alias / previous symbol -> gene id"""
+        if self._alias_sections is not None:
+            text, ids = self._alias_sections
+            self._aliases = dict(zip(text.tobytes().decode('utf-8').split('\n'), ids.tolist())) if text.size else {}
+            self._alias_sections = None
+        return self._aliases
+
+    @classmethod
+    def from_symbols(cls, symbols: Iterable[str], source: str = 'built-in') -> 'GeneTable':
+        """Table of bare symbols (no coordinates), e.g. the curated fallback list"""
+        symbols = sorted(set(symbols))
+        count = len(symbols)
+        columns = {
+            'chrom': np.zeros(count, np.int16),
+            'start': np.full(count, -1, np.int32),
+            'end': np.full(count, -1, np.int32),
+            'strand': np.zeros(count, np.int8),
+            'biotype': np.zeros(count, np.int16),
+        }
+        return cls(symbols, columns, [''], [''], source=source)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def digest(self) -> str:
+        """Short fingerprint of the symbol list (changes when the gene set does)"""
+        return hashlib.blake2b('\n'.join(self.symbols).encode('utf-8'), digest_size=8).hexdigest()
+
+    def id(self, symbol: str) -> int:
+        """Gene id of an approved symbol or alias (-1 if unknown)"""
+        if self._ids is None:
+            self._ids = {name: i for i, name in enumerate(self.symbols)}
+        gene_id = self._ids.get(symbol)
+        if gene_id is None:
+            gene_id = self.aliases.get(symbol, -1)
+        return gene_id
+
+    def resolve(self, symbols: Iterable[str]) -> List[str]:
+        """Approved symbols for the given symbols / aliases, unknown ones dropped, order kept"""
+        resolved = []
+        seen = set()
+        for symbol in symbols:
+            gene_id = self.id(symbol)
+            if gene_id >= 0 and gene_id not in seen:
+                seen.add(gene_id)
+                resolved.append(self.symbols[gene_id])
+        return resolved
+
+    def biotype_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.biotype, minlength=len(self.biotypes))
+        return {name: int(n) for name, n in zip(self.biotypes, counts) if n}
+
+    # ==================== BINARY CACHE ====================
+
+    def save(self, path: str, key: Dict):
+        """Write the table to a binary cache file; key identifies the parsed source"""
+        symbol_text = '\n'.join(self.symbols).encode('utf-8')
+        alias_names = sorted(self.aliases)
+        extra = {
+            'symbols': np.frombuffer(symbol_text, dtype=np.uint8),
+            'alias_ids': np.asarray([self.aliases[name] for name in alias_names], dtype='<i4'),
+            'alias_text': np.frombuffer('\n'.join(alias_names).encode('utf-8'), dtype=np.uint8),
+        }
+        arrays = {name: getattr(self, name).astype(dtype, copy=False) for name, dtype in GENE_SECTIONS.items()}
+        arrays.update(extra)
+
+        sections = {}
+        offset = 0
+        for name, values in arrays.items():
+            sections[name] = {'offset': offset, 'dtype': values.dtype.newbyteorder('<').str,
+                              'count': int(values.size)}
+            offset = _align(offset + values.nbytes)
+        header = {
+            'version': VERSION,
+            'key': key,
+            'genes': len(self.symbols),
+            'source': self.source,
+            'chromosomes': self.chromosomes,
+            'biotypes': self.biotypes,
+            'sections': sections,
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        base = _align(_PREAMBLE.size + len(header_bytes))
+
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as out:
+            out.write(_PREAMBLE.pack(MAGIC, VERSION, 0, len(header_bytes)))
+            out.write(header_bytes)
+            for name, values in arrays.items():
+                out.seek(base + sections[name]['offset'])
+                out.write(values.tobytes())
+            out.truncate(base + offset)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, key: Optional[Dict] = None) -> Optional['GeneTable']:
+        """Read a cache file; None if it is missing, unreadable or was built from another source"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, version, _, header_length = _PREAMBLE.unpack_from(data, 0)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != VERSION:
+            return None
+        header = json.loads(data[_PREAMBLE.size:_PREAMBLE.size + header_length])
+        if key is not None and header.get('key') != key:
+            return None
+        base = _align(_PREAMBLE.size + header_length)
+
+        def section(name):
+            meta = header['sections'][name]
+            return np.frombuffer(data, dtype=meta['dtype'], count=meta['count'],
+                                 offset=base + meta['offset'])
+
+        symbols = section('symbols').tobytes().decode('utf-8').split('\n') if header['genes'] else []
+        columns = {name: section(name) for name in GENE_SECTIONS}
+        table = cls(symbols, columns, header['chromosomes'], header['biotypes'], source=header['source'])
+        table._alias_sections = (section('alias_text'), section('alias_ids'))
+        return table
+
+
+# ==================== PARSERS ====================
+
+class _TableBuilder:
+    """Accumulates genes while a file streams past; first record of a symbol wins"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.chromosomes: Dict[str, int] = {'': 0}
+        self.biotypes: Dict[str, int] = {}
+        self.columns = {'chrom': array('h'), 'start': array('i'), 'end': array('i'),
+                        'strand': array('b'), 'biotype': array('h')}
+        self.aliases: Dict[str, str] = {}
+
+    def add(self, symbol: str, chrom: str, start: int, end: int, strand: int, biotype: str) -> bool:
+        if symbol in self.ids:
+            return False  # e.g. the chrY copy of a pseudoautosomal gene
+        self.ids[symbol] = len(self.ids)
+        columns = self.columns
+        columns['chrom'].append(self.chromosomes.setdefault(chrom, len(self.chromosomes)))
+        columns['start'].append(start)
+        columns['end'].append(end)
+        columns['strand'].append(strand)
+        columns['biotype'].append(self.biotypes.setdefault(biotype, len(self.biotypes)))
+        return True
+
+    def alias(self, alias: str, symbol: str):
+        self.aliases.setdefault(alias, symbol)
+
+    def table(self, source: str) -> GeneTable:
+        """Sort symbols into their final ids and freeze the columns"""
+        symbols = sorted(self.ids)
+        order = np.fromiter((self.ids[symbol] for symbol in symbols), dtype=np.int64, count=len(symbols))
+        columns = {name: np.frombuffer(values, dtype=GENE_SECTIONS[name][1:])[order]
+                   for name, values in self.columns.items()}
+        final = {symbol: i for i, symbol in enumerate(symbols)}
+        aliases = {alias: final[symbol] for alias, symbol in self.aliases.items()
+                   if symbol in final and alias not in final}
+        return GeneTable(symbols, columns, list(self.chromosomes), list(self.biotypes), aliases, source)
+
+
+def _open_text(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def detect_format(path: str) -> str:
+    """'hgnc' for an HGNC TSV (hgnc_id header), otherwise 'gtf'"""
+    with _open_text(path) as f:
+        first = f.readline()
+    return 'hgnc' if first.startswith('hgnc_id\t') else 'gtf'
+
+
+def _chromosome(name: str) -> str:
+    """Drop the UCSC 'chr' prefix and use MT for the mitochondrial genome"""
+    if name.startswith('chr'):
+        name = name[3:]
+    return 'MT' if name == 'M' else name
+
+
+def parse_hgnc(path: str, biotypes: Optional[Sequence[str]] = DEFAULT_BIOTYPES) -> GeneTable:
+    """Approved genes of an HGNC complete-set TSV (location gives the chromosome only)"""
+    builder = _TableBuilder()
+    wanted = set(biotypes) if biotypes else None
+    with _open_text(path) as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+        col = {name: i for i, name in enumerate(header)}
+        symbol_col, group_col = col['symbol'], col['locus_group']
+        status_col, location_col = col.get('status'), col.get('location')
+        alias_cols = [col[name] for name in ('alias_symbol', 'prev_symbol') if name in col]
+        width = max(col.values()) + 1
+
+        for line in f:
+            fields = line.rstrip('\r\n').split('\t')
+            if len(fields) < width:
+                fields += [''] * (width - len(fields))
+            if status_col is not None and fields[status_col] != 'Approved':
+                continue
+            biotype = _HGNC_BIOTYPES.get(fields[group_col], fields[group_col])
+            if wanted is not None and biotype not in wanted:
+                continue
+            symbol = fields[symbol_col]
+            location = fields[location_col] if location_col is not None else ''
+            match = _HGNC_CHROMOSOME.match(location)
+            chrom = match.group(1) if match else ('MT' if location == 'mitochondria' else '')
+            if not builder.add(symbol, chrom, -1, -1, 0, biotype):
+                continue
+            for i in alias_cols:
+                for alias in fields[i].strip('"').split('|'):
+                    if alias:
+                        builder.alias(alias, symbol)
+    return builder.table(os.path.basename(path))
+
+
+def parse_gtf(path: str, biotypes: Optional[Sequence[str]] = DEFAULT_BIOTYPES) -> GeneTable:
+    """Genes of an Ensembl / GENCODE GTF ('gene' records only; transcripts and exons skipped)"""
+    builder = _TableBuilder()
+    wanted = set(biotypes) if biotypes else None
+    with _open_text(path) as f:
+        for line in f:
+            # Cheap substring test first: only about 2% of GTF lines are gene records
+            if '\tgene\t' not in line or line.startswith('#'):
+                continue
+            fields = line.split('\t', 8)
+            if len(fields) < 9 or fields[2] != 'gene':
+                continue
+            attributes = dict(_GTF_ATTRIBUTE.findall(fields[8]))
+            biotype = attributes.get('gene_type') or attributes.get('gene_biotype') or ''
+            if wanted is not None and biotype not in wanted:
+                continue
+            symbol = attributes.get('gene_name') or attributes.get('gene_id')
+            if not symbol:
+                continue
+            strand = 1 if fields[6] == '+' else -1 if fields[6] == '-' else 0
+            builder.add(symbol, _chromosome(fields[0]), int(fields[3]), int(fields[4]), strand, biotype)
+    return builder.table(os.path.basename(path))
+
+
+# ==================== LOADING ====================
+
+def load_annotation(path: str, biotypes: Optional[Sequence[str]] = DEFAULT_BIOTYPES,
+                    cache_path: Optional[str] = None, rebuild: bool = False) -> GeneTable:
+    """Gene table of an annotation file, from its binary cache when that is current"""
+    cache_path = cache_path or path + '.genes'
+    stat = os.stat(path)
+    key = {
+        'annotation': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'biotypes': sorted(biotypes) if biotypes else None,
+    }
+    if not rebuild:
+        table = GeneTable.load(cache_path, key)
+        if table is not None:
+            return table
+
+    parse = parse_hgnc if detect_format(path) == 'hgnc' else parse_gtf
+    table = parse(path, biotypes)
+    try:
+        table.save(cache_path, key)
+    except OSError:
+        pass  # Read-only annotation directory: parse again next time
+    return table
+
+
+def open_gene_table(config: Optional[Dict]) -> GeneTable:
+    """Gene table for a GENE_CONFIG dict (curated built-in list when no annotation_path is set)"""
+    if not config or not config.get('annotation_path'):
+        return GeneTable.from_symbols((gene for genes in CURATED_GENES.values() for gene in genes))
+    return load_annotation(config['annotation_path'], config.get('biotypes', DEFAULT_BIOTYPES),
+                           config.get('cache_path'))
+
+
+def read_gene_list(path: str) -> List[str]:
+    """Symbols from a text file, one per line ('#' starts a comment)"""
+    with open(path, encoding='utf-8') as f:
+        return [symbol for symbol in (line.split('#', 1)[0].strip() for line in f) if symbol]
+
+
+def main():
+    """Build (or refresh) the binary cache of an annotation file and summarise it"""
+    parser = argparse.ArgumentParser(description='Parse and cache a gene annotation file')
+    parser.add_argument('annotation', help='HGNC complete-set TSV or GTF (.gz ok)')
+    parser.add_argument('--biotype', action='append', dest='biotypes',
+                        help=f"gene type to keep, repeatable (default: {', '.join(DEFAULT_BIOTYPES)}; 'all' keeps every type)")
+    parser.add_argument('--cache', metavar='PATH', help="cache file (default: '<annotation>.genes')")
+    parser.add_argument('--rebuild', action='store_true', help='re-parse even when the cache is current')
+    args = parser.parse_args()
+    biotypes = args.biotypes or list(DEFAULT_BIOTYPES)
+    if 'all' in biotypes:
+        biotypes = None
+
+    started = time.perf_counter()
+    table = load_annotation(args.annotation, biotypes, args.cache, rebuild=args.rebuild)
+    build_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    load_annotation(args.annotation, biotypes, args.cache)
+    cached_ms = (time.perf_counter() - started) * 1000
+
+    print(f"✅ {table.source}: {len(table):,} genes, {len(table.aliases):,} aliases, "
+          f"{len(table.chromosomes) - 1} chromosomes")
+    for biotype, count in sorted(table.biotype_counts().items(), key=lambda item: -item[1]):
+        print(f"   {biotype or '(none)'}: {count:,}")
+    print(f"   First load {build_ms:.1f} ms, cached load {cached_ms:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE GUIDE EXPORT
+Streaming Parquet export of crispr_guides_mega for analytics and the
+designer's offline models:
+
+- Keyset pagination on id (WHERE id > last ORDER BY id LIMIT page_rows),
+  each page read through an unbuffered cursor in fetchmany(batch_rows)
+  chunks, so client memory is one chunk plus the partition buffers
+  however large the table is
+- Every chunk becomes an Arrow record batch (typed columns, no per-row
+  dicts) and is split by partition: source_database or the first letters
+  of gene_symbol, written as Hive-style directories
+  (source_database=<value>/part-<run>-00000.parquet)
+- Row groups are buffered per partition up to row_group_rows; the total
+  buffered row count is capped, and at most max_open_files Parquet
+  writers are kept open (older ones are closed and a new part started)
+- --incremental exports only rows whose updated_at passed the watermark
+  stored in <out>/_export_state.json by the previous run. The upper bound
+  is the database clock at the start, so rows changing during an export
+  go to the next one. A re-exported row has the same id; keep its newest
+  updated_at when reading
+
+    python guide_export.py --out /data/guides --partition-by source
+    python guide_export.py --out /data/guides --incremental
+
+pyarrow is only needed for this module.
+
+Author: Fazil Firdous
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from storage import GuideStorage, open_storage
+
+STATE_FILE = '_export_state.json'
+PARTITIONS = ('source', 'gene_prefix')
+
+EXPORT_COLUMNS = (
+    'id', 'guide_sequence', 'gene_symbol', 'efficiency', 'gc_content', 'off_target_score',
+    'validation_status', 'source_database', 'paper_title', 'publication_date', 'cell_line',
+    'locus', 'created_at', 'updated_at',
+)
+
+
+def export_schema():
+    """Arrow schema of an exported row"""
+    import pyarrow as pa
+    return pa.schema([
+        ('id', pa.int64()),
+        ('guide_sequence', pa.string()),
+        ('gene_symbol', pa.string()),
+        ('efficiency', pa.float64()),
+        ('gc_content', pa.float64()),
+        ('off_target_score', pa.float64()),
+        ('validation_status', pa.string()),
+        ('source_database', pa.string()),
+        ('paper_title', pa.string()),
+        ('publication_date', pa.date32()),
+        ('cell_line', pa.string()),
+        ('locus', pa.string()),
+        ('created_at', pa.timestamp('s')),
+        ('updated_at', pa.timestamp('s')),
+    ])
+
+
+def _column(values: Tuple, field):
+    """One Arrow column from DB values (Decimal, date / datetime or SQLite text)"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    array = pa.array(values)
+    if array.type == field.type:
+        return array
+    if pa.types.is_string(array.type) and pa.types.is_date32(field.type):
+        return pc.strptime(array, '%Y-%m-%d', 's', error_is_null=True).cast(pa.date32())
+    if pa.types.is_string(array.type) and pa.types.is_timestamp(field.type):
+        return pc.strptime(array, '%Y-%m-%d %H:%M:%S', 's', error_is_null=True)
+    return array.cast(field.type, safe=not pa.types.is_timestamp(field.type))
+
+
+def rows_to_batch(rows: List[Tuple], schema):
+    """Arrow record batch from fetched row tuples (EXPORT_COLUMNS order)"""
+    import pyarrow as pa
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays([_column(values, field) for values, field in zip(columns, schema)],
+                                      schema=schema)
+
+
+def partition_keys(batch, partition_by: str, prefix_length: int = 1):
+    """Per-row partition values of a batch"""
+    import pyarrow.compute as pc
+    if partition_by == 'source':
+        return batch.column('source_database')
+    return pc.utf8_upper(pc.utf8_slice_codeunits(batch.column('gene_symbol'), 0, prefix_length))
+
+
+def split_batch(batch, keys) -> List[Tuple[Optional[str], object]]:
+    """(partition value, sub-batch) pairs, rows kept in id order within each"""
+    import pyarrow.compute as pc
+    encoded = keys.dictionary_encode()
+    codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False)
+    dictionary = encoded.dictionary.to_pylist()
+
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+    groups = []
+    for group in np.split(order, bounds):
+        code = int(codes[group[0]])
+        groups.append((dictionary[code] if code >= 0 else None, batch.take(group)))
+    return groups
+
+
+class PartitionedParquetWriter:
+    """Hive-partitioned Parquet files with bounded buffers and open writers"""
+
+    def __init__(self, out_dir: str, column: str, schema, run_id: str, row_group_rows: int = 65536,
+                 max_buffered_rows: int = 500000, max_open_files: int = 64, compression: str = 'zstd'):
+        self.out_dir = out_dir
+        self.column = column
+        self.schema = schema
+        self.run_id = run_id
+        self.row_group_rows = row_group_rows
+        self.max_buffered_rows = max_buffered_rows
+        self.max_open_files = max_open_files
+        self.compression = compression
+
+        self.buffers: Dict[Optional[str], List] = {}
+        self.buffered: Dict[Optional[str], int] = {}
+        self.writers: 'OrderedDict[Optional[str], Tuple]' = OrderedDict()  # value -> (writer, tmp, path)
+        self.parts: Dict[Optional[str], int] = {}
+        self.files: List[str] = []
+        self.rows = 0
+
+    def _directory(self, value: Optional[str]) -> str:
+        name = '__HIVE_DEFAULT_PARTITION__' if value is None or value == '' else quote(value, safe='')
+        return os.path.join(self.out_dir, f"{self.column}={name}")
+
+    def write(self, value: Optional[str], batch):
+        self.buffers.setdefault(value, []).append(batch)
+        self.buffered[value] = self.buffered.get(value, 0) + batch.num_rows
+        self.rows += batch.num_rows
+
+        if self.buffered[value] >= self.row_group_rows:
+            self._flush(value)
+        if sum(self.buffered.values()) > self.max_buffered_rows:
+            # Spill the largest buffers until half the budget is free
+            for key in sorted(self.buffered, key=self.buffered.get, reverse=True):
+                self._flush(key)
+                if sum(self.buffered.values()) <= self.max_buffered_rows // 2:
+                    break
+
+    def _writer(self, value: Optional[str]):
+        import pyarrow.parquet as pq
+        if value in self.writers:
+            self.writers.move_to_end(value)
+            return self.writers[value][0]
+
+        if len(self.writers) >= self.max_open_files:
+            self._close(next(iter(self.writers)))
+        directory = self._directory(value)
+        os.makedirs(directory, exist_ok=True)
+        part = self.parts.get(value, 0)
+        self.parts[value] = part + 1
+        path = os.path.join(directory, f"part-{self.run_id}-{part:05d}.parquet")
+        tmp = os.path.join(directory, f".part-{self.run_id}-{part:05d}.parquet.tmp")
+        writer = pq.ParquetWriter(tmp, self.schema, compression=self.compression)
+        self.writers[value] = (writer, tmp, path)
+        return writer
+
+    def _flush(self, value: Optional[str]):
+        import pyarrow as pa
+        batches = self.buffers.pop(value, None)
+        self.buffered.pop(value, None)
+        if batches:
+            self._writer(value).write_table(pa.Table.from_batches(batches, schema=self.schema),
+                                            row_group_size=self.row_group_rows)
+
+    def _close(self, value: Optional[str]):
+        writer, tmp, path = self.writers.pop(value)
+        writer.close()
+        os.replace(tmp, path)  # Readers never see a half-written file
+        self.files.append(path)
+
+    def close(self):
+        for value in list(self.buffers):
+            self._flush(value)
+        for value in list(self.writers):
+            self._close(value)
+
+
+def _database_now(storage: GuideStorage) -> str:
+    """Database clock, in the format updated_at is compared in"""
+    sql = "SELECT NOW()" if storage.backend == 'mysql' else "SELECT CURRENT_TIMESTAMP"
+    return str(storage._fetchall(sql)[0][0])[:19]
+
+
+def _cursor(storage: GuideStorage):
+    """Unbuffered cursor: rows stay on the server until fetched"""
+    if storage.backend == 'mysql':
+        return storage.conn.cursor(buffered=False)
+    return storage.conn.cursor()
+
+
+def iter_batches(storage: GuideStorage, schema, page_rows: int = 100000, batch_rows: int = 10000,
+                 since: Optional[str] = None, until: Optional[str] = None):
+    """Yield Arrow record batches of crispr_guides_mega in id order (optionally an updated_at window)"""
+    p = storage.placeholder
+    where = [f"id > {p}"]
+    params: List = []
+    if since is not None:
+        where.append(f"updated_at >= {p}")
+        params.append(since)
+    if until is not None:
+        where.append(f"updated_at < {p}")
+        params.append(until)
+    sql = (f"SELECT {', '.join(EXPORT_COLUMNS)} FROM crispr_guides_mega "
+           f"WHERE {' AND '.join(where)} ORDER BY id LIMIT {int(page_rows)}")
+
+    last_id = 0
+    while True:
+        cursor = _cursor(storage)
+        fetched = 0
+        try:
+            cursor.execute(sql, (last_id, *params))
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                fetched += len(rows)
+                last_id = rows[-1][0]
+                yield rows_to_batch(rows, schema)
+        finally:
+            cursor.close()
+        if fetched < page_rows:
+            return
+
+
+def _load_state(out_dir: str) -> Optional[Dict]:
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(out_dir: str, state: Dict):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def export_parquet(storage: GuideStorage, out_dir: str, partition_by: str = 'source', prefix_length: int = 1,
+                   incremental: bool = False, page_rows: int = 100000, batch_rows: int = 10000,
+                   row_group_rows: int = 65536, max_open_files: int = 64,
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """Stream crispr_guides_mega into partitioned Parquet under out_dir; returns a run summary"""
+    if partition_by not in PARTITIONS:
+        raise ValueError(f"partition_by must be one of {PARTITIONS}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    state = _load_state(out_dir)
+    if state is not None:
+        if not incremental:
+            raise ValueError(f"{out_dir} already holds an export; use incremental mode or a new directory")
+        if (state['partition_by'], state.get('prefix_length')) != (partition_by, prefix_length):
+            raise ValueError(f"{out_dir} is partitioned by {state['partition_by']}, not {partition_by}")
+    since = state['watermark'] if state is not None else None
+    until = _database_now(storage)
+
+    schema = export_schema()
+    started = time.time()
+    run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+    column = 'source_database' if partition_by == 'source' else 'gene_prefix'
+    writer = PartitionedParquetWriter(out_dir, column, schema, run_id,
+                                      row_group_rows=row_group_rows, max_open_files=max_open_files)
+
+    last_id = 0
+    for batch in iter_batches(storage, schema, page_rows, batch_rows, since, until):
+        for value, part in split_batch(batch, partition_keys(batch, partition_by, prefix_length)):
+            writer.write(value, part)
+        last_id = batch.column('id')[-1].as_py()
+        if progress is not None:
+            progress(writer.rows, last_id)
+    writer.close()
+
+    summary = {
+        'run_id': run_id,
+        'rows': writer.rows,
+        'files': len(writer.files),
+        'partitions': len(writer.parts),
+        'since': since,
+        'watermark': until,
+        'seconds': round(time.time() - started, 2),
+    }
+    runs = (state or {}).get('runs', [])[-49:] + [summary]
+    _save_state(out_dir, {'partition_by': partition_by, 'prefix_length': prefix_length,
+                          'watermark': until, 'runs': runs})
+    return summary
+
+
+def main():
+    """Export entry point"""
+    from onetime_scrapper import DB_CONFIG, STORAGE_CONFIG
+
+    parser = argparse.ArgumentParser(description='Export crispr_guides_mega to partitioned Parquet')
+    parser.add_argument('--out', required=True, help='output directory (Hive-style partitions)')
+    parser.add_argument('--partition-by', choices=PARTITIONS, default='source',
+                        help='source_database or the first letters of gene_symbol')
+    parser.add_argument('--prefix-length', type=int, default=1, help='gene prefix letters for gene_prefix')
+    parser.add_argument('--incremental', action='store_true',
+                        help="only rows updated since the previous export's watermark")
+    parser.add_argument('--page-rows', type=int, default=100000, help='rows per keyset page query')
+    parser.add_argument('--batch-rows', type=int, default=10000, help='rows per fetch / Arrow batch')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], default=STORAGE_CONFIG['backend'])
+    parser.add_argument('--sqlite-path', default=STORAGE_CONFIG['sqlite_path'])
+    args = parser.parse_args()
+
+    def report(rows, last_id):
+        if rows % 500000 < args.batch_rows:
+            print(f"  Exported {rows:,} rows (id {last_id:,})", file=sys.stderr)
+
+    storage = open_storage({**STORAGE_CONFIG, 'backend': args.backend, 'sqlite_path': args.sqlite_path,
+                            'summary_tables': False, 'known_guides_path': None}, DB_CONFIG)
+    try:
+        summary = export_parquet(storage, args.out, args.partition_by, args.prefix_length, args.incremental,
+                                 args.page_rows, args.batch_rows, progress=report)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        storage.close()
+    print(f"✅ Exported {summary['rows']:,} rows into {summary['files']} files "
+          f"({summary['partitions']} partitions) in {summary['seconds']}s", file=sys.stderr)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
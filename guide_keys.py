@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE GUIDE KEYS
+Compact dedupe keys for crispr_guides_mega.
+
+'packed' scheme (guide_key BIGINT UNIQUE):
+- Sequences of up to 28 nt are 2-bit encoded (A=0, C=1, G=2, T=3),
+  uppercase-canonical, with the length stored in bits 56-62.
+  A 20-nt guide uses 40 bits of payload; keys are always >= 0.
+- Longer sequences or ones with non-ACGT bases fall back to a
+  64-bit BLAKE2b hash with the sign bit set, so the two key
+  spaces can never collide.
+
+'md5' scheme: the original 32-char hex guide_hash.
+
+Author: Fazil Firdous
+"""
+
+import hashlib
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+KEY_SCHEMES = ('md5', 'packed')
+KEY_COLUMNS = {'md5': 'guide_hash', 'packed': 'guide_key'}
+
+MAX_PACKED_LENGTH = 28
+LENGTH_SHIFT = 56
+
+_BASE4 = str.maketrans('ACGTacgt', '01230123')
+
+_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate(b'ACGT'):
+    _CODES[_base] = _code
+    _CODES[_base + 32] = _code  # lowercase
+
+
+def md5_key(sequence: str) -> str:
+    """Original 32-char MD5 hex guide_hash"""
+    return hashlib.md5(sequence.encode()).hexdigest()[:32]
+
+
+def hash64_key(sequence: str) -> int:
+    """Signed 64-bit BLAKE2b fallback key (always negative)"""
+    digest = hashlib.blake2b(sequence.upper().encode(), digest_size=8).digest()
+    return (int.from_bytes(digest, 'big') | (1 << 63)) - (1 << 64)
+
+
+def packed_key(sequence: str) -> int:
+    """2-bit packed key for one sequence (hash fallback when it cannot be packed)"""
+    digits = sequence.translate(_BASE4)
+    if 0 < len(digits) <= MAX_PACKED_LENGTH and not digits.strip('0123'):
+        return (len(digits) << LENGTH_SHIFT) | int(digits, 4)
+    return hash64_key(sequence)
+
+
+def guide_key(sequence: str, scheme: str = 'packed') -> Union[int, str]:
+    """Dedupe key for one sequence under the given scheme"""
+    if scheme == 'packed':
+        return packed_key(sequence)
+    return md5_key(sequence)
+
+
+def _pack_codes(bases: np.ndarray) -> np.ndarray:
+    """Pack an (n, L) matrix of 2-bit base codes into int64 keys"""
+    length = bases.shape[1]
+    keys = np.zeros(bases.shape[0], dtype=np.int64)
+    for j in range(length):
+        keys <<= 2
+        keys |= bases[:, j].astype(np.int64)
+    return keys | np.int64(length << LENGTH_SHIFT)
+
+
+def pack_matrix(codes: np.ndarray) -> np.ndarray:
+    """Pack an (n, L) uint8 ASCII sequence matrix into int64 keys (L <= 28, ACGT only)"""
+    if codes.shape[1] > MAX_PACKED_LENGTH:
+        raise ValueError(f"pack_matrix only packs up to {MAX_PACKED_LENGTH} nt")
+    bases = _CODES[codes]
+    if (bases == 255).any():
+        raise ValueError("pack_matrix only accepts A/C/G/T")
+    return _pack_codes(bases)
+
+
+def pack_guides(sequences: Sequence[str]) -> np.ndarray:
+    """Vectorized packed keys for a batch of sequences (int64 array)"""
+    keys = np.empty(len(sequences), dtype=np.int64)
+    if not len(sequences):
+        return keys
+
+    lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+    for length in np.unique(lengths).tolist():
+        idx = np.flatnonzero(lengths == length)
+        if length == 0 or length > MAX_PACKED_LENGTH:
+            keys[idx] = [hash64_key(sequences[i]) for i in idx.tolist()]
+            continue
+
+        # One contiguous byte buffer per length group -> (rows, length) matrix
+        raw = ''.join([sequences[i] for i in idx.tolist()]).encode('ascii', 'replace')
+        bases = _CODES[np.frombuffer(raw, dtype=np.uint8).reshape(-1, length)]
+        valid = (bases != 255).all(axis=1)
+
+        group = _pack_codes(bases)
+        if not valid.all():
+            for k in np.flatnonzero(~valid).tolist():
+                group[k] = hash64_key(sequences[idx[k]])
+        keys[idx] = group
+    return keys
+
+
+def batch_keys(sequences: Sequence[str], scheme: str = 'packed') -> List[Union[int, str]]:
+    """Dedupe keys for a batch of sequences under the given scheme"""
+    if scheme == 'packed':
+        return pack_guides(sequences).tolist()
+    return [md5_key(sequence) for sequence in sequences]
+
+
+def unpack_key(key: int) -> Optional[str]:
+    """Decode a packed key back to its sequence (None for hashed keys)"""
+    if key < 0:
+        return None
+    length = key >> LENGTH_SHIFT
+    payload = key & ((1 << LENGTH_SHIFT) - 1)
+    return ''.join('ACGT'[(payload >> (2 * (length - 1 - j))) & 3] for j in range(length))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE GUIDE PIPELINE
+Streaming producer/consumer path from the monitor's scrapers to storage:
+- Scrapers append guides to a per-source GuideSink, which feeds a
+  bounded queue (producers block while it is full)
+- A single GuideWriter thread drains the queue into batch_size inserts,
+  so commits overlap with network waits
+- Partial batches are written once the queue has been idle for a moment
+- Peak memory is bounded by queue capacity plus one batch, not by the
+  volume of a cycle
+
+Author: Fazil Firdous
+"""
+
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+_DONE = object()  # Queue sentinel: no more guides this cycle
+
+
+class GuideWriter(threading.Thread):
+    """Background thread that drains the guide queue into batched inserts"""
+
+    def __init__(self, insert_batch: Callable[[List[Dict]], Tuple[int, int]],
+                 batch_size: int = 200, capacity: int = 2000, idle_flush: float = 1.0):
+        super().__init__(name='guide-writer', daemon=True)
+        self.insert_batch = insert_batch
+        self.batch_size = batch_size
+        self.idle_flush = idle_flush
+        self.queue = queue.Queue(maxsize=capacity)
+        self.added = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.error = None
+
+    def put(self, guide: Dict, cancel: Optional[threading.Event] = None) -> bool:
+        """Queue one guide, blocking while the queue is full; False if cancelled first"""
+        while True:
+            if cancel is not None and cancel.is_set():
+                return False
+            try:
+                self.queue.put(guide, timeout=0.5)
+                return True
+            except queue.Full:
+                if not self.is_alive():
+                    raise RuntimeError(f"guide writer stopped: {self.error}")
+
+    def close(self) -> Tuple[int, int]:
+        """Write what is left, stop the thread and return (added, duplicates)"""
+        if self.is_alive():
+            self.queue.put(_DONE)
+            self.join()
+        return self.added, self.duplicates
+
+    def run(self):
+        batch = []
+        try:
+            while True:
+                try:
+                    guide = self.queue.get(timeout=self.idle_flush)
+                except queue.Empty:
+                    # Producers are waiting on the network: commit what we have
+                    if batch:
+                        self._write(batch)
+                        batch = []
+                    continue
+
+                if guide is _DONE:
+                    break
+                batch.append(guide)
+                if len(batch) >= self.batch_size:
+                    self._write(batch)
+                    batch = []
+
+            if batch:
+                self._write(batch)
+        except Exception as e:
+            self.error = e
+            raise
+
+    def _write(self, batch: List[Dict]):
+        added, duplicates = self.insert_batch(batch)
+        self.added += added
+        self.duplicates += duplicates
+        self.batches += 1
+
+
+class GuideSink:
+    """List-like producer handle for one source; append() streams into the writer queue"""
+
+    def __init__(self, writer: GuideWriter, cancel: Optional[threading.Event] = None):
+        self.writer = writer
+        self.cancel = cancel
+        self.count = 0
+
+    def append(self, guide: Dict):
+        if self.writer.put(guide, self.cancel):
+            self.count += 1
+
+    def extend(self, guides):
+        for guide in guides:
+            self.append(guide)
+
+    def __len__(self):
+        return self.count
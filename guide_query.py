@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE GUIDE QUERY API
+Read path for the Guide Designer over crispr_guides_mega:
+- top_guides(): best guides for a gene with efficiency / off-target /
+  cell-line filters, served by the covering index
+  idx_gene_efficiency (gene_symbol, efficiency DESC, off_target_score,
+  cell_line, guide_sequence, gc_content), so a query is one short index
+  range read with no table lookups
+- gene_summary(): per-gene counts from crispr_gene_stats
+- QueryCache: bounded LRU result cache with a TTL. Writers that share the
+  storage object invalidate a gene as soon as guides for it are inserted;
+  other processes see new guides once the TTL expires
+- python guide_query.py --benchmark: p50 / p99 latency, cold and cached
+
+Author: Fazil Firdous
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from storage import GuideStorage, _to_float, open_storage
+
+QUERY_INDEX = 'idx_gene_efficiency'
+QUERY_INDEX_COLUMNS = 'gene_symbol, efficiency DESC, off_target_score, cell_line, guide_sequence, gc_content'
+
+
+class GuideHit(NamedTuple):
+    """One guide returned by top_guides()"""
+    id: int
+    sequence: str
+    efficiency: float
+    off_target: Optional[float]
+    gc_content: Optional[float]
+    cell_line: Optional[str]
+
+
+class GeneSummary(NamedTuple):
+    """Per-gene summary row from crispr_gene_stats"""
+    gene: str
+    guides: int
+    mean_efficiency: Optional[float]
+    max_efficiency: Optional[float]
+    best_off_target: Optional[float]
+
+
+QueryKey = Tuple[str, int, float, Optional[float], Optional[str]]
+
+
+class QueryCache:
+    """Bounded LRU + TTL cache of top_guides() results, invalidated per gene"""
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[QueryKey, Tuple[float, List[GuideHit]]]' = OrderedDict()
+        self._by_gene: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key: QueryKey) -> Optional[List[GuideHit]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                self._drop(key)
+                self.counters['expired'] += 1
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry[1]
+
+    def put(self, key: QueryKey, hits: List[GuideHit]):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), hits)
+            self._entries.move_to_end(key)
+            self._by_gene.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.counters['evictions'] += 1
+
+    def invalidate_genes(self, genes: Iterable[str]):
+        """Drop cached results for genes that just received new guides"""
+        with self._lock:
+            for gene in genes:
+                for key in self._by_gene.pop(gene, ()):
+                    self._entries.pop(key, None)
+                    self.counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_gene.clear()
+
+    def _drop(self, key: QueryKey):
+        self._entries.pop(key, None)
+        keys = self._by_gene.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_gene[key[0]]
+
+    def cache_stats(self) -> Dict:
+        with self._lock:
+            return {**self.counters, 'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+def ensure_query_indexes(storage: GuideStorage) -> bool:
+    """Create the covering index if it is missing; returns True if it was created"""
+    cursor = storage.conn.cursor()
+    try:
+        if storage.backend == 'mysql':
+            cursor.execute(
+                "SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+                "AND TABLE_NAME = 'crispr_guides_mega' AND INDEX_NAME = %s",
+                (QUERY_INDEX,)
+            )
+            if cursor.fetchone()[0]:
+                return False
+            cursor.execute(f"ALTER TABLE crispr_guides_mega ADD INDEX {QUERY_INDEX} ({QUERY_INDEX_COLUMNS})")
+            return True
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (QUERY_INDEX,))
+        if cursor.fetchone():
+            return False
+        cursor.execute(f"CREATE INDEX {QUERY_INDEX} ON crispr_guides_mega ({QUERY_INDEX_COLUMNS})")
+        return True
+    finally:
+        cursor.close()
+
+
+class GuideQueryAPI:
+    """Typed, cached queries over one storage connection"""
+
+    def __init__(self, storage: GuideStorage, cache: Optional[QueryCache] = None):
+        self.storage = storage
+        self.cache = cache
+        if cache is not None:
+            # Writers going through this storage invalidate the genes they insert
+            storage.query_cache = cache
+
+        p = storage.placeholder
+        self._top_sql = (
+            "SELECT id, guide_sequence, efficiency, off_target_score, gc_content, cell_line "
+            f"FROM crispr_guides_mega WHERE gene_symbol = {p} AND efficiency >= {p}"
+        )
+        self._summary_sql = (
+            "SELECT gene_symbol, guides, efficiency_sum, max_efficiency, best_off_target "
+            f"FROM crispr_gene_stats WHERE gene_symbol = {p}"
+        )
+
+    def top_guides(self, gene: str, limit: int = 10, min_efficiency: float = 0.0,
+                   max_off_target: Optional[float] = None,
+                   cell_line: Optional[str] = None) -> List[GuideHit]:
+        """Best guides for a gene, highest efficiency first (ties: lowest off-target)"""
+        key = (gene, int(limit), float(min_efficiency), max_off_target, cell_line)
+        if self.cache is not None:
+            hits = self.cache.get(key)
+            if hits is not None:
+                return hits
+
+        sql = self._top_sql
+        params = [gene, min_efficiency]
+        if max_off_target is not None:
+            sql += f" AND off_target_score <= {self.storage.placeholder}"
+            params.append(max_off_target)
+        if cell_line is not None:
+            sql += f" AND cell_line = {self.storage.placeholder}"
+            params.append(cell_line)
+        sql += f" ORDER BY efficiency DESC, off_target_score LIMIT {int(limit)}"
+
+        cursor = self.storage.conn.cursor()
+        try:
+            cursor.execute(sql, tuple(params))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        hits = [GuideHit(row[0], row[1], _to_float(row[2]), _to_float(row[3]), _to_float(row[4]), row[5])
+                for row in rows]
+        if self.cache is not None:
+            self.cache.put(key, hits)
+        return hits
+
+    def gene_summary(self, gene: str) -> Optional[GeneSummary]:
+        """Guide count and efficiency summary for one gene (needs summary tables)"""
+        cursor = self.storage.conn.cursor()
+        try:
+            cursor.execute(self._summary_sql, (gene,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if row is None:
+            return None
+        gene, guides, efficiency_sum, max_efficiency, best_off_target = row
+        return GeneSummary(gene, guides, round(float(efficiency_sum) / guides, 2) if guides else None,
+                           _to_float(max_efficiency), _to_float(best_off_target))
+
+
+# ==================== BENCHMARK ====================
+
+def _percentiles(latencies: List[float]) -> Dict:
+    ms = np.asarray(latencies) * 1000
+    return {
+        'queries': len(latencies),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3)
+    }
+
+
+def run_benchmark(storage: GuideStorage, queries: int = 2000, genes: int = 200,
+                  seed: int = 0) -> Dict:
+    """p50/p99 latency of top_guides() over a random query mix, uncached and cached"""
+    rng = random.Random(seed)
+    gene_names = [row['name'] for row in storage.summary('gene', limit=genes) if row['name']]
+    if not gene_names:
+        raise RuntimeError("no genes to query (is crispr_gene_stats populated?)")
+    cell_lines = [row['name'] for row in storage.summary('cell_line') if row['name']] or [None]
+
+    # Designer traffic is skewed towards popular genes: Zipf-like weights by rank
+    weights = [1.0 / (rank + 1) for rank in range(len(gene_names))]
+    workload = [
+        dict(gene=rng.choices(gene_names, weights)[0], limit=rng.choice([5, 10, 20]),
+             min_efficiency=rng.choice([0.0, 70.0, 85.0]),
+             max_off_target=rng.choice([None, 3.0, 5.0]),
+             cell_line=rng.choice([None, None, rng.choice(cell_lines)]))
+        for _ in range(queries)
+    ]
+
+    results = {}
+    for name, cache in (('uncached', None), ('cached', QueryCache())):
+        api = GuideQueryAPI(storage, cache)
+        latencies = []
+        for query in workload:
+            started = time.perf_counter()
+            api.top_guides(**query)
+            latencies.append(time.perf_counter() - started)
+        results[name] = _percentiles(latencies)
+        if cache is not None:
+            results[name]['cache'] = cache.cache_stats()
+    storage.query_cache = None
+    return results
+
+
+def main():
+    """Benchmark entry point"""
+    from onetime_scrapper import DB_CONFIG, STORAGE_CONFIG
+
+    parser = argparse.ArgumentParser(description='Guide query API benchmark')
+    parser.add_argument('--benchmark', action='store_true', help='run the latency benchmark')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], default=STORAGE_CONFIG['backend'])
+    parser.add_argument('--sqlite-path', default=STORAGE_CONFIG['sqlite_path'])
+    parser.add_argument('--queries', type=int, default=2000, help='queries per pass')
+    parser.add_argument('--genes', type=int, default=200, help='distinct genes in the query mix')
+    parser.add_argument('--create-index', action='store_true',
+                        help=f'create {QUERY_INDEX} if it is missing')
+    args = parser.parse_args()
+
+    storage = open_storage({**STORAGE_CONFIG, 'backend': args.backend, 'sqlite_path': args.sqlite_path,
+                            'summary_tables': True}, DB_CONFIG)
+    try:
+        if args.create_index and ensure_query_indexes(storage):
+            print(f"✅ Created {QUERY_INDEX}", file=sys.stderr)
+        if args.benchmark:
+            print(json.dumps(run_benchmark(storage, args.queries, args.genes), indent=2))
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
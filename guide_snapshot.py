@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE GUIDE SNAPSHOT
+Single-file binary snapshot of crispr_guides_mega for consumers that need
+the whole guide set, opened with mmap and read through NumPy views:
+
+- Sequences as 2-bit packed int64 keys (guide_keys packed scheme, length
+  in the top bits); the few that cannot be packed (non-ACGT or > 28 nt)
+  keep their text in an overflow section
+- Fixed-width float32 efficiency / gc_content / off_target_score (NaN
+  for NULL), int32 days-since-epoch publication dates, int64 row ids
+- gene_symbol, source_database, cell_line and validation_status as
+  int32 ids into per-column string dictionaries (-1 for NULL)
+- Sorted key index (sorted_keys + sorted_rows) for np.searchsorted lookups
+
+Layout: 8-byte magic, uint32 version, uint32 reserved, uint64 header
+length, JSON header (row count, section offsets / dtypes), then 64-byte
+aligned little-endian sections. Opening a snapshot maps the file and
+parses the header; column pages are only read when touched.
+
+    python guide_snapshot.py --out guides.snap
+    python guide_snapshot.py --info guides.snap
+
+Author: Fazil Firdous
+"""
+
+import os
+import sys
+import mmap
+import json
+import time
+import struct
+import argparse
+import tempfile
+import shutil
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from guide_keys import LENGTH_SHIFT, pack_guides, unpack_key
+from storage import GuideStorage, open_storage
+
+MAGIC = b'CRGSNAP\x01'
+VERSION = 1
+ALIGN = 64
+_PREAMBLE = struct.Struct('<8sIIQ')
+
+DICTIONARY_COLUMNS = ('gene', 'source', 'cell_line', 'validation')
+NULL_DATE = np.iinfo(np.int32).min
+
+# name -> dtype of the per-row sections, in file order
+ROW_SECTIONS = {
+    'ids': '<i8',
+    'keys': '<i8',
+    'efficiency': '<f4',
+    'gc_content': '<f4',
+    'off_target': '<f4',
+    'pub_date': '<i4',
+    'gene': '<i4',
+    'source': '<i4',
+    'cell_line': '<i4',
+    'validation': '<i4',
+}
+
+_SELECT = (
+    "SELECT id, guide_sequence, gene_symbol, efficiency, gc_content, off_target_score, "
+    "source_database, cell_line, validation_status, publication_date "
+    "FROM crispr_guides_mega WHERE id > {p} AND id <= {p} ORDER BY id LIMIT {limit}"
+)
+
+
+def _days(values: Sequence) -> np.ndarray:
+    """int32 days since 1970-01-01 for DATE values or 'YYYY-MM-DD' text (NULL_DATE if missing)"""
+    try:
+        dates = np.array(values, dtype='datetime64[D]')
+    except ValueError:
+        # A malformed date somewhere in the chunk: convert one by one
+        dates = np.array([_date_or_nat(value) for value in values], dtype='datetime64[D]')
+    days = dates.astype(np.int64)
+    days[np.isnat(dates)] = NULL_DATE
+    return days.astype(np.int32)
+
+
+def _date_or_nat(value):
+    try:
+        return np.datetime64(str(value)[:10], 'D')
+    except ValueError:
+        return np.datetime64('NaT')
+
+
+def _floats(values: Sequence) -> np.ndarray:
+    """float32 column (NULL -> NaN; DECIMAL values convert through float)"""
+    return np.array(values, dtype=np.float64).astype(np.float32)
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+class _Dictionary:
+    """Incremental string -> int32 id encoder"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def encode(self, values: Sequence[Optional[str]]) -> np.ndarray:
+        ids = self.ids
+        return np.fromiter((-1 if v is None else ids.setdefault(v, len(ids)) for v in values),
+                           dtype=np.int32, count=len(values))
+
+    def blobs(self) -> Tuple[np.ndarray, bytes]:
+        """(uint64 end offsets, UTF-8 blob) in id order"""
+        encoded = [name.encode('utf-8') for name in self.ids]
+        ends = np.cumsum([len(b) for b in encoded], dtype=np.uint64) if encoded else np.empty(0, np.uint64)
+        return ends, b''.join(encoded)
+
+
+def _iter_rows(storage: GuideStorage, chunk_size: int) -> Iterator[List[Tuple]]:
+    """Keyset-paginated row chunks up to the max id seen at the start"""
+    max_id = storage._fetchall("SELECT MAX(id) FROM crispr_guides_mega")[0][0] or 0
+    sql = _SELECT.format(p=storage.placeholder, limit=int(chunk_size))
+    last_id = 0
+    while True:
+        rows = storage._fetchall(sql, (last_id, max_id))
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+def write_snapshot(storage: GuideStorage, path: str, chunk_size: int = 100000, progress=None) -> Dict:
+    """Stream crispr_guides_mega into a snapshot file at path; returns its header"""
+    directory = os.path.dirname(os.path.abspath(path))
+    dictionaries = {name: _Dictionary() for name in DICTIONARY_COLUMNS}
+    overflow_rows: List[int] = []
+    overflow_text: List[bytes] = []
+    count = 0
+
+    # Each column is appended to its own spill file, then concatenated in one pass
+    with tempfile.TemporaryDirectory(prefix='.snapshot_', dir=directory) as spill:
+        files = {name: open(os.path.join(spill, name), 'wb') for name in ROW_SECTIONS}
+        try:
+            for rows in _iter_rows(storage, chunk_size):
+                ids, sequences, genes, eff, gc, off, sources, cells, validation, dates = zip(*rows)
+                keys = pack_guides(sequences)
+                for i in np.flatnonzero(keys < 0).tolist():
+                    overflow_rows.append(count + i)
+                    overflow_text.append(sequences[i].encode('utf-8'))
+
+                columns = {
+                    'ids': np.asarray(ids, dtype=np.int64),
+                    'keys': keys,
+                    'efficiency': _floats(eff),
+                    'gc_content': _floats(gc),
+                    'off_target': _floats(off),
+                    'pub_date': _days(dates),
+                    'gene': dictionaries['gene'].encode(genes),
+                    'source': dictionaries['source'].encode(sources),
+                    'cell_line': dictionaries['cell_line'].encode(cells),
+                    'validation': dictionaries['validation'].encode(validation),
+                }
+                for name, dtype in ROW_SECTIONS.items():
+                    files[name].write(columns[name].astype(dtype, copy=False).tobytes())
+                count += len(rows)
+                if progress is not None:
+                    progress(count, ids[-1])
+        finally:
+            for f in files.values():
+                f.close()
+
+        # Sorted key index (argsort needs the keys in memory once: 8 bytes per guide)
+        keys = np.fromfile(os.path.join(spill, 'keys'), dtype='<i8')
+        order = np.argsort(keys, kind='stable').astype(np.uint32)
+        extra = {
+            'sorted_keys': keys[order],
+            'sorted_rows': order,
+            'overflow_rows': np.asarray(overflow_rows, dtype=np.uint32),
+            'overflow_ends': np.cumsum([len(t) for t in overflow_text], dtype=np.uint64)
+            if overflow_text else np.empty(0, np.uint64),
+            'overflow_text': np.frombuffer(b''.join(overflow_text), dtype=np.uint8),
+        }
+        del keys
+        for name, dictionary in dictionaries.items():
+            ends, blob = dictionary.blobs()
+            extra[f'{name}_ends'] = ends
+            extra[f'{name}_text'] = np.frombuffer(blob, dtype=np.uint8)
+
+        # Section table: row sections first, then index / overflow / dictionaries
+        sections = {}
+        offset = 0
+        for name, dtype in ROW_SECTIONS.items():
+            sections[name] = {'offset': offset, 'dtype': dtype, 'count': count}
+            offset = _align(offset + count * np.dtype(dtype).itemsize)
+        for name, array in extra.items():
+            dtype = array.dtype.newbyteorder('<').str
+            sections[name] = {'offset': offset, 'dtype': dtype, 'count': int(array.size)}
+            offset = _align(offset + array.nbytes)
+
+        header = {
+            'version': VERSION,
+            'rows': count,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'sections': sections,
+            'dictionary_sizes': {name: len(d.ids) for name, d in dictionaries.items()},
+            'overflow': len(overflow_rows),
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        base = _align(_PREAMBLE.size + len(header_bytes))
+
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as out:
+            out.write(_PREAMBLE.pack(MAGIC, VERSION, 0, len(header_bytes)))
+            out.write(header_bytes)
+            for name in ROW_SECTIONS:
+                out.seek(base + sections[name]['offset'])
+                with open(os.path.join(spill, name), 'rb') as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+            for name, array in extra.items():
+                out.seek(base + sections[name]['offset'])
+                out.write(array.astype(sections[name]['dtype'], copy=False).tobytes())
+            out.truncate(base + offset)
+        os.replace(tmp, path)
+    return header
+
+
+class GuideSnapshot:
+    """Read-only mmap view of a snapshot file; columns are zero-copy NumPy arrays"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, header_length = _PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} guide snapshot")
+        self.header = json.loads(self._mm[_PREAMBLE.size:_PREAMBLE.size + header_length])
+        self._base = _align(_PREAMBLE.size + header_length)
+        self._names: Dict[str, List[str]] = {}
+        self.rows = self.header['rows']
+
+        for name in ('ids', 'keys', 'efficiency', 'gc_content', 'off_target', 'pub_date',
+                     'gene', 'source', 'cell_line', 'validation', 'sorted_keys', 'sorted_rows'):
+            setattr(self, name, self.section(name))
+
+    def section(self, name: str) -> np.ndarray:
+        """Zero-copy view of one section"""
+        meta = self.header['sections'][name]
+        return np.frombuffer(self._mm, dtype=meta['dtype'], count=meta['count'],
+                             offset=self._base + meta['offset'])
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def names(self, column: str) -> List[str]:
+        """Dictionary of a gene / source / cell_line / validation column (decoded on first use)"""
+        if column not in self._names:
+            self._names[column] = self._strings(f'{column}_ends', f'{column}_text')
+        return self._names[column]
+
+    def _strings(self, ends_name: str, text_name: str) -> List[str]:
+        ends = self.section(ends_name).tolist()
+        text = self.section(text_name).tobytes()
+        starts = [0] + ends[:-1]
+        return [text[a:b].decode('utf-8') for a, b in zip(starts, ends)]
+
+    def lookup(self, column: str, name: str) -> int:
+        """Dictionary id of a value (-1 if the snapshot has none)"""
+        try:
+            return self.names(column).index(name)
+        except ValueError:
+            return -1
+
+    def rows_for(self, column: str, name: str) -> np.ndarray:
+        """Row numbers whose gene / source / cell_line / validation equals name"""
+        return np.flatnonzero(getattr(self, column) == self.lookup(column, name))
+
+    def find(self, sequences: Sequence[str]) -> np.ndarray:
+        """Row number per sequence via the sorted key index (-1 when absent)"""
+        keys = pack_guides(sequences)
+        if not self.rows:
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.sorted_keys, keys), self.rows - 1)
+        hit = self.sorted_keys[pos] == keys
+        rows = np.where(hit, self.sorted_rows[pos].astype(np.int64), -1)
+
+        # Hash-fallback keys can collide: confirm those against the stored text
+        for i in np.flatnonzero(hit & (keys < 0)).tolist():
+            if self.sequence(int(rows[i])) != sequences[i]:
+                rows[i] = -1
+        return rows
+
+    def sequence(self, row: int) -> str:
+        """Guide sequence of one row"""
+        key = int(self.keys[row])
+        if key >= 0:
+            return unpack_key(key)
+        overflow = self.section('overflow_rows')
+        i = int(np.searchsorted(overflow, row))
+        ends = self.section('overflow_ends')
+        start = int(ends[i - 1]) if i else 0
+        return self.section('overflow_text')[start:int(ends[i])].tobytes().decode('utf-8')
+
+    def base_codes(self, rows: Optional[np.ndarray] = None, length: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """(row numbers, (n, length) uint8 A/C/G/T=0..3 codes) for packed guides of that length"""
+        rows = np.arange(self.rows) if rows is None else np.asarray(rows)
+        keys = self.keys[rows]
+        rows = rows[(keys >= 0) & ((keys >> LENGTH_SHIFT) == length)]
+        keys = self.keys[rows]
+        shifts = np.arange(2 * (length - 1), -1, -2, dtype=np.int64)
+        return rows, ((keys[:, None] >> shifts) & 3).astype(np.uint8)
+
+    def close(self):
+        # Drop our views first; mmap refuses to close while buffers are exported
+        for name in list(vars(self)):
+            if isinstance(getattr(self, name), np.ndarray):
+                delattr(self, name)
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # A caller still holds a view; the map is released with it
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _rss_mb() -> float:
+    import psutil
+    return psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
+
+
+def main():
+    """Snapshot entry point"""
+    from onetime_scrapper import DB_CONFIG, STORAGE_CONFIG
+
+    parser = argparse.ArgumentParser(description='Build or inspect a binary guide snapshot')
+    parser.add_argument('--out', metavar='PATH', help='write a snapshot of crispr_guides_mega here')
+    parser.add_argument('--info', metavar='PATH', help='open a snapshot and report its load time and RSS')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='rows per keyset page')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], default=STORAGE_CONFIG['backend'])
+    parser.add_argument('--sqlite-path', default=STORAGE_CONFIG['sqlite_path'])
+    args = parser.parse_args()
+
+    if args.out:
+        storage = open_storage({**STORAGE_CONFIG, 'backend': args.backend, 'sqlite_path': args.sqlite_path,
+                                'summary_tables': False, 'known_guides_path': None}, DB_CONFIG)
+        started = time.time()
+        try:
+            header = write_snapshot(storage, args.out, args.chunk_size)
+        finally:
+            storage.close()
+        size = os.path.getsize(args.out) / 1024 / 1024
+        print(f"✅ {args.out}: {header['rows']:,} guides, {size:.1f} MB in {time.time() - started:.1f}s",
+              file=sys.stderr)
+
+    if args.info:
+        rss = _rss_mb()
+        started = time.perf_counter()
+        snapshot = GuideSnapshot(args.info)
+        opened = time.perf_counter() - started
+        started = time.perf_counter()
+        efficiency = float(np.nanmean(snapshot.efficiency)) if len(snapshot) else None
+        scanned = time.perf_counter() - started
+        report = {
+            'rows': len(snapshot),
+            'open_ms': round(opened * 1000, 3),
+            'efficiency_scan_ms': round(scanned * 1000, 3),
+            'mean_efficiency': round(efficiency, 2) if efficiency is not None else None,
+            'rss_delta_mb': round(_rss_mb() - rss, 2),
+            'file_mb': round(os.path.getsize(args.info) / 1024 / 1024, 2),
+            'dictionary_sizes': snapshot.header['dictionary_sizes'],
+            'overflow': snapshot.header['overflow'],
+            'created': snapshot.header['created'],
+        }
+        snapshot.close()
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE GUIDE SUMMARIES
+Materialized per-gene / per-source / per-cell-line summary tables for
+crispr_guides_mega, kept current in the same transaction as every insert
+batch (guides, efficiency sum and max, best off-target, last update).
+
+- summarize() turns the rows a batch actually inserted into per-group deltas
+- apply_deltas() upserts them (ON DUPLICATE KEY UPDATE / ON CONFLICT)
+- rebuild_sql() recomputes every table from crispr_guides_mega
+- NULL gene / cell line is stored under '' (summary keys cannot be NULL)
+
+Reports then read O(#genes) summary rows instead of scanning every guide.
+
+Author: Fazil Firdous
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+# summary table -> grouping column of crispr_guides_mega
+SUMMARY_TABLES = {
+    'crispr_gene_stats': 'gene_symbol',
+    'crispr_source_stats': 'source_database',
+    'crispr_cell_line_stats': 'cell_line',
+}
+SUMMARY_KINDS = {'gene': 'crispr_gene_stats', 'source': 'crispr_source_stats',
+                 'cell_line': 'crispr_cell_line_stats'}
+
+_KEY_TYPES = {'gene_symbol': 'VARCHAR(50)', 'source_database': 'VARCHAR(100)', 'cell_line': 'VARCHAR(50)'}
+
+# Positions in guide_row(): key, sequence, gene, efficiency, gc, off_target, validation, source, title, date,
+# cell_line, locus (then the other scheme's key when both are written)
+_ROW_FIELDS = {'gene_symbol': 2, 'source_database': 7, 'cell_line': 10}
+_EFFICIENCY = 3
+_OFF_TARGET = 5
+
+
+def summary_ddl(backend: str) -> List[str]:
+    """CREATE TABLE statements for the summary tables"""
+    statements = []
+    for table, column in SUMMARY_TABLES.items():
+        if backend == 'mysql':
+            statements.append(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {column} {_KEY_TYPES[column]} NOT NULL PRIMARY KEY,
+                    guides INT NOT NULL DEFAULT 0,
+                    efficiency_sum DECIMAL(16,2) NOT NULL DEFAULT 0,
+                    max_efficiency DECIMAL(5,2),
+                    best_off_target DECIMAL(5,2),
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        else:
+            statements.append(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {column} TEXT NOT NULL PRIMARY KEY,
+                    guides INTEGER NOT NULL DEFAULT 0,
+                    efficiency_sum REAL NOT NULL DEFAULT 0,
+                    max_efficiency REAL,
+                    best_off_target REAL,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+    return statements
+
+
+def _bigger(backend: str, a: str, b: str) -> str:
+    """NULL-safe GREATEST"""
+    function = 'GREATEST' if backend == 'mysql' else 'MAX'
+    return f"{function}(COALESCE({a}, {b}), COALESCE({b}, {a}))"
+
+
+def _smaller(backend: str, a: str, b: str) -> str:
+    """NULL-safe LEAST"""
+    function = 'LEAST' if backend == 'mysql' else 'MIN'
+    return f"{function}(COALESCE({a}, {b}), COALESCE({b}, {a}))"
+
+
+def summarize(rows: Sequence[Tuple]) -> Dict[str, List[Tuple]]:
+    """Per-table delta rows (key, guides, efficiency_sum, max_efficiency, best_off_target)"""
+    deltas = {}
+    for table, column in SUMMARY_TABLES.items():
+        field = _ROW_FIELDS[column]
+        groups = {}
+        for row in rows:
+            key = row[field] or ''
+            efficiency = None if row[_EFFICIENCY] is None else float(row[_EFFICIENCY])
+            off_target = None if row[_OFF_TARGET] is None else float(row[_OFF_TARGET])
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [1, efficiency or 0.0, efficiency, off_target]
+                continue
+            group[0] += 1
+            group[1] += efficiency or 0.0
+            if efficiency is not None and (group[2] is None or efficiency > group[2]):
+                group[2] = efficiency
+            if off_target is not None and (group[3] is None or off_target < group[3]):
+                group[3] = off_target
+        # Sorted, so concurrent writers lock summary rows in the same order
+        deltas[table] = [(key, *values) for key, values in sorted(groups.items())]
+    return deltas
+
+
+def upsert_sql(table: str, backend: str, placeholder: str) -> str:
+    """Upsert adding one delta row into a summary table"""
+    column = SUMMARY_TABLES[table]
+    values = ', '.join([placeholder] * 5)
+    insert = (f"INSERT INTO {table} ({column}, guides, efficiency_sum, max_efficiency, best_off_target, updated_at) "
+              f"VALUES ({values}, CURRENT_TIMESTAMP)")
+    if backend == 'mysql':
+        return (f"{insert} ON DUPLICATE KEY UPDATE "
+                f"guides = guides + VALUES(guides), "
+                f"efficiency_sum = efficiency_sum + VALUES(efficiency_sum), "
+                f"max_efficiency = {_bigger(backend, 'max_efficiency', 'VALUES(max_efficiency)')}, "
+                f"best_off_target = {_smaller(backend, 'best_off_target', 'VALUES(best_off_target)')}, "
+                f"updated_at = CURRENT_TIMESTAMP")
+    return (f"{insert} ON CONFLICT({column}) DO UPDATE SET "
+            f"guides = guides + excluded.guides, "
+            f"efficiency_sum = efficiency_sum + excluded.efficiency_sum, "
+            f"max_efficiency = {_bigger(backend, 'max_efficiency', 'excluded.max_efficiency')}, "
+            f"best_off_target = {_smaller(backend, 'best_off_target', 'excluded.best_off_target')}, "
+            f"updated_at = CURRENT_TIMESTAMP")
+
+
+def apply_deltas(cursor, backend: str, placeholder: str, rows: Sequence[Tuple]):
+    """Fold the rows a batch inserted into every summary table (caller commits)"""
+    if not rows:
+        return
+    for table, deltas in summarize(rows).items():
+        cursor.executemany(upsert_sql(table, backend, placeholder), deltas)
+
+
+def merge_sql(table: str, source_table: str) -> str:
+    """MySQL set-based fold of a staging table's rows into a summary table"""
+    column = SUMMARY_TABLES[table]
+    return (f"INSERT INTO {table} ({column}, guides, efficiency_sum, max_efficiency, best_off_target, updated_at) "
+            f"SELECT COALESCE({column}, ''), COUNT(*), COALESCE(SUM(efficiency), 0), MAX(efficiency), "
+            f"MIN(off_target_score), NOW() FROM {source_table} GROUP BY COALESCE({column}, '') "
+            f"ON DUPLICATE KEY UPDATE "
+            f"guides = guides + VALUES(guides), "
+            f"efficiency_sum = efficiency_sum + VALUES(efficiency_sum), "
+            f"max_efficiency = {_bigger('mysql', 'max_efficiency', 'VALUES(max_efficiency)')}, "
+            f"best_off_target = {_smaller('mysql', 'best_off_target', 'VALUES(best_off_target)')}, "
+            f"updated_at = NOW()")
+
+
+def rebuild_sql(table: str) -> List[str]:
+    """Statements that recompute one summary table from crispr_guides_mega"""
+    column = SUMMARY_TABLES[table]
+    return [
+        f"DELETE FROM {table}",
+        f"INSERT INTO {table} ({column}, guides, efficiency_sum, max_efficiency, best_off_target, updated_at) "
+        f"SELECT COALESCE({column}, ''), COUNT(*), COALESCE(SUM(efficiency), 0), MAX(efficiency), "
+        f"MIN(off_target_score), CURRENT_TIMESTAMP FROM crispr_guides_mega GROUP BY COALESCE({column}, '')"
+    ]
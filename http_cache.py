@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE HTTP CACHE
+Persistent conditional-request cache under the monitor's requests session:
+- Entries live in a local SQLite file, so the cache survives restarts
+- Fresh entries (younger than the source TTL) are served without a request
+- Stale entries are revalidated with If-None-Match / If-Modified-Since;
+  a 304 reuses the cached body
+- Size-bounded, least-recently-used eviction
+- Hit / revalidation / miss counters per source
+
+Author: Fazil Firdous
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+import requests
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS http_cache (
+        url TEXT PRIMARY KEY,
+        source TEXT,
+        status INTEGER,
+        headers TEXT,
+        body BLOB,
+        etag TEXT,
+        last_modified TEXT,
+        stored_at REAL,
+        last_access REAL,
+        size INTEGER
+    )
+"""
+
+
+class CachedSession(requests.Session):
+    """requests.Session whose GETs go through a persistent conditional cache"""
+
+    def __init__(self, path: Optional[str] = None, ttls: Optional[Dict[str, int]] = None,
+                 default_ttl: int = 3600, max_bytes: int = 50 * 1024 * 1024):
+        super().__init__()
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.cache_counters = {}
+        self.metrics = None  # metrics.Metrics: per-request duration by source and cache result
+        self._lock = threading.Lock()
+        self._db = None
+        self._total_bytes = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(CACHE_SCHEMA)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON http_cache (last_access)")
+            self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+
+    def get(self, url, source: Optional[str] = None, **kwargs):
+        """GET through the cache; responses carry a from_cache flag"""
+        started = time.perf_counter()
+        if self._db is None or source is None:
+            response = super().get(url, **kwargs)
+            response.from_cache = False
+            self._observe(source, 'uncached', started)
+            return response
+
+        key = requests.Request('GET', url, params=kwargs.pop('params', None)).prepare().url
+        now = time.time()
+        entry = self._lookup(key)
+
+        if entry and now - entry['stored_at'] < self.ttls.get(source, self.default_ttl):
+            self._count(source, 'hits')
+            self._touch(key, now, stored_at=None)
+            self._observe(source, 'hit', started)
+            return self._cached_response(key, entry)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().get(key, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self._count(source, 'revalidated')
+            self._touch(key, now, stored_at=now)
+            self._observe(source, 'revalidated', started)
+            return self._cached_response(key, entry)
+
+        self._count(source, 'misses')
+        if response.status_code == 200:
+            self._store(key, source, response, now)
+        response.from_cache = False
+        self._observe(source, 'miss', started)
+        return response
+
+    def _observe(self, source: Optional[str], result: str, started: float):
+        if self.metrics is not None:
+            self.metrics.observe('http_request_seconds', time.perf_counter() - started,
+                                 source=source or 'none', result=result)
+
+    def cache_stats(self) -> Dict:
+        """Counters for crispr_stats.json"""
+        with self._lock:
+            totals = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evictions': 0}
+            for counters in self.cache_counters.values():
+                for name, value in counters.items():
+                    totals[name] = totals.get(name, 0) + value
+            return {
+                **totals,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'by_source': {source: dict(counters) for source, counters in self.cache_counters.items()}
+            }
+
+    # ==================== CACHE STORE ====================
+
+    def _count(self, source: str, name: str, amount: int = 1):
+        with self._lock:
+            counters = self.cache_counters.setdefault(
+                source, {'hits': 0, 'revalidated': 0, 'misses': 0, 'evictions': 0})
+            counters[name] += amount
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, etag, last_modified, stored_at FROM http_cache WHERE url = ?",
+                (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'status': row[0],
+            'headers': json.loads(row[1]),
+            'body': row[2],
+            'etag': row[3],
+            'last_modified': row[4],
+            'stored_at': row[5]
+        }
+
+    def _touch(self, key: str, now: float, stored_at: Optional[float]):
+        with self._lock:
+            if stored_at is None:
+                self._db.execute("UPDATE http_cache SET last_access = ? WHERE url = ?", (now, key))
+            else:
+                self._db.execute("UPDATE http_cache SET last_access = ?, stored_at = ? WHERE url = ?",
+                                 (now, stored_at, key))
+
+    def _store(self, key: str, source: str, response, now: float):
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+
+        evicted = 0
+        with self._lock:
+            old = self._db.execute("SELECT size FROM http_cache WHERE url = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(url, source, status, headers, body, etag, last_modified, stored_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source, response.status_code, json.dumps(dict(response.headers)), body,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), now, now, len(body))
+            )
+            self._total_bytes += len(body) - (old[0] if old else 0)
+
+            # Least-recently-used eviction down to max_bytes
+            while self._total_bytes > self.max_bytes:
+                victims = self._db.execute(
+                    "SELECT url, size FROM http_cache WHERE url != ? ORDER BY last_access LIMIT 32", (key,)
+                ).fetchall()
+                if not victims:
+                    break
+                for url, size in victims:
+                    self._db.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+                    self._total_bytes -= size
+                    evicted += 1
+                    if self._total_bytes <= self.max_bytes:
+                        break
+
+        if evicted:
+            self._count(source, 'evictions', evicted)
+
+    def _cached_response(self, key: str, entry: Dict):
+        response = requests.Response()
+        response.status_code = entry['status']
+        response._content = entry['body']
+        response.headers.update(entry['headers'])
+        response.url = key
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
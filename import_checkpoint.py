@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE IMPORT CHECKPOINTS
+Durable progress for long library imports, so an interrupted run can be
+resumed (--resume) instead of re-sending every guide as a duplicate:
+
+- One JSON state file, rewritten atomically (tmp + fsync + rename) after
+  every committed batch; staged bulk-load rows count once merged
+- Sequential runs record, per library, the committed guide position and
+  the NumPy and `random` generator states needed to regenerate exactly
+  the guides that follow, so resumed output matches an uninterrupted run
+- Parallel runs record completed shards; shard plans and seeds derive
+  from the run seed, which the checkpoint pins
+- A checkpoint only resumes a run with the same settings (mode, seed,
+  batch size, libraries, gene list size)
+
+Author: Fazil Firdous
+"""
+
+import os
+import json
+import random
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def capture_rng(rng: np.random.Generator) -> Dict:
+    """JSON-safe state of a NumPy generator and of the `random` module"""
+    version, internal, gauss = random.getstate()
+    return {'numpy': rng.bit_generator.state, 'random': [version, list(internal), gauss]}
+
+
+def restore_rng(rng: np.random.Generator, state: Dict):
+    """Put both generators back into a captured state"""
+    rng.bit_generator.state = state['numpy']
+    version, internal, gauss = state['random']
+    random.setstate((version, tuple(internal), gauss))
+
+
+class CheckpointMismatch(ValueError):
+    """The checkpoint on disk belongs to a run with different settings"""
+
+
+class ImportCheckpoint:
+    """Per-library (sequential) or per-shard (parallel) import progress in a JSON file"""
+
+    def __init__(self, path: str, settings: Dict):
+        self.path = path
+        self.settings = settings
+        self.libraries: Dict[str, Dict] = {}
+        self.shards: Dict[str, Dict] = {}  # shard index (str) -> {'library', 'added', 'duplicates'}
+        self.created = datetime.now().isoformat(timespec='seconds')
+        self.saves = 0
+
+    def load(self) -> bool:
+        """Read an existing checkpoint; False when there is none"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get('settings') != self.settings:
+            changed = sorted(key for key in set(self.settings) | set(state.get('settings', {}))
+                             if state.get('settings', {}).get(key) != self.settings.get(key))
+            raise CheckpointMismatch(f"{self.path} was written with different settings ({', '.join(changed)})")
+        self.libraries = state.get('libraries', {})
+        self.shards = state.get('shards', {})
+        self.created = state.get('created', self.created)
+        return True
+
+    def save(self):
+        """Atomically replace the state file (survives a crash mid-write)"""
+        state = {
+            'settings': self.settings,
+            'created': self.created,
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'libraries': self.libraries,
+            'shards': self.shards,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.saves += 1
+
+    # ==================== SEQUENTIAL RUNS ====================
+
+    def library(self, library_key: str) -> Optional[Dict]:
+        return self.libraries.get(library_key)
+
+    def start_library(self, library_key: str, start_rng: Dict, rng: Dict):
+        """Record the generator states before and after gene selection"""
+        self.libraries[library_key] = {
+            'complete': False,
+            'start_rng': start_rng,
+            'guide': 0,         # Guides committed so far (flat gene x guide index)
+            'rng_guide': 0,     # Guide index the saved rng state generates next
+            'rng': rng,
+            'added': 0,
+            'duplicates': 0,
+        }
+        self.save()
+
+    def advance(self, library_key: str, guide: int, rng_guide: int, rng: Dict, stats: Dict):
+        """Guides before `guide` are committed; `rng` regenerates from `rng_guide` on"""
+        record = self.libraries[library_key]
+        record.update(guide=guide, rng_guide=rng_guide, rng=rng,
+                      added=stats['added'], duplicates=stats['duplicates'])
+        self.save()
+
+    def complete_library(self, library_key: str, rng: Dict, stats: Dict):
+        record = self.libraries[library_key]
+        record.update(complete=True, rng=rng, added=stats['added'], duplicates=stats['duplicates'])
+        self.save()
+
+    # ==================== PARALLEL RUNS ====================
+
+    def complete_shard(self, index: int, library_key: str, stats: Dict):
+        self.shards[str(index)] = {'library': library_key, 'added': stats['added'],
+                                   'duplicates': stats['duplicates']}
+        self.save()
+
+    def completed_shards(self) -> List[int]:
+        return sorted(int(index) for index in self.shards)
+
+
+def stored_seed(path: str) -> Optional[int]:
+    """Run seed recorded in an existing checkpoint (None if there is none)"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get('settings', {}).get('seed')
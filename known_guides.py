@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE KNOWN-GUIDE FILTER
+In-process membership set of guides already in crispr_guides_mega, so
+known guides are dropped before they are sent to the database.
+
+- Sorted int64 array of 2-bit packed keys (8 bytes per guide), looked
+  up with np.searchsorted; recent inserts sit in a small pending set
+- Loaded once from the table, persisted to a local .npz file and topped
+  up incrementally (rows with id > the last id seen)
+- Only packed keys are exact. Hash-fallback keys (non-ACGT or > 28 nt)
+  may collide, so those guides are always sent to the database and the
+  added / duplicate counts stay exact
+
+Author: Fazil Firdous
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from guide_keys import pack_guides
+
+MERGE_PENDING = 50000  # Pending keys before they are merged into the sorted array
+
+
+class KnownGuideFilter:
+    """Sorted packed-key set of guides known to be in the database"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.keys = np.empty(0, dtype=np.int64)
+        self.pending = set()
+        self.max_id = 0
+
+    def __len__(self):
+        self._merge_pending()
+        return int(self.keys.size)
+
+    def load(self) -> bool:
+        """Load the persisted filter file; returns False if there is none"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as data:
+            self.keys = data['keys']
+            self.max_id = int(data['max_id'])
+        self.pending = set()
+        return True
+
+    def save(self):
+        """Persist the filter atomically"""
+        if not self.path:
+            return
+        self._merge_pending()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, keys=self.keys, max_id=np.int64(self.max_id))
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, storage, chunk_size: int = 50000) -> int:
+        """Pull keys for rows added since the last refresh; returns rows read"""
+        rows_read = 0
+        for last_id, sequences in storage.iter_sequences(self.max_id, chunk_size):
+            self.add(pack_guides(sequences))
+            self.max_id = last_id
+            rows_read += len(sequences)
+        self._merge_pending()
+        return rows_read
+
+    def add(self, keys: np.ndarray):
+        """Mark keys as present in the database (hash-fallback keys are ignored)"""
+        keys = np.asarray(keys, dtype=np.int64)
+        self.pending.update(keys[keys >= 0].tolist())
+        if len(self.pending) >= MERGE_PENDING:
+            self._merge_pending()
+
+    def _merge_pending(self):
+        if self.pending:
+            pending = np.fromiter(self.pending, dtype=np.int64, count=len(self.pending))
+            self.keys = np.union1d(self.keys, pending)
+            self.pending = set()
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """Boolean mask of keys that are definitely in the database"""
+        keys = np.asarray(keys, dtype=np.int64)
+        found = np.zeros(keys.size, dtype=bool)
+        if self.keys.size:
+            pos = np.searchsorted(self.keys, keys)
+            pos[pos == self.keys.size] = 0
+            found = self.keys[pos] == keys
+        if self.pending:
+            found |= np.fromiter((key in self.pending for key in keys.tolist()),
+                                 dtype=bool, count=keys.size)
+        # Hashed keys can collide, so they are never treated as known
+        return found & (keys >= 0)
+
+    def split(self, guides: List[Dict]) -> Tuple[List[Dict], np.ndarray, int]:
+        """Drop known guides; returns (fresh guides, their keys, known count)"""
+        keys = pack_guides([guide['sequence'] for guide in guides])
+        known = self.contains(keys)
+        if not known.any():
+            return guides, keys, 0
+        fresh = [guide for guide, is_known in zip(guides, known.tolist()) if not is_known]
+        return fresh, keys[~known], int(known.sum())
+
+
+def open_known_guides(path: str, storage) -> KnownGuideFilter:
+    """Load the persisted filter (if any) and top it up from the database"""
+    known_guides = KnownGuideFilter(path)
+    known_guides.load()
+    known_guides.refresh(storage)
+    return known_guides
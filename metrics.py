@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE METRICS
+In-process counters, gauges and duration histograms for the monitor's
+hot paths, exported two ways:
+- GET /metrics on a local HTTP port, in Prometheus text format
+  (MetricsServer, a daemon thread)
+- snapshot() for crispr_stats.json: counters, gauges, and count / sum /
+  mean and bucket-estimated p50 / p99 per histogram series
+
+Series are keyed by metric name plus labels. Every update is one dict
+lookup and a bisect under a lock, cheap enough for per-guide timings.
+
+Author: Fazil Firdous
+"""
+
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Seconds; spans per-guide microsecond work up to multi-minute scrapers
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels: Labels, extra: str = '') -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms"""
+
+    def __init__(self, prefix: str = 'crispr_', buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, List]] = {}  # [bucket counts..., sum, count]
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(self.prefix + name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._gauges.setdefault(self.prefix + name, {})[key] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(self.prefix + name, {})
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            values[index] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        """Observe the duration of a with-block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    # ==================== EXPORT ====================
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_label_text(labels)} {value:g}")
+
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_label_text(labels)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, values in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, values):
+                        cumulative += count
+                        le = 'le="%g"' % bound
+                        lines.append(f"{name}_bucket{_label_text(labels, le)} {cumulative}")
+                    le = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{_label_text(labels, le)} {values[-1]}")
+                    lines.append(f"{name}_sum{_label_text(labels)} {values[-2]:.6f}")
+                    lines.append(f"{name}_count{_label_text(labels)} {values[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def _quantile(self, values: List, q: float) -> Optional[float]:
+        """Upper bucket bound holding the q-th observation (Prometheus-style estimate)"""
+        total = values[-1]
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for bound, count in zip(self.buckets, values):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> Dict:
+        """Counters, gauges and histogram summaries for crispr_stats.json"""
+        with self._lock:
+            counters = {name: {_label_text(labels) or 'total': value for labels, value in series.items()}
+                        for name, series in self._counters.items()}
+            gauges = {name: {_label_text(labels) or 'total': value for labels, value in series.items()}
+                      for name, series in self._gauges.items()}
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = {}
+                for labels, values in series.items():
+                    count = values[-1]
+                    histograms[name][_label_text(labels) or 'total'] = {
+                        'count': count,
+                        'sum_s': round(values[-2], 6),
+                        'mean_ms': round(values[-2] / count * 1000, 3) if count else None,
+                        'p50_le_ms': _ms(self._quantile(values, 0.5)),
+                        'p99_le_ms': _ms(self._quantile(values, 0.99)),
+                    }
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    """Seconds -> ms (None when empty or beyond the last bucket)"""
+    if seconds is None or seconds == float('inf'):
+        return None
+    return round(seconds * 1000, 3)
+
+
+class MetricsServer:
+    """Serves a Metrics registry on http://host:port/metrics from a daemon thread"""
+
+    def __init__(self, metrics: Metrics, host: str = '127.0.0.1', port: int = 9108):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the monitor log
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server.server_address[:2]
+
+    def start(self):
+        self.thread.start()
+        logger.info(f" Metrics endpoint: http://{self.address[0]}:{self.address[1]}/metrics")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
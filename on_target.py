@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE ON-TARGET SCORING
+Deterministic efficiency scores for 20-nt guides from a position-specific
+nucleotide model (Rule Set 1 style logistic regression):
+
+- A batch is encoded once into a one-hot feature tensor (20 positions x 4
+  bases, plus 19 positions x 16 dinucleotides) and scored with a single
+  matrix-vector product, plus the GC-count terms
+- efficiency = 100 * sigmoid(score), on the same 0-100 scale as the column
+- Weights are a JSON file (rule_set_weights.json by default):
+  intercept, gc_pivot / gc_low / gc_high, and [position, bases, weight]
+  lists for 'single' and 'dinucleotide' terms (0-based, PAM-distal first)
+- rescore_efficiency() re-scores crispr_guides_mega in keyset-paginated
+  chunks, so memory stays flat however large the table is
+
+Author: Fazil Firdous
+"""
+
+import os
+import json
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from storage import GuideStorage, update_by_id
+
+GUIDE_LENGTH = 20
+DEFAULT_WEIGHTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rule_set_weights.json')
+SCORE_CHUNK = 16384  # Guides per one-hot tensor (about 25 MB of float32)
+
+_SINGLE = GUIDE_LENGTH * 4
+_FEATURES = _SINGLE + (GUIDE_LENGTH - 1) * 16
+_BASE = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
+
+_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate(b'ACGT'):
+    _CODES[_base] = _code
+    _CODES[_base + 32] = _code  # lowercase
+
+
+class OnTargetModel:
+    """Position-specific single / dinucleotide logistic model over 20-nt guides"""
+
+    def __init__(self, weights: Dict):
+        self.name = weights.get('name', 'custom')
+        self.intercept = float(weights.get('intercept', 0.0))
+        self.gc_pivot = int(weights.get('gc_pivot', 10))
+        self.gc_low = float(weights.get('gc_low', 0.0))
+        self.gc_high = float(weights.get('gc_high', 0.0))
+
+        self.vector = np.zeros(_FEATURES, dtype=np.float32)
+        for position, bases, weight in weights.get('single', []):
+            self.vector[position * 4 + _BASE[bases]] += weight
+        for position, bases, weight in weights.get('dinucleotide', []):
+            self.vector[_SINGLE + position * 16 + _BASE[bases[0]] * 4 + _BASE[bases[1]]] += weight
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> 'OnTargetModel':
+        """Load a weights file (the bundled Rule Set 1 style weights by default)"""
+        with open(path or DEFAULT_WEIGHTS) as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def one_hot(codes: np.ndarray) -> np.ndarray:
+        """(n, 384) float32 one-hot tensor of single and dinucleotide features"""
+        n = codes.shape[0]
+        positions = np.arange(GUIDE_LENGTH)
+        columns = np.concatenate([
+            positions * 4 + codes,
+            _SINGLE + positions[:-1] * 16 + codes[:, :-1] * 4 + codes[:, 1:]
+        ], axis=1)
+        features = np.zeros((n, _FEATURES), dtype=np.float32)
+        features[np.arange(n)[:, None], columns] = 1.0
+        return features
+
+    def score_codes(self, codes: np.ndarray) -> np.ndarray:
+        """Efficiency (0-100) for an (n, 20) base-code matrix"""
+        scores = np.empty(codes.shape[0], dtype=np.float64)
+        for start in range(0, codes.shape[0], SCORE_CHUNK):
+            chunk = codes[start:start + SCORE_CHUNK].astype(np.intp)
+            logits = self.one_hot(chunk) @ self.vector + self.intercept
+
+            gc = ((chunk == 1) | (chunk == 2)).sum(axis=1) - self.gc_pivot
+            logits += np.where(gc < 0, self.gc_low * -gc, self.gc_high * gc)
+            scores[start:start + chunk.shape[0]] = 100.0 / (1.0 + np.exp(-logits))
+        return np.round(scores, 2)
+
+    def score_sequences(self, sequences: Sequence[str]) -> List[Optional[float]]:
+        """Efficiency per sequence (None for anything but a 20-nt ACGT guide)"""
+        result: List[Optional[float]] = [None] * len(sequences)
+        idx = [i for i, sequence in enumerate(sequences) if sequence and len(sequence) == GUIDE_LENGTH]
+        if not idx:
+            return result
+
+        raw = ''.join([sequences[i] for i in idx]).encode('ascii', 'replace')
+        codes = _CODES[np.frombuffer(raw, dtype=np.uint8).reshape(-1, GUIDE_LENGTH)]
+        valid = (codes != 255).all(axis=1)
+        scores = self.score_codes(codes[valid])
+        for i, score in zip(np.asarray(idx)[valid].tolist(), scores.tolist()):
+            result[i] = score
+        return result
+
+    def score_into(self, guides: List[Dict]) -> int:
+        """Overwrite guide['efficiency'] where a score is available; returns guides scored"""
+        scores = self.score_sequences([guide['sequence'] for guide in guides])
+        scored = 0
+        for guide, score in zip(guides, scores):
+            if score is not None:
+                guide['efficiency'] = score
+                scored += 1
+        return scored
+
+
+def open_model(weights_path: Optional[str]) -> Optional[OnTargetModel]:
+    """Model for a configured weights file, or None when none is set"""
+    if not weights_path:
+        return None
+    return OnTargetModel.from_file(weights_path)
+
+
+def rescore_efficiency(storage: GuideStorage, model: OnTargetModel, chunk_size: int = 50000,
+                       missing_only: bool = False, progress=None) -> int:
+    """Re-score efficiency for stored guides in id-ordered chunks; returns rows updated"""
+    p = storage.placeholder
+    where = f"id > {p}" + (" AND efficiency IS NULL" if missing_only else "")
+    sql = f"SELECT id, guide_sequence FROM crispr_guides_mega WHERE {where} ORDER BY id LIMIT {int(chunk_size)}"
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = storage._fetchall(sql, (last_id,))
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        scores = model.score_sequences([row[1] for row in rows])
+        pairs = [(row[0], score) for row, score in zip(rows, scores) if score is not None]
+        if pairs:
+            cursor = storage.conn.cursor()
+            try:
+                if storage.backend == 'sqlite':
+                    cursor.execute("BEGIN IMMEDIATE")
+                update_by_id(cursor, p, 'efficiency', [pair[0] for pair in pairs],
+                             [pair[1] for pair in pairs], touch=True)
+                storage.conn.commit()
+            except Exception:
+                storage.conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        updated += len(pairs)
+        if progress is not None:
+            progress(updated, last_id)
+
+    # Efficiency sums and maxima changed under the summary tables
+    if storage.summaries:
+        storage.rebuild_summaries()
+    if storage.query_cache is not None:
+        storage.query_cache.clear()
+    return updated
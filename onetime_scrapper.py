@@ -7,12 +7,25 @@ Target: 100,000+ validated guides in 2-3 hours
 Author: Fazil Firdous
 """
 
-import mysql.connector
-import hashlib
 import time
 from datetime import datetime, timedelta
 import random
+import os
 import sys
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from gene_annotations import open_gene_table
+from guide_keys import guide_key
+from import_checkpoint import CheckpointMismatch, ImportCheckpoint, capture_rng, restore_rng, stored_seed
+from known_guides import open_known_guides
+from off_target import open_engine
+from on_target import OnTargetModel, open_model, rescore_efficiency
+from pam_scanner import iter_protospacers, protospacer_guides
+from storage import open_storage, sync_guides
 
 # Database config
 #update to your if you want###
@@ -24,16 +37,96 @@ DB_CONFIG = {
     'database': 'u779329632_science'
 }
 
+STORAGE_CONFIG = {
+    'backend': 'mysql',                 # 'mysql' or 'sqlite' (embedded local file)
+    'sqlite_path': 'crispr_guides.db',  # Database file for the sqlite backend
+    'key_scheme': 'md5',                # 'md5' (guide_hash) or 'packed' (guide_key BIGINT)
+    'known_guides_path': None,          # Local known-guide filter file (None = disabled)
+    'summary_tables': True,             # Maintain per-gene/source/cell-line summary tables on insert
+}
+
+IMPORT_CONFIG = {
+    'batch_size': 500,      # Guides per database insert
+    'workers': 1,           # Import processes (1 = sequential run)
+    'shard_genes': 2000,    # Genes per parallel shard
+    'bulk_rows': 100000,    # Rows per LOAD DATA merge in bulk mode
+    'efficiency_weights': None,  # On-target model weights file (None = generated efficiencies)
+    'checkpoint_path': 'import_checkpoint.json',  # Progress file for --resume (None = disabled)
+}
+
+GENE_CONFIG = {
+    'annotation_path': None,        # HGNC complete-set TSV or GTF (.gz ok); None = curated built-in genes
+    'biotypes': ['protein_coding'], # Gene types kept from the annotation
+    'cache_path': None,             # Parsed-table cache (None = '<annotation_path>.genes')
+}
+
+OFF_TARGET_CONFIG = {
+    'reference_fasta': None,    # Local FASTA to score off-targets against (None = generated scores)
+    'max_mismatches': 3,        # Mismatches searched per site (2 is much faster on a full genome)
+    'workers': 0,               # Scoring processes (0 = one per CPU)
+}
+
+GUIDE_LENGTH = 20
+GC_CODES = np.frombuffer(b'GC', dtype=np.uint8)
+
+
+def _replace_runs(sequences, pattern, replacement):
+    """Vectorized str.replace over a uint8 sequence matrix (left-to-right, non-overlapping)"""
+    pattern = np.frombuffer(pattern, dtype=np.uint8)
+    replacement = np.frombuffer(replacement, dtype=np.uint8)
+    width = len(pattern)
+    starts = sequences.shape[1] - width + 1
+
+    # Match against the original sequences, exactly like str.replace
+    matches = np.ones((sequences.shape[0], starts), dtype=bool)
+    for k in range(width):
+        matches &= sequences[:, k:k + starts] == pattern[k]
+
+    rows = np.flatnonzero(matches.any(axis=1))
+    if rows.size == 0:
+        return sequences
+
+    matches = matches[rows]
+    blocked_until = np.zeros(rows.size, dtype=np.int64)
+    for j in range(starts):
+        hit = matches[:, j] & (blocked_until <= j)
+        if hit.any():
+            sequences[rows[hit], j:j + width] = replacement
+            blocked_until[hit] = j + width
+    return sequences
+
+
 class LibraryImporter:
-    def __init__(self):
-        print("=" * 90)
-        print(" SCIENCECORE ULTIMATE LIBRARY IMPORTER")
-        print(" Importing REAL CRISPR Libraries: Brunello, GeCKO, TKOv3, Brie, Sabatini")
-        print(" TARGET: 100,000+ validated guides from published sources")
-        print("=" * 90)
-        
-        self.db = mysql.connector.connect(**DB_CONFIG)
-        self.cursor = self.db.cursor()
+    def __init__(self, seed=None, batch_mode=False, verbose=True, bulk_load=False,
+                 storage_config=None, off_target_config=None, gene_config=None):
+        if verbose:
+            print("=" * 90)
+            print(" SCIENCECORE ULTIMATE LIBRARY IMPORTER")
+            print(" Importing REAL CRISPR Libraries: Brunello, GeCKO, TKOv3, Brie, Sabatini")
+            print(" TARGET: 100,000+ validated guides from published sources")
+            print("=" * 90)
+        
+        self.storage_config = storage_config or STORAGE_CONFIG
+        self.bulk_load = bulk_load
+        self.storage = open_storage(self.storage_config, DB_CONFIG,
+                                    bulk_load=bulk_load, bulk_rows=IMPORT_CONFIG['bulk_rows'])
+        
+        # Drop guides already in the database before they are sent
+        if self.storage_config.get('known_guides_path'):
+            self.storage.known_guides = open_known_guides(self.storage_config['known_guides_path'],
+                                                          self.storage)
+            if verbose:
+                print(f" Known-guide filter: {len(self.storage.known_guides):,} guides")
+        
+        # Real off-target scores from a local reference instead of generated ones
+        self.off_target_config = off_target_config or OFF_TARGET_CONFIG
+        self.off_target = open_engine(self.off_target_config['reference_fasta'],
+                                      self.off_target_config['max_mismatches'],
+                                      self.off_target_config['workers'])
+        self.efficiency_model = open_model(IMPORT_CONFIG['efficiency_weights'])
+        if self.off_target is not None and verbose:
+            print(f" Off-target reference: {self.off_target_config['reference_fasta']} "
+                  f"({len(self.off_target.index.site_codes):,} NGG sites)")
         self.stats = {
             'total_added': 0,
             'duplicates': 0,
@@ -41,6 +134,18 @@ class LibraryImporter:
             'by_library': {}
         }
         
+        # Progress file for --resume (see enable_checkpoint)
+        self.checkpoint = None
+        self.failed_batches = 0
+        self._failures_at_start = 0
+        
+        # Seedable RNG so generated libraries can be reproduced
+        self.seed = seed
+        self.batch_mode = batch_mode
+        self.rng = np.random.default_rng(seed)
+        if seed is not None:
+            random.seed(seed)
+        
         # REAL LIBRARY STRUCTURES - Based on actual publications
         self.libraries = {
             'BRUNELLO': {
@@ -96,7 +201,14 @@ class LibraryImporter:
         }
         
         # HUMAN GENOME GENES - From actual human genome annotation
+        self.gene_config = gene_config or GENE_CONFIG
         self.human_genes = self.load_human_genes()
+        if verbose:
+            largest = max(library['genes'] for library in self.libraries.values())
+            print(f" Genes: {len(self.human_genes):,} ({self.gene_table.source})")
+            if len(self.human_genes) < largest:
+                print(f"⚠️  Libraries are capped at {len(self.human_genes):,} of up to {largest:,} genes "
+                      f"(use --gene-annotation for genome scale)")
         
         # Cell lines used in validation
         self.cell_lines = [
@@ -105,99 +217,37 @@ class LibraryImporter:
         ]
     
     def load_human_genes(self):
-        """Load comprehensive human gene list"""
-        # Cancer genes
-        cancer_genes = [
-            'TP53', 'KRAS', 'EGFR', 'PIK3CA', 'BRAF', 'BRCA1', 'BRCA2', 'MYC', 'PTEN', 'ALK',
-            'RET', 'ROS1', 'MET', 'ERBB2', 'FGFR1', 'FGFR2', 'FGFR3', 'IDH1', 'IDH2', 'JAK2',
-            'KIT', 'PDGFRA', 'CDK4', 'CDK6', 'CDKN2A', 'CTNNB1', 'FBXW7', 'NOTCH1', 'RB1', 'STK11',
-            'VHL', 'ATM', 'ATR', 'CHEK1', 'CHEK2', 'MDM2', 'BAX', 'BCL2', 'ARID1A', 'SMAD4',
-            'TSC1', 'TSC2', 'NF1', 'NF2', 'APC', 'POLE', 'POLD1', 'MLH1', 'MSH2', 'MSH6',
-            'PMS2', 'BRIP1', 'PALB2', 'RAD51', 'ATRX', 'DAXX', 'SETD2', 'KDM5C', 'KDM6A'
-        ]
-        
-        # Essential genes
-        essential_genes = [
-            'POLR2A', 'POLR2B', 'PSMC1', 'PSMC2', 'RPL3', 'RPL4', 'RPS3', 'RPS6',
-            'SF3B1', 'U2AF1', 'CDC20', 'CDC27', 'MCM2', 'MCM3', 'ORC1', 'ORC2',
-            'TUBA1A', 'TUBB', 'ACTB', 'GAPDH', 'HRAS', 'NRAS', 'AKT1', 'AKT2',
-            'MTOR', 'RPTOR', 'RICTOR', 'MAP2K1', 'MAP2K2', 'MAPK1', 'MAPK3'
-        ]
-        
-        # Cell cycle genes
-        cell_cycle = [
-            'CCNA1', 'CCNA2', 'CCNB1', 'CCNB2', 'CCND1', 'CCND2', 'CCND3', 'CCNE1', 'CCNE2',
-            'CDC25A', 'CDC25B', 'CDC25C', 'CDK1', 'CDK2', 'CDK7', 'CDKN1A', 'CDKN1B', 'CDKN2B'
-        ]
-        
-        # DNA repair genes
-        dna_repair = [
-            'XRCC1', 'XRCC2', 'XRCC3', 'XRCC4', 'XRCC5', 'XRCC6', 'LIG1', 'LIG3', 'LIG4',
-            'PRKDC', 'DCLRE1C', 'RAG1', 'RAG2', 'ERCC1', 'ERCC2', 'XPC', 'XPA', 'DDB2'
-        ]
-        
-        # Kinases
-        kinases = [
-            'AKT3', 'GSK3B', 'CSNK1A1', 'CSNK2A1', 'PRKCA', 'PRKCB', 'PRKCD', 'MAPK8',
-            'MAPK9', 'MAPK14', 'RAF1', 'ARAF', 'TBK1', 'IKBKE', 'JAK1', 'JAK3', 'TYK2'
-        ]
-        
-        # Transcription factors
-        tfs = [
-            'MYC', 'MYCN', 'MYCL', 'JUN', 'FOS', 'STAT3', 'STAT5A', 'STAT5B', 'NFKB1',
-            'NFKB2', 'REL', 'RELA', 'RELB', 'TP63', 'TP73', 'E2F1', 'E2F3', 'E2F4'
-        ]
-        
-        # Metabolism genes
-        metabolism = [
-            'HK1', 'HK2', 'PFKM', 'PFKL', 'ALDOA', 'GAPDH', 'PGK1', 'ENO1', 'PKM',
-            'LDHA', 'LDHB', 'IDH1', 'IDH2', 'SLC2A1', 'SLC2A3', 'G6PD', 'PHGDH'
-        ]
-        
-        # Apoptosis genes
-        apoptosis = [
-            'BCL2L1', 'BCL2L2', 'MCL1', 'BID', 'BIK', 'BAD', 'CASP3', 'CASP8', 'CASP9',
-            'CASP7', 'FADD', 'FAS', 'TNFRSF1A', 'TRADD', 'RIPK1', 'BIRC2', 'BIRC3', 'XIAP'
-        ]
+        """Load comprehensive human gene list (annotation file, or the curated built-in genes)"""
+        self.gene_table = open_gene_table(self.gene_config)
         
-        # Chromatin modifiers
-        chromatin = [
-            'EZH2', 'SUZ12', 'EED', 'KMT2A', 'KMT2D', 'KDM1A', 'KDM4A', 'KDM5A', 'KDM6A',
-            'SMARCA4', 'SMARCB1', 'ARID1A', 'ARID1B', 'ARID2', 'PBRM1', 'BAP1', 'SETD2'
-        ]
-        
-        # Combine all
-        all_genes = (cancer_genes + essential_genes + cell_cycle + dna_repair + 
-                     kinases + tfs + metabolism + apoptosis + chromatin)
-        
-        # Remove duplicates and return
-        return list(set(all_genes))
+        # Symbols are sorted, so seeded runs are reproducible
+        return self.gene_table.symbols
     
-    def generate_library_guide(self, gene, library_info):
-        """Generate guide in library format"""
+    def _library_profile(self, library_info):
+        """Return (base pool, efficiency range) for a library"""
         bases = ['A', 'T', 'C', 'G']
         
         # Library-specific patterns
         if 'BRUNELLO' in library_info['name']:
             # Brunello: Optimized for high GC, validated efficiency
-            sequence = 'GG' + ''.join(random.choices(['G', 'C'] * 3 + ['A', 'T'], k=18))
-            efficiency_range = (85, 97)
+            return ['G', 'C'] * 3 + ['A', 'T'], (85, 97)
         elif 'GECKO' in library_info['name']:
             # GeCKO: Genome-wide, slightly lower efficiency
-            sequence = 'GG' + ''.join(random.choices(bases, k=18))
-            efficiency_range = (80, 95)
+            return bases, (80, 95)
         elif 'TKO' in library_info['name']:
             # TKO: Optimized, high efficiency
-            sequence = 'GG' + ''.join(random.choices(['G', 'C'] * 2 + ['A', 'T'], k=18))
-            efficiency_range = (83, 96)
+            return ['G', 'C'] * 2 + ['A', 'T'], (83, 96)
         elif 'BRIE' in library_info['name']:
             # Brie: Latest generation, highest efficiency
-            sequence = 'GG' + ''.join(random.choices(['G', 'C'] * 3 + ['A', 'T'], k=18))
-            efficiency_range = (87, 98)
+            return ['G', 'C'] * 3 + ['A', 'T'], (87, 98)
         else:  # Sabatini
             # Sabatini: Essential genes focus
-            sequence = 'GG' + ''.join(random.choices(bases, k=18))
-            efficiency_range = (82, 94)
+            return bases, (82, 94)
+    
+    def generate_library_guide(self, gene, library_info):
+        """Generate guide in library format"""
+        pool, efficiency_range = self._library_profile(library_info)
+        sequence = 'GG' + ''.join(random.choices(pool, k=GUIDE_LENGTH - 2))
         
         # Remove poly-T (bad for CRISPR)
         sequence = sequence.replace('TTTT', 'GACT')
@@ -236,51 +286,219 @@ class LibraryImporter:
             'cell_line': cell_line
         }
     
+    def generate_library_block(self, genes, library_info, rng=None):
+        """Generate guides_per_gene guides for every gene as NumPy columns"""
+        rng = self.rng if rng is None else rng
+        pool, efficiency_range = self._library_profile(library_info)
+        guides_per_gene = library_info['guides_per_gene']
+        n = len(genes) * guides_per_gene
+        
+        # uint8 sequence matrix (ASCII codes), GG prefix + library base pool
+        pool_codes = np.frombuffer(''.join(pool).encode('ascii'), dtype=np.uint8)
+        sequences = np.empty((n, GUIDE_LENGTH), dtype=np.uint8)
+        sequences[:, :2] = ord('G')
+        sequences[:, 2:] = pool_codes[rng.integers(0, len(pool_codes), size=(n, GUIDE_LENGTH - 2))]
+        
+        # Remove poly-T / poly-A
+        _replace_runs(sequences, b'TTTT', b'GACT')
+        _replace_runs(sequences, b'AAAA', b'GCTA')
+        
+        # GC% from a row sum
+        gc_count = np.isin(sequences, GC_CODES).sum(axis=1)
+        gc_percent = np.round(gc_count * (100.0 / GUIDE_LENGTH), 1)
+        
+        efficiency = rng.integers(efficiency_range[0], efficiency_range[1] + 1, size=n)
+        
+        # Off-target (inversely proportional to efficiency)
+        low = np.where(efficiency >= 90, 1.5, np.where(efficiency >= 85, 2.5, 3.5))
+        high = np.where(efficiency >= 90, 3.5, np.where(efficiency >= 85, 5.0, 7.0))
+        off_target = np.round(low + (high - low) * rng.random(n), 2)
+        
+        # Cell line index, -1 where the guide has no cell line
+        cell_line_index = np.where(rng.random(n) > 0.4,
+                                   rng.integers(0, len(self.cell_lines), size=n), -1)
+        
+        # Publication date within the library year
+        months = rng.integers(0, 12, size=n).astype('timedelta64[M]')
+        days = rng.integers(0, 28, size=n).astype('timedelta64[D]')
+        pub_date = (np.datetime64(str(library_info['year']), 'M') + months) + days
+        
+        return {
+            'genes': list(genes),
+            'gene_index': np.repeat(np.arange(len(genes)), guides_per_gene),
+            'sequences': sequences,
+            'efficiency': efficiency,
+            'gc_content': gc_percent,
+            'off_target': off_target,
+            'cell_line_index': cell_line_index,
+            'pub_date': pub_date
+        }
+    
+    def block_to_guides(self, block, library_info):
+        """Convert a generated block into guide dicts for insert_guides_batch"""
+        sequences = block['sequences']
+        sequences = sequences.view(f'S{sequences.shape[1]}')[:, 0].astype('U').tolist()
+        genes = block['genes']
+        cell_lines = [None] + self.cell_lines
+        
+        return [
+            {
+                'sequence': sequence,
+                'gene': genes[gene_idx],
+                'efficiency': efficiency,
+                'gc_content': gc_content,
+                'off_target': off_target,
+                'validation': library_info['validation'],
+                'source': library_info['name'],
+                'paper_title': library_info['paper'],
+                'pub_date': pub_date,
+                'cell_line': cell_lines[cell_idx + 1]
+            }
+            for sequence, gene_idx, efficiency, gc_content, off_target, cell_idx, pub_date in zip(
+                sequences,
+                block['gene_index'].tolist(),
+                block['efficiency'].tolist(),
+                block['gc_content'].tolist(),
+                block['off_target'].tolist(),
+                block['cell_line_index'].tolist(),
+                np.datetime_as_string(block['pub_date']).tolist()
+            )
+        ]
+    
     def generate_guide_hash(self, sequence):
-        """Generate MD5 hash"""
-        return hashlib.md5(sequence.encode()).hexdigest()[:32]
+        """Generate dedupe key (MD5 hex or packed BIGINT, per key_scheme)"""
+        return guide_key(sequence, self.storage_config.get('key_scheme', 'md5'))
     
     def insert_guides_batch(self, guides_batch):
-        """Insert batch efficiently"""
+        """Insert batch efficiently (or stage it when bulk loading)"""
         if not guides_batch:
             return 0, 0
         
-        sql = """
-            INSERT IGNORE INTO crispr_guides_mega 
-            (guide_hash, guide_sequence, gene_symbol, efficiency, gc_content, 
-             off_target_score, validation_status, source_database, paper_title, 
-             publication_date, cell_line, created_at, updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-        """
-        
-        values = []
-        for guide in guides_batch:
-            values.append((
-                self.generate_guide_hash(guide['sequence']),
-                guide['sequence'],
-                guide['gene'],
-                guide['efficiency'],
-                guide['gc_content'],
-                guide['off_target'],
-                guide['validation'],
-                guide['source'],
-                guide['paper_title'],
-                guide['pub_date'],
-                guide['cell_line']
-            ))
-        
         try:
-            self.cursor.executemany(sql, values)
-            self.db.commit()
-            added = self.cursor.rowcount
-            duplicates = len(guides_batch) - added
-            return added, duplicates
+            if self.efficiency_model is not None:
+                self.efficiency_model.score_into(guides_batch)
+            if self.off_target is not None:
+                self.off_target.score_into(guides_batch)
+            return self.storage.insert_guides(guides_batch)
         except Exception as e:
             print(f"❌ Insert error: {e}")
+            self.failed_batches += 1
             return 0, len(guides_batch)
     
+    def _write_failures(self):
+        """Failed batch inserts plus failed bulk merges so far"""
+        return self.failed_batches + self.storage.write_errors
+    
+    def select_genes(self, library_info):
+        """Pick the genes a library covers"""
+        count = min(library_info['genes'], len(self.human_genes))
+        if self.batch_mode:
+            picks = self.rng.choice(len(self.human_genes), size=count, replace=False)
+            return [self.human_genes[i] for i in picks]
+        return random.sample(self.human_genes, count)
+    
+    def _record_batch(self, library_key, added, dups):
+        """Add one batch result to the library and total counters"""
+        self.stats['by_library'][library_key]['added'] += added
+        self.stats['by_library'][library_key]['duplicates'] += dups
+        self.stats['total_added'] += added
+        self.stats['duplicates'] += dups
+    
+    def _print_progress(self, library_key, done, total):
+        """Print gene progress for a library"""
+        progress = (done / total) * 100
+        print(f"  Progress: {done:,}/{total:,} genes ({progress:.1f}%) - "
+              f"{self.stats['by_library'][library_key]['added']:,} added")
+    
+    def _import_library_blocks(self, library_key, library_info, genes, batch_size,
+                               block_genes=500, progress=True, start_gene=0, skip=0):
+        """Generate and insert a library in vectorized gene blocks
+
+        Resuming regenerates the block at start_gene and drops its first
+        `skip` guides, which were committed before the interruption.
+        """
+        guides_per_gene = library_info['guides_per_gene']
+        for start in range(start_gene, len(genes), block_genes):
+            # A block consumes the RNG in one go, so checkpoints inside it rewind to its start
+            state = capture_rng(self.rng) if self.checkpoint is not None else None
+            block = self.generate_library_block(genes[start:start + block_genes], library_info)
+            guides = self.block_to_guides(block, library_info)
+            
+            for i in range(skip, len(guides), batch_size):
+                batch = guides[i:i + batch_size]
+                self._record_batch(library_key, *self.insert_guides_batch(batch))
+                self._checkpoint(library_key, start * guides_per_gene + i + len(batch),
+                                 start * guides_per_gene, state)
+            skip = 0
+            
+            done = min(start + block_genes, len(genes))
+            if self.checkpoint is not None:
+                self._checkpoint(library_key, done * guides_per_gene, done * guides_per_gene,
+                                 capture_rng(self.rng))
+            if progress and done % 500 == 0:
+                self._print_progress(library_key, done, len(genes))
+    
+    # ==================== CHECKPOINTS ====================
+    
+    def enable_checkpoint(self, path, resume=False, parallel=False):
+        """Record progress in a checkpoint file; with resume, continue the one already there"""
+        settings = {
+            'mode': 'parallel' if parallel else 'sequential',
+            'batch_mode': self.batch_mode,
+            'seed': self.seed,
+            'batch_size': IMPORT_CONFIG['batch_size'],
+            'shard_genes': IMPORT_CONFIG['shard_genes'] if parallel else None,
+            'libraries': list(self.libraries),
+            'human_genes': len(self.human_genes),
+            'genes_digest': self.gene_table.digest,
+        }
+        self.checkpoint = ImportCheckpoint(path, settings)
+        if resume and self.checkpoint.load():
+            done = sum(record['complete'] for record in self.checkpoint.libraries.values())
+            print(f" Resuming from {path}: {done} librar{'y' if done == 1 else 'ies'} and "
+                  f"{len(self.checkpoint.shards)} shards complete")
+        else:
+            if resume:
+                print(f"  No checkpoint at {path}, starting from the beginning")
+            self.checkpoint.save()  # Replace any checkpoint of an earlier run
+    
+    def _checkpoint(self, library_key, guide, rng_guide, rng_state):
+        """Record committed progress (not while bulk rows are staged, nor after a failed batch)"""
+        if self.checkpoint is None or self.storage.pending_rows:
+            return
+        if self._write_failures() != self._failures_at_start:
+            return  # Resume from the last clean batch; later ones are redone as duplicates
+        self.checkpoint.advance(library_key, guide, rng_guide, rng_state,
+                                self.stats['by_library'][library_key])
+    
+    def _begin_library(self, library_key, library_info):
+        """Pick a library's genes and where to start: (genes, first guide index), or None if already imported"""
+        self._failures_at_start = self._write_failures()
+        record = self.checkpoint.library(library_key) if self.checkpoint is not None else None
+        if record is None:
+            self.stats['by_library'][library_key] = {'added': 0, 'duplicates': 0}
+            if self.checkpoint is None:
+                return self.select_genes(library_info), 0, 0
+            start_rng = capture_rng(self.rng)
+            genes = self.select_genes(library_info)
+            self.checkpoint.start_library(library_key, start_rng, capture_rng(self.rng))
+            return genes, 0, 0
+        
+        # Counts from the interrupted run carry over into the final report
+        self.stats['by_library'][library_key] = {'added': 0, 'duplicates': 0}
+        self._record_batch(library_key, record['added'], record['duplicates'])
+        if record['complete']:
+            restore_rng(self.rng, record['rng'])
+            return None
+        
+        # Same gene selection as before, then the generator state at the last checkpoint
+        restore_rng(self.rng, record['start_rng'])
+        genes = self.select_genes(library_info)
+        restore_rng(self.rng, record['rng'])
+        return genes, record['rng_guide'], record['guide'] - record['rng_guide']
+    
     def import_library(self, library_key):
-        """Import a complete library"""
+        """Import a complete library; False when the checkpoint shows it already imported"""
         library_info = self.libraries[library_key]
         
         print("\n" + "=" * 80)
@@ -289,49 +507,91 @@ class LibraryImporter:
         print(f" Paper: {library_info['paper']}")
         print("=" * 80)
         
-        self.stats['by_library'][library_key] = {'added': 0, 'duplicates': 0}
-        
         guides_batch = []
-        batch_size = 500
-        total_generated = 0
+        batch_size = IMPORT_CONFIG['batch_size']
         guides_per_gene = library_info['guides_per_gene']
         
-        # Use actual human genes
-        genes_to_use = random.sample(self.human_genes, min(library_info['genes'], len(self.human_genes)))
-        
-        for i, gene in enumerate(genes_to_use):
-            # Generate guides for this gene
-            for _ in range(guides_per_gene):
-                guide = self.generate_library_guide(gene, library_info)
+        # Use actual human genes (from the checkpoint position when resuming)
+        selection = self._begin_library(library_key, library_info)
+        if selection is None:
+            print("⏭️  Already imported (checkpoint), skipping")
+            return False
+        genes_to_use, first_guide, skip = selection
+        if first_guide or skip:
+            print(f" Resuming at gene {(first_guide + skip) // guides_per_gene:,} of {len(genes_to_use):,}")
+        
+        if self.batch_mode:
+            self._import_library_blocks(library_key, library_info, genes_to_use, batch_size,
+                                        start_gene=first_guide // guides_per_gene, skip=skip)
+        else:
+            # One flat index over gene x guide, so a checkpoint can fall mid-gene
+            for index in range(first_guide, len(genes_to_use) * guides_per_gene):
+                guide = self.generate_library_guide(genes_to_use[index // guides_per_gene], library_info)
                 guides_batch.append(guide)
-                total_generated += 1
                 
                 if len(guides_batch) >= batch_size:
-                    added, dups = self.insert_guides_batch(guides_batch)
-                    self.stats['by_library'][library_key]['added'] += added
-                    self.stats['by_library'][library_key]['duplicates'] += dups
-                    self.stats['total_added'] += added
-                    self.stats['duplicates'] += dups
+                    self._record_batch(library_key, *self.insert_guides_batch(guides_batch))
                     guides_batch = []
+                    if self.checkpoint is not None:
+                        self._checkpoint(library_key, index + 1, index + 1, capture_rng(self.rng))
+                
+                # Progress indicator
+                genes_done, remainder = divmod(index + 1, guides_per_gene)
+                if not remainder and genes_done % 500 == 0:
+                    self._print_progress(library_key, genes_done, len(genes_to_use))
             
-            # Progress indicator
-            if (i + 1) % 500 == 0:
-                progress = ((i + 1) / len(genes_to_use)) * 100
-                print(f"  Progress: {i+1:,}/{len(genes_to_use):,} genes ({progress:.1f}%) - "
-                      f"{self.stats['by_library'][library_key]['added']:,} added")
-        
-        # Insert remaining
-        if guides_batch:
-            added, dups = self.insert_guides_batch(guides_batch)
-            self.stats['by_library'][library_key]['added'] += added
-            self.stats['by_library'][library_key]['duplicates'] += dups
-            self.stats['total_added'] += added
-            self.stats['duplicates'] += dups
+            # Insert remaining
+            if guides_batch:
+                self._record_batch(library_key, *self.insert_guides_batch(guides_batch))
+        
+        self._record_batch(library_key, *self.storage.flush())
         
         lib_stats = self.stats['by_library'][library_key]
+        if self.checkpoint is not None:
+            failures = self._write_failures() - self._failures_at_start
+            if failures:
+                print(f"⚠️  {failures} failed batch(es): checkpoint kept at the last clean batch "
+                      f"(rerun with --resume)")
+            else:
+                self.checkpoint.complete_library(library_key, capture_rng(self.rng), lib_stats)
         print(f"\n✅ {library_info['name']} COMPLETE!")
         print(f"   Added: {lib_stats['added']:,} guides")
         print(f"   Duplicates: {lib_stats['duplicates']:,}")
+        return True
+    
+    def import_reference(self, fasta_path, workers=0):
+        """Scan a FASTA for NGG protospacers on both strands and insert them as guides"""
+        source = f"Reference scan ({os.path.basename(fasta_path)})"[:100]
+        print("\n" + "=" * 80)
+        print(f" SCANNING: {fasta_path}")
+        print("=" * 80)
+        
+        self.stats['by_library'][source] = {'added': 0, 'duplicates': 0}
+        batch_size = IMPORT_CONFIG['batch_size']
+        # Scanned candidates have no efficiency of their own (a configured model scores them on insert)
+        model = OnTargetModel.from_file() if self.efficiency_model is None else None
+        contig, found = None, 0
+        for chunk in iter_protospacers(fasta_path, workers=workers):
+            if chunk.contig != contig:
+                if contig is not None:
+                    print(f"  {contig}: {found:,} protospacers")
+                contig, found = chunk.contig, 0
+            found += len(chunk.start)
+            
+            guides = protospacer_guides(chunk, source)
+            if model is not None:
+                for guide, efficiency in zip(guides, model.score_codes(chunk.bases).tolist()):
+                    guide['efficiency'] = efficiency
+            for i in range(0, len(guides), batch_size):
+                self._record_batch(source, *self.insert_guides_batch(guides[i:i + batch_size]))
+        if contig is not None:
+            print(f"  {contig}: {found:,} protospacers")
+        
+        self._record_batch(source, *self.storage.flush())
+        lib_stats = self.stats['by_library'][source]
+        print(f"\n✅ {source} COMPLETE!")
+        print(f"   Added: {lib_stats['added']:,} guides")
+        print(f"   Duplicates: {lib_stats['duplicates']:,}")
     
     def print_final_report(self):
         """Print comprehensive report"""
@@ -341,14 +601,10 @@ class LibraryImporter:
         seconds = int(duration % 60)
         
         # Get database stats
-        self.cursor.execute("SELECT COUNT(*) FROM crispr_guides_mega")
-        total_in_db = self.cursor.fetchone()[0]
-        
-        self.cursor.execute("SELECT COUNT(DISTINCT gene_symbol) FROM crispr_guides_mega WHERE gene_symbol != 'UNKNOWN'")
-        unique_genes = self.cursor.fetchone()[0]
-        
-        self.cursor.execute("SELECT AVG(efficiency) FROM crispr_guides_mega")
-        avg_efficiency = self.cursor.fetchone()[0]
+        db_stats = self.storage.table_stats()
+        total_in_db = db_stats['total']
+        unique_genes = db_stats['genes']
+        avg_efficiency = db_stats['avg_efficiency']
         
         print("\n" + "=" * 90)
         print(" LIBRARY IMPORT COMPLETE!")
@@ -362,24 +618,250 @@ class LibraryImporter:
         
         print("\n BY LIBRARY:")
         for lib_key, lib_stats in self.stats['by_library'].items():
-            lib_name = self.libraries[lib_key]['name']
+            lib_name = self.libraries[lib_key]['name'] if lib_key in self.libraries else lib_key
             print(f"   {lib_name}: {lib_stats['added']:,} guides")
         
         print("\n✅ SUCCESS! Database now contains 100,000+ validated CRISPR guides!")
         print("=" * 90)
         
-        self.cursor.close()
-        self.db.close()
+        if self.storage.known_guides is not None:
+            self.storage.known_guides.save()
+        self.storage.close()
+        if self.off_target is not None:
+            self.off_target.close()
+    
+    def build_shards(self, shard_genes):
+        """Split every library into (library_key, genes, seed) shards by gene range"""
+        shards = []
+        for library_key, library_info in self.libraries.items():
+            genes = self.select_genes(library_info)
+            for start in range(0, len(genes), shard_genes):
+                shards.append([library_key, genes[start:start + shard_genes]])
+        
+        # One deterministic child seed per shard, independent of worker scheduling
+        seeds = np.random.SeedSequence(self.seed).spawn(len(shards))
+        return [(key, genes, int(seq.generate_state(1)[0])) for (key, genes), seq in zip(shards, seeds)]
+    
+    def run_parallel(self, workers):
+        """Run complete import across a process pool, sharded by library and gene range"""
+        shards = self.build_shards(IMPORT_CONFIG['shard_genes'])
+        remaining = {}
+        for library_key, _, _ in shards:
+            remaining[library_key] = remaining.get(library_key, 0) + 1
+            self.stats['by_library'][library_key] = {'added': 0, 'duplicates': 0}
+        
+        # Shards finished before an interruption keep their counts and are not redone
+        done = self.checkpoint.completed_shards() if self.checkpoint is not None else []
+        for index in done:
+            record = self.checkpoint.shards[str(index)]
+            self._record_batch(record['library'], record['added'], record['duplicates'])
+            remaining[record['library']] -= 1
+        pending = [index for index in range(len(shards)) if index not in set(done)]
+        
+        print(f"\n Parallel import: {len(pending)} shards across {workers} workers"
+              + (f" ({len(done)} already done)" if done else ""))
+        
+        # spawn: every worker opens its own connection instead of inheriting ours
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(self.bulk_load, self.storage_config,
+                                           {**self.off_target_config, 'workers': 1},
+                                           IMPORT_CONFIG['efficiency_weights'], self.gene_config)) as pool:
+            futures = {
+                pool.submit(_import_shard, *shards[index][:2], shards[index][2], IMPORT_CONFIG['batch_size']): index
+                for index in pending
+            }
+            
+            for future in as_completed(futures):
+                index = futures[future]
+                library_key = shards[index][0]
+                try:
+                    _, gene_count, shard_stats = future.result()
+                    self._record_batch(library_key, shard_stats['added'], shard_stats['duplicates'])
+                    print(f"  Shard done: {library_key} ({gene_count:,} genes) - "
+                          f"{shard_stats['added']:,} added, {shard_stats['duplicates']:,} duplicates")
+                    if shard_stats['failed']:
+                        print(f"⚠️  {shard_stats['failed']} failed batch(es) in shard {index}: "
+                              f"left for --resume")
+                    elif self.checkpoint is not None:
+                        self.checkpoint.complete_shard(index, library_key, shard_stats)
+                except Exception as e:
+                    print(f"❌ Shard failed for {library_key}: {e}")
+                
+                remaining[library_key] -= 1
+                if remaining[library_key] == 0:
+                    lib_stats = self.stats['by_library'][library_key]
+                    print(f"\n✅ {self.libraries[library_key]['name']} COMPLETE!")
+                    print(f"   Added: {lib_stats['added']:,} guides")
+                    print(f"   Duplicates: {lib_stats['duplicates']:,}")
+        
+        self.print_final_report()
     
     def run(self):
         """Run complete import"""
         # Import all libraries
         for library_key in self.libraries.keys():
-            self.import_library(library_key)
-            time.sleep(2)
+            if self.import_library(library_key):
+                time.sleep(2)
         
         self.print_final_report()
 
+# ==================== PARALLEL WORKERS ====================
+
+_worker_importer = None
+
+def _init_worker(bulk_load, storage_config, off_target_config, efficiency_weights, gene_config):
+    """Open one importer (and DB connection) per worker process"""
+    global _worker_importer
+    IMPORT_CONFIG['efficiency_weights'] = efficiency_weights
+    _worker_importer = LibraryImporter(batch_mode=True, verbose=False, bulk_load=bulk_load,
+                                       storage_config=storage_config,
+                                       off_target_config=off_target_config,
+                                       gene_config=gene_config)
+
+def _import_shard(library_key, genes, seed, batch_size):
+    """Generate and insert one gene range of a library"""
+    importer = _worker_importer
+    importer.rng = np.random.default_rng(seed)
+    importer.stats['by_library'][library_key] = {'added': 0, 'duplicates': 0}
+    failures = importer._write_failures()
+    importer._import_library_blocks(library_key, importer.libraries[library_key], genes,
+                                    batch_size, progress=False)
+    importer._record_batch(library_key, *importer.storage.flush())
+    shard_stats = importer.stats['by_library'].pop(library_key)
+    shard_stats['failed'] = importer._write_failures() - failures
+    return library_key, len(genes), shard_stats
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description='Import CRISPR libraries into crispr_guides_mega')
+    parser.add_argument('--batch', action='store_true',
+                        help='generate guides in vectorized NumPy gene blocks')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='RNG seed for reproducible output')
+    parser.add_argument('--workers', type=int, default=IMPORT_CONFIG['workers'],
+                        help='import processes; more than 1 shards libraries by gene range')
+    parser.add_argument('--shard-genes', type=int, default=IMPORT_CONFIG['shard_genes'],
+                        help='genes per parallel shard')
+    parser.add_argument('--bulk', action='store_true',
+                        help='stage rows in a TSV file and merge them with LOAD DATA LOCAL INFILE')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], default=STORAGE_CONFIG['backend'],
+                        help='storage backend for crispr_guides_mega')
+    parser.add_argument('--sqlite-path', default=STORAGE_CONFIG['sqlite_path'],
+                        help='embedded database file for the sqlite backend')
+    parser.add_argument('--sync-from', metavar='SQLITE_PATH',
+                        help='copy guides from a local SQLite file into the configured backend and exit')
+    parser.add_argument('--key-scheme', choices=['md5', 'packed'], default=STORAGE_CONFIG['key_scheme'],
+                        help='dedupe key: md5 guide_hash or 2-bit packed guide_key')
+    parser.add_argument('--known-guides', metavar='PATH', default=STORAGE_CONFIG['known_guides_path'],
+                        help='persisted known-guide filter; known guides are skipped before insert')
+    parser.add_argument('--migrate-keys', action='store_true',
+                        help='add and backfill guide_key with a unique index, then exit')
+    parser.add_argument('--drop-hash-index', action='store_true',
+                        help='with --migrate-keys, drop the guide_hash unique index afterwards')
+    parser.add_argument('--rebuild-stats', action='store_true',
+                        help='recompute the per-gene/source/cell-line summary tables, then exit')
+    parser.add_argument('--reference', metavar='FASTA', default=OFF_TARGET_CONFIG['reference_fasta'],
+                        help='score off-targets against this FASTA (indexed on first use)')
+    parser.add_argument('--max-mismatches', type=int, default=OFF_TARGET_CONFIG['max_mismatches'],
+                        help='mismatches allowed in an off-target site')
+    parser.add_argument('--efficiency-weights', metavar='JSON', default=IMPORT_CONFIG['efficiency_weights'],
+                        help='score efficiency with this on-target model weights file before insert')
+    parser.add_argument('--rescore-efficiency', action='store_true',
+                        help='re-score efficiency of stored guides in streaming chunks, then exit')
+    parser.add_argument('--missing-only', action='store_true',
+                        help='with --rescore-efficiency, only score rows without an efficiency')
+    parser.add_argument('--scan-fasta', metavar='FASTA',
+                        help='insert every NGG protospacer (both strands) of a FASTA instead of the libraries')
+    parser.add_argument('--gene-annotation', metavar='PATH', default=GENE_CONFIG['annotation_path'],
+                        help='HGNC complete-set TSV or GTF (.gz ok) to draw library genes from')
+    parser.add_argument('--checkpoint', metavar='PATH', default=IMPORT_CONFIG['checkpoint_path'],
+                        help="progress file written after every committed batch ('' to disable)")
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted import from its checkpoint (same settings)')
+    args = parser.parse_args()
+    IMPORT_CONFIG['shard_genes'] = args.shard_genes
+    STORAGE_CONFIG['backend'] = args.backend
+    STORAGE_CONFIG['sqlite_path'] = args.sqlite_path
+    STORAGE_CONFIG['key_scheme'] = args.key_scheme
+    STORAGE_CONFIG['known_guides_path'] = args.known_guides
+    IMPORT_CONFIG['efficiency_weights'] = args.efficiency_weights
+    OFF_TARGET_CONFIG['reference_fasta'] = args.reference
+    GENE_CONFIG['annotation_path'] = args.gene_annotation
+    OFF_TARGET_CONFIG['max_mismatches'] = args.max_mismatches
+    
+    if args.migrate_keys:
+        storage = open_storage(STORAGE_CONFIG, DB_CONFIG)
+        backfilled, conflicts = storage.migrate_keys(drop_hash_index=args.drop_hash_index)
+        print(f"✅ guide_key migration complete: {backfilled:,} rows backfilled")
+        if conflicts:
+            print(f"⚠️  {conflicts:,} rows differ from a stored guide only in case and were left "
+                  f"without a guide_key")
+        storage.close()
+        return
+    
+    if args.rebuild_stats:
+        storage = open_storage({**STORAGE_CONFIG, 'summary_tables': True}, DB_CONFIG)
+        counts = storage.rebuild_summaries()
+        for table, rows in counts.items():
+            print(f"✅ {table}: {rows:,} rows")
+        storage.close()
+        return
+    
+    if args.rescore_efficiency:
+        storage = open_storage(STORAGE_CONFIG, DB_CONFIG)
+        model = OnTargetModel.from_file(args.efficiency_weights)
+        started = time.time()
+        updated = rescore_efficiency(
+            storage, model, missing_only=args.missing_only,
+            progress=lambda done, last_id: print(f"  Re-scored {done:,} guides (id {last_id:,})")
+        )
+        elapsed = time.time() - started
+        print(f"✅ Re-scored {updated:,} guides with {model.name} in {elapsed:.1f}s")
+        storage.close()
+        return
+    
+    if args.sync_from:
+        importer = LibraryImporter(verbose=False, bulk_load=args.bulk)
+        source = open_storage({'backend': 'sqlite', 'sqlite_path': args.sync_from}, DB_CONFIG)
+        added, dups = sync_guides(source, importer.storage)
+        print(f"✅ Synced {args.sync_from}: {added:,} added, {dups:,} duplicates")
+        source.close()
+        importer.storage.close()
+        return
+    
+    if args.scan_fasta:
+        importer = LibraryImporter(verbose=False, bulk_load=args.bulk)
+        importer.import_reference(args.scan_fasta, workers=args.workers)
+        importer.print_final_report()
+        return
+    
+    parallel = args.workers > 1
+    seed = args.seed
+    if parallel and args.checkpoint and seed is None:
+        # Shard plans derive from the seed: pin one so a resumed run rebuilds the same shards
+        seed = stored_seed(args.checkpoint) if args.resume else None
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        print(f" Seed: {seed}")
+    
+    importer = LibraryImporter(seed=seed, batch_mode=parallel or args.batch, bulk_load=args.bulk)
+    if args.checkpoint:
+        try:
+            importer.enable_checkpoint(args.checkpoint, resume=args.resume, parallel=parallel)
+        except CheckpointMismatch as e:
+            print(f"❌ Cannot resume: {e}")
+            importer.storage.close()
+            sys.exit(1)
+    elif args.resume:
+        print("❌ --resume needs a checkpoint file (--checkpoint)")
+        sys.exit(1)
+    
+    if parallel:
+        importer.run_parallel(args.workers)
+    else:
+        importer.run()
+
 if __name__ == "__main__":
-    importer = LibraryImporter()
-    importer.run()
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE REFERENCE GENOME
+Memory-mapped access to a local FASTA reference (genome or gene regions):
+- The FASTA is memory-mapped and converted once, in fixed-size chunks,
+  to one byte per base (A=0, C=1, G=2, T=3, anything else=4) in a
+  '<fasta>.codes' sidecar, with contig names and offsets in
+  '<fasta>.contigs.json'. Sequence never passes through Python strings.
+- Contigs are separated by one code-4 byte, so no window spans two contigs
+- Later runs memory-map the sidecar directly (rebuilt if the FASTA changes)
+
+Author: Fazil Firdous
+"""
+
+import os
+import json
+import mmap
+from typing import Dict, List
+
+import numpy as np
+
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate(b'ACGT'):
+    BASE_CODES[_base] = _code
+    BASE_CODES[_base + 32] = _code  # soft-masked lowercase
+INVALID = 4
+SEPARATOR = np.array([INVALID], dtype=np.uint8)
+
+BUILD_CHUNK = 64 * 1024 * 1024  # FASTA bytes converted per step
+_NEWLINES = np.frombuffer(b'\n\r', dtype=np.uint8)
+
+
+class Reference:
+    """A FASTA reference as a memory-mapped uint8 base-code array plus contig table"""
+
+    def __init__(self, fasta_path: str):
+        self.fasta_path = fasta_path
+        self.codes_path = fasta_path + '.codes'
+        self.contigs_path = fasta_path + '.contigs.json'
+        if not self._is_current():
+            self.build()
+
+        with open(self.contigs_path) as f:
+            self.contigs: List[Dict] = json.load(f)['contigs']
+        self.codes = np.memmap(self.codes_path, dtype=np.uint8, mode='r')
+
+    def _is_current(self) -> bool:
+        if not (os.path.exists(self.codes_path) and os.path.exists(self.contigs_path)):
+            return False
+        with open(self.contigs_path) as f:
+            meta = json.load(f)
+        stat = os.stat(self.fasta_path)
+        return meta.get('fasta_size') == stat.st_size and meta.get('fasta_mtime') == stat.st_mtime
+
+    def build(self):
+        """Convert the FASTA to the base-code sidecar, one chunk at a time"""
+        contigs = []
+        offset = 0
+        tmp_path = f'{self.codes_path}.{os.getpid()}.tmp'
+
+        with open(self.fasta_path, 'rb') as fasta, open(tmp_path, 'wb') as out:
+            size = os.fstat(fasta.fileno()).st_size
+            mm = mmap.mmap(fasta.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+            try:
+                pos = mm.find(b'>') if size else -1
+                while pos != -1:
+                    header_end = mm.find(b'\n', pos)
+                    if header_end == -1:
+                        header_end = size
+                    name = bytes(mm[pos + 1:header_end]).decode('ascii', 'replace').split()[0]
+                    seq_end = mm.find(b'\n>', header_end)
+                    seq_end = size if seq_end == -1 else seq_end + 1
+
+                    length = 0
+                    for start in range(header_end + 1, seq_end, BUILD_CHUNK):
+                        stop = min(start + BUILD_CHUNK, seq_end)
+                        raw = np.frombuffer(mm, dtype=np.uint8, count=stop - start, offset=start)
+                        raw = raw[~np.isin(raw, _NEWLINES)]
+                        out.write(BASE_CODES[raw].tobytes())
+                        length += raw.size
+
+                    contigs.append({'name': name, 'offset': offset, 'length': length})
+                    out.write(SEPARATOR.tobytes())
+                    offset += length + 1
+                    pos = seq_end if seq_end < size else -1
+            finally:
+                if size:
+                    mm.close()
+
+        os.replace(tmp_path, self.codes_path)
+        stat = os.stat(self.fasta_path)
+        with open(f'{self.contigs_path}.{os.getpid()}.tmp', 'w') as f:
+            json.dump({'fasta_size': stat.st_size, 'fasta_mtime': stat.st_mtime, 'contigs': contigs}, f)
+        os.replace(f'{self.contigs_path}.{os.getpid()}.tmp', self.contigs_path)
+
+    def __len__(self):
+        return int(self.codes.size)
+
+    def contig(self, name: str) -> np.ndarray:
+        """Memory-mapped view of one contig's base codes"""
+        for contig in self.contigs:
+            if contig['name'] == name:
+                return self.codes[contig['offset']:contig['offset'] + contig['length']]
+        raise KeyError(name)
+
+    def locate(self, positions: np.ndarray):
+        """Map global offsets to (contig index array, offset-within-contig array)"""
+        starts = np.array([contig['offset'] for contig in self.contigs], dtype=np.int64)
+        index = np.searchsorted(starts, positions, side='right') - 1
+        return index, positions - starts[index]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE SCHEDULER
+Timer-heap job scheduler for the monitor's periodic work:
+- Each job has its own interval, optional first-run delay and jitter
+  (0..jitter seconds added to every run, not accumulated)
+- The loop sleeps until the earliest due job (or until stop() / a job
+  finishing wakes it), so an idle monitor costs no wake-ups
+- Every run happens on its own daemon thread: a long or failing scrape
+  cycle never delays heartbeats or health checks
+- Overlap protection: a job still running when it comes due again is
+  skipped for that slot and counted
+- A run that returns False or raises is retried after retry_interval,
+  up to max_retries times in a row, before falling back to the interval
+
+Author: Fazil Firdous
+"""
+
+import time
+import heapq
+import random
+import logging
+import threading
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """One periodic job and its run statistics"""
+
+    def __init__(self, name: str, func: Callable[[], Optional[bool]], interval: float,
+                 jitter: float = 0.0, retry_interval: Optional[float] = None, max_retries: int = 0):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_interval = retry_interval
+        self.max_retries = max_retries
+
+        self.anchor = 0.0       # Nominal start of the current slot (jitter excluded)
+        self.generation = 0     # Bumped on reschedule; older heap entries are stale
+        self.thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.failures = 0
+        self.retries = 0        # Consecutive failed runs retried so far
+        self.skipped = 0
+        self.last_duration = None
+        self.last_result = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def stats(self) -> Dict:
+        return {
+            'interval_s': self.interval,
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped_overlaps': self.skipped,
+            'running': self.running,
+            'last_duration_s': round(self.last_duration, 3) if self.last_duration is not None else None,
+            'last_result': self.last_result,
+        }
+
+
+class Scheduler:
+    """Runs jobs on their own threads when due; run() blocks until stop()"""
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, int, str]] = []  # (due, generation, seq, job name)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self.rng = rng or random.Random()
+
+    def add(self, name: str, func: Callable[[], Optional[bool]], interval: float, delay: Optional[float] = None,
+            jitter: float = 0.0, retry_interval: Optional[float] = None, max_retries: int = 0) -> Job:
+        """Register a job; first run after `delay` seconds (default: one interval)"""
+        job = Job(name, func, interval, jitter, retry_interval, max_retries)
+        with self._lock:
+            self.jobs[name] = job
+            self._schedule(job, time.monotonic() + (interval if delay is None else delay))
+        self._wake.set()
+        return job
+
+    def _schedule(self, job: Job, anchor: float):
+        """Queue the job's next slot (caller holds the lock)"""
+        job.anchor = anchor
+        job.generation += 1
+        due = anchor + (self.rng.uniform(0, job.jitter) if job.jitter else 0.0)
+        self._seq += 1
+        heapq.heappush(self._heap, (due, job.generation, self._seq, job.name))
+
+    def stop(self):
+        """Ask run() to return (safe from signal handlers)"""
+        self._stopping = True
+        self._wake.set()
+
+    def run(self, join_timeout: Optional[float] = None):
+        """Dispatch due jobs until stop(); then wait for running jobs to finish"""
+        while not self._stopping:
+            with self._lock:
+                now = time.monotonic()
+                due_jobs = []
+                while self._heap and self._heap[0][0] <= now:
+                    _, generation, _, name = heapq.heappop(self._heap)
+                    job = self.jobs[name]
+                    if generation == job.generation:
+                        due_jobs.append(job)
+                timeout = self._heap[0][0] - now if self._heap else None
+
+            for job in due_jobs:
+                self._dispatch(job)
+            if due_jobs:
+                continue  # Dispatching took time; re-read the clock
+
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+        self.join(join_timeout)
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for job runs still in progress"""
+        for job in list(self.jobs.values()):
+            if job.running:
+                logger.info(f" Waiting for running job '{job.name}' to finish...")
+                job.thread.join(timeout)
+
+    def _dispatch(self, job: Job):
+        with self._lock:
+            # Next slot on the fixed grid, so a slow run does not push later ones back
+            self._schedule(job, max(job.anchor + job.interval, time.monotonic()))
+            if job.running:
+                job.skipped += 1
+                logger.warning(f"Job '{job.name}' still running, skipping this run")
+                return
+            job.thread = threading.Thread(target=self._run_job, args=(job,), name=f'job-{job.name}', daemon=True)
+        job.thread.start()
+
+    def _run_job(self, job: Job):
+        started = time.monotonic()
+        try:
+            ok = job.func() is not False
+        except Exception as e:
+            logger.error(f"Job '{job.name}' raised: {e}")
+            logger.error(traceback.format_exc())
+            ok = False
+
+        with self._lock:
+            job.runs += 1
+            job.last_duration = time.monotonic() - started
+            job.last_result = 'ok' if ok else 'failed'
+            if ok:
+                job.retries = 0
+            else:
+                job.failures += 1
+                if job.retry_interval is not None and job.retries < job.max_retries and not self._stopping:
+                    job.retries += 1
+                    logger.warning(f"Job '{job.name}' failed, retrying in {job.retry_interval:.0f}s "
+                                   f"(retry {job.retries}/{job.max_retries})")
+                    self._schedule(job, time.monotonic() + job.retry_interval)
+                else:
+                    job.retries = 0
+        self._wake.set()
+
+    def stats(self) -> Dict:
+        """Per-job run counts and seconds until the next run"""
+        with self._lock:
+            now = time.monotonic()
+            next_due = {}
+            for due, generation, _, name in self._heap:
+                if generation == self.jobs[name].generation:
+                    next_due[name] = round(due - now, 1)
+            return {name: {**job.stats(), 'next_run_in_s': next_due.get(name)}
+                    for name, job in self.jobs.items()}
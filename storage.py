@@ -0,0 +1,813 @@
+#!/usr/bin/env python3
+"""
+SCIENCECORE GUIDE STORAGE
+Pluggable storage backends for crispr_guides_mega:
+- MySQLStorage: the remote production database (executemany or staged bulk load)
+- SQLiteStorage: embedded local file tuned for bulk writes (WAL, one
+  transaction per batch, cached prepared statements)
+
+Both backends expose the same insert / dedupe / stats operations, so the
+importer and monitor can run against a local file and sync to MySQL later.
+Dedupe uses either guide_hash (md5) or the packed guide_key (see guide_keys.py).
+
+Author: Fazil Firdous
+"""
+
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bulk_loader import BulkLoader, guide_columns, guide_rows
+from guide_keys import KEY_COLUMNS, pack_guides
+from guide_stats import SUMMARY_KINDS, SUMMARY_TABLES, apply_deltas, rebuild_sql, summary_ddl
+from known_guides import KnownGuideFilter
+
+UPDATE_CHUNK = 1000  # Rows per CASE update or key lookup
+
+_SUMMARIES_READY = set()  # (host, database) whose summary tables were checked this process
+_LOCUS_READY = set()      # (host, database) whose crispr_guides_mega was checked for locus
+
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS crispr_guides_mega (
+        id INTEGER PRIMARY KEY,
+        guide_hash TEXT UNIQUE,
+        guide_key INTEGER,
+        guide_sequence TEXT NOT NULL,
+        gene_symbol TEXT,
+        efficiency REAL,
+        gc_content REAL,
+        off_target_score REAL,
+        validation_status TEXT,
+        source_database TEXT,
+        paper_title TEXT,
+        publication_date TEXT,
+        cell_line TEXT,
+        locus TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_gene ON crispr_guides_mega (gene_symbol)",
+    "CREATE INDEX IF NOT EXISTS idx_efficiency ON crispr_guides_mega (efficiency)",
+    "CREATE INDEX IF NOT EXISTS idx_source ON crispr_guides_mega (source_database)",
+    "CREATE INDEX IF NOT EXISTS idx_created ON crispr_guides_mega (created_at)",
+]
+
+
+class GuideStorage(ABC):
+    """Common interface for guide storage backends"""
+
+    backend = 'base'
+    placeholder = '?'
+
+    def __init__(self, key_scheme: str = 'md5', summaries: bool = False):
+        self.key_scheme = key_scheme
+        self.summaries = summaries
+        self.both_keys = False
+        self.insert_columns = ', '.join(guide_columns(key_scheme))
+        self.known_guides: Optional[KnownGuideFilter] = None
+        self.staged_keys = []
+        self.write_errors = 0
+        self.query_cache = None  # guide_query.QueryCache to invalidate per gene on insert
+        self.staged_genes = set()
+        self.metrics = None      # metrics.Metrics: key, executemany and commit timings
+
+    def _timed(self, name: str):
+        """Duration histogram context for one storage stage (no-op without metrics)"""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.time(name, backend=self.backend)
+
+    def _set_both_keys(self, both_keys: bool):
+        """Write guide_hash and guide_key together, so md5 and packed writers dedupe against each other"""
+        self.both_keys = both_keys
+        self.insert_columns = ', '.join(guide_columns(self.key_scheme, both_keys))
+
+    def _rows(self, guides: List[Dict]) -> List[Tuple]:
+        """Insert rows for a batch, with keys computed in one vectorized pass"""
+        with self._timed('guide_key_batch_seconds'):
+            return guide_rows(guides, self.key_scheme, self.both_keys)
+
+    def _new_rows(self, cursor, rows: List[Tuple]) -> List[Tuple]:
+        """Rows INSERT IGNORE should add: first of any in-batch repeats, key not stored yet
+
+        Only checks the scheme's own key. On MySQL the check is a plain
+        consistent read; _inserted_rows settles rows it got wrong.
+        """
+        first = {}
+        for row in rows:
+            first.setdefault(row[0], row)
+
+        existing = _stored_keys(cursor, self.placeholder, KEY_COLUMNS[self.key_scheme], list(first))
+        return [row for key, row in first.items() if key not in existing]
+
+    def _inserted_rows(self, cursor, new_rows: List[Tuple]) -> List[Tuple]:
+        """The candidate rows this transaction actually inserted
+
+        Needed when a row was ignored on the other scheme's key, or (MySQL)
+        another writer stored it after the check. Under REPEATABLE READ this
+        read sees the snapshot of the _new_rows check plus our own insert,
+        so a key committed in between is visible in neither read.
+        """
+        visible = _stored_keys(cursor, self.placeholder, KEY_COLUMNS[self.key_scheme],
+                              [row[0] for row in new_rows])
+        return [row for row in new_rows if row[0] in visible]
+
+    def _fetchall(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def insert_guides(self, guides: List[Dict]) -> Tuple[int, int]:
+        """Insert (or stage) one batch and commit; returns (added, duplicates)
+
+        With a known-guide filter attached, guides it already knows are
+        counted as duplicates without being sent.
+        """
+        if not guides:
+            return 0, 0
+        if self.known_guides is None:
+            return self._write(guides)
+
+        fresh, keys, known = self.known_guides.split(guides)
+        if self.staging:
+            # Staged keys only become known once their merge succeeds (_merged)
+            self.staged_keys.append(keys)
+        added, dups = self._write(fresh) if fresh else (0, 0)
+        if not self.staging:
+            self.known_guides.add(keys)
+        return added, dups + known
+
+    def _merged(self, ok: bool):
+        """Promote staged keys into the filter after a merge (or drop them if it failed)"""
+        if not ok:
+            self.write_errors += 1
+        else:
+            if self.known_guides is not None:
+                for keys in self.staged_keys:
+                    self.known_guides.add(keys)
+            if self.query_cache is not None:
+                self.query_cache.invalidate_genes(self.staged_genes)
+        self.staged_keys = []
+        self.staged_genes = set()
+
+    def _write(self, guides: List[Dict]) -> Tuple[int, int]:
+        """Write one batch, counting failed writes in write_errors"""
+        genes = {guide['gene'] for guide in guides} if self.query_cache is not None else None
+        if genes is not None and self.staging:
+            # Staged before the write: a merge it triggers invalidates and clears staged_genes
+            self.staged_genes |= genes
+        try:
+            added, dups = self._write_guides(guides)
+        except Exception:
+            self.write_errors += 1
+            if self.metrics is not None:
+                self.metrics.inc('db_write_errors_total', backend=self.backend)
+            raise
+
+        if self.metrics is not None:
+            self.metrics.inc('db_rows_total', added, backend=self.backend, result='added')
+            self.metrics.inc('db_rows_total', dups, backend=self.backend, result='duplicate')
+
+        if genes is not None and not self.staging and added:
+            self.query_cache.invalidate_genes(genes)
+        return added, dups
+
+    @abstractmethod
+    def _write_guides(self, guides: List[Dict]) -> Tuple[int, int]:
+        """Insert one batch (or stage it) and commit; returns (added, duplicates)"""
+
+    @property
+    def staging(self) -> bool:
+        """True when inserts are staged until flush()"""
+        return False
+
+    @property
+    def pending_rows(self) -> int:
+        """Rows staged but not yet merged (committed)"""
+        return 0
+
+    def flush(self) -> Tuple[int, int]:
+        """Write any staged rows; returns (added, duplicates)"""
+        return 0, 0
+
+    def iter_sequences(self, after_id: int = 0, chunk_size: int = 50000) -> Iterator[Tuple[int, List[str]]]:
+        """Yield (last id, guide sequences) chunks for rows with id > after_id"""
+        sql = (
+            "SELECT id, guide_sequence FROM crispr_guides_mega "
+            f"WHERE id > {self.placeholder} ORDER BY id LIMIT {int(chunk_size)}"
+        )
+        while True:
+            cursor = self.conn.cursor()
+            cursor.execute(sql, (after_id,))
+            rows = cursor.fetchall()
+            cursor.close()
+            if not rows:
+                return
+            after_id = rows[-1][0]
+            yield after_id, [row[1] for row in rows]
+
+    def table_stats(self) -> Dict:
+        """Return total guides, unique genes and average efficiency"""
+        if not self.summaries:
+            return self._scan_stats()
+        total, efficiency_sum = self._fetchall(
+            "SELECT COALESCE(SUM(guides), 0), COALESCE(SUM(efficiency_sum), 0) FROM crispr_source_stats"
+        )[0]
+        genes = self._fetchall(
+            "SELECT COUNT(*) FROM crispr_gene_stats WHERE gene_symbol NOT IN ('UNKNOWN', '') AND guides > 0"
+        )[0][0]
+        total = int(total)
+        return {'total': total, 'genes': int(genes),
+                'avg_efficiency': float(efficiency_sum) / total if total else 0.0}
+
+    @abstractmethod
+    def _scan_stats(self) -> Dict:
+        """table_stats() computed by scanning crispr_guides_mega"""
+
+    def summary(self, kind: str = 'gene', names: Optional[List[str]] = None,
+                limit: Optional[int] = None) -> List[Dict]:
+        """Summary rows ('gene', 'source' or 'cell_line'), most guides first"""
+        table = SUMMARY_KINDS[kind]
+        column = SUMMARY_TABLES[table]
+        sql = (f"SELECT {column}, guides, efficiency_sum, max_efficiency, best_off_target, updated_at "
+               f"FROM {table}")
+        params = ()
+        if names:
+            sql += f" WHERE {column} IN ({', '.join([self.placeholder] * len(names))})"
+            params = tuple(names)
+        sql += f" ORDER BY guides DESC, {column}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [{
+            'name': name,
+            'guides': guides,
+            'mean_efficiency': round(float(efficiency_sum) / guides, 2) if guides else None,
+            'max_efficiency': _to_float(max_efficiency),
+            'best_off_target': _to_float(best_off_target),
+            'updated_at': str(updated_at)
+        } for name, guides, efficiency_sum, max_efficiency, best_off_target, updated_at
+            in self._fetchall(sql, params)]
+
+    @abstractmethod
+    def rebuild_summaries(self) -> Dict[str, int]:
+        """Recompute every summary table from crispr_guides_mega; returns rows per table"""
+
+    @abstractmethod
+    def _table_exists(self, table: str) -> bool:
+        """True if the named table exists"""
+
+    def _ensure_summaries(self):
+        """Create missing summary tables, backfilling them from existing guides"""
+        if all(self._table_exists(table) for table in SUMMARY_TABLES):
+            return
+        cursor = self.conn.cursor()
+        try:
+            for statement in summary_ddl(self.backend):
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+        self.rebuild_summaries()
+
+    @abstractmethod
+    def health_check(self) -> Optional[Dict]:
+        """Ping the store; returns total/recent counts, or None if the table is missing"""
+
+    @abstractmethod
+    def ping(self):
+        """Cheapest round trip to the store (raises if it is unreachable)"""
+
+    @abstractmethod
+    def has_table(self) -> bool:
+        """True if crispr_guides_mega exists"""
+
+    @abstractmethod
+    def estimate_rows(self) -> int:
+        """Approximate row count without scanning the table"""
+
+    @abstractmethod
+    def iter_guides(self, chunk_size: int = 5000) -> Iterator[List[Dict]]:
+        """Yield stored guides as guide dicts in id order"""
+
+    @abstractmethod
+    def migrate_keys(self, chunk_size: int = 10000, drop_hash_index: bool = False) -> Tuple[int, int]:
+        """Add and backfill guide_key with its unique index
+
+        Returns (rows backfilled, rows left NULL). Packed keys ignore case,
+        so only the first of several case-only variants gets the key.
+        """
+
+    @abstractmethod
+    def close(self):
+        """Release the connection (pooled connections go back to the pool)"""
+
+
+class MySQLStorage(GuideStorage):
+    """crispr_guides_mega on a MySQL server"""
+
+    backend = 'mysql'
+    placeholder = '%s'
+
+    def __init__(self, db_config: Dict, key_scheme: str = 'md5',
+                 bulk_load: bool = False, bulk_rows: int = 100000, pool=None, summaries: bool = False):
+        super().__init__(key_scheme, summaries)
+        import mysql.connector
+
+        # A pooled connection is checked out here and returned by close()
+        self.pool = pool
+        if pool is not None:
+            self.conn = pool.acquire()
+        elif bulk_load:
+            self.conn = mysql.connector.connect(**db_config, allow_local_infile=True)
+        else:
+            self.conn = mysql.connector.connect(**db_config)
+        self.bulk_loader = None
+        try:
+            if (db_config.get('host'), db_config.get('database')) not in _LOCUS_READY:
+                self._ensure_locus_column()
+                _LOCUS_READY.add((db_config.get('host'), db_config.get('database')))
+            self._set_both_keys(self._has_both_keys())
+            if bulk_load:
+                self.bulk_loader = BulkLoader(self.conn, key_scheme, bulk_rows, summaries, self.both_keys)
+            if summaries:
+                # Summary deltas compare consistent reads of one transaction snapshot
+                cursor = self.conn.cursor()
+                cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.close()
+            if summaries and (db_config.get('host'), db_config.get('database')) not in _SUMMARIES_READY:
+                self._ensure_summaries()
+                _SUMMARIES_READY.add((db_config.get('host'), db_config.get('database')))
+        except Exception:
+            # Hand a pooled connection back (or close our own) before giving up
+            self.close()
+            raise
+
+    @property
+    def staging(self) -> bool:
+        return self.bulk_loader is not None
+
+    @property
+    def pending_rows(self) -> int:
+        if self.bulk_loader is None or self.bulk_loader.stage_file is None:
+            return 0
+        return self.bulk_loader.staged_rows
+
+    def _write_guides(self, guides: List[Dict]) -> Tuple[int, int]:
+        if self.bulk_loader:
+            return self._bulk(self.bulk_loader.add, guides)
+
+        sql = f"""
+            INSERT IGNORE INTO crispr_guides_mega
+            ({self.insert_columns}, created_at, updated_at)
+            VALUES ({', '.join(['%s'] * len(guide_columns(self.key_scheme, self.both_keys)))}, NOW(), NOW())
+        """
+        rows = self._rows(guides)
+        cursor = self.conn.cursor()
+        try:
+            # Summary deltas commit in the same transaction as the rows they count
+            new_rows = self._new_rows(cursor, rows) if self.summaries else None
+            with self._timed('db_executemany_seconds'):
+                cursor.executemany(sql, rows)
+            added = cursor.rowcount
+            if self.summaries:
+                if added < len(new_rows):
+                    # Another writer stored some of these keys since the check, or
+                    # they were ignored on the other key column
+                    new_rows = self._inserted_rows(cursor, new_rows)
+                apply_deltas(cursor, self.backend, self.placeholder, new_rows)
+            with self._timed('db_commit_seconds'):
+                self.conn.commit()
+            return added, len(guides) - added
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def flush(self) -> Tuple[int, int]:
+        if self.bulk_loader:
+            return self._bulk(self.bulk_loader.flush)
+        return 0, 0
+
+    def _bulk(self, operation, *args) -> Tuple[int, int]:
+        """Run a bulk loader call and settle staged keys if it merged"""
+        flushes = self.bulk_loader.flushes
+        result = operation(*args)
+        if self.bulk_loader.flushes != flushes:
+            self._merged(self.bulk_loader.last_error is None)
+        return result
+
+    def _scan_stats(self) -> Dict:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*), AVG(efficiency) FROM crispr_guides_mega")
+            total, avg_efficiency = cursor.fetchone()
+            cursor.execute("""
+                SELECT COUNT(DISTINCT gene_symbol)
+                FROM crispr_guides_mega
+                WHERE gene_symbol != 'UNKNOWN'
+            """)
+            genes = cursor.fetchone()[0]
+            return {'total': total, 'genes': genes, 'avg_efficiency': float(avg_efficiency or 0)}
+        finally:
+            cursor.close()
+
+    def health_check(self) -> Optional[Dict]:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+            cursor.execute("SHOW TABLES LIKE 'crispr_guides_mega'")
+            if not cursor.fetchone():
+                return None
+
+            cursor.execute("SELECT COUNT(*) FROM crispr_guides_mega")
+            total = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM crispr_guides_mega
+                WHERE created_at >= NOW() - INTERVAL 24 HOUR
+            """)
+            recent = cursor.fetchone()[0]
+            return {'total': total, 'recent': recent}
+        finally:
+            cursor.close()
+
+    def ping(self):
+        self.conn.ping(reconnect=False)
+
+    def has_table(self) -> bool:
+        return self._information_schema_rows() is not None
+
+    def estimate_rows(self) -> int:
+        # InnoDB's sampled estimate; may lag by the server's stats expiry
+        return int(self._information_schema_rows() or 0)
+
+    def _information_schema_rows(self) -> Optional[int]:
+        """TABLE_ROWS for crispr_guides_mega (None if the table is missing)"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'crispr_guides_mega'"
+            )
+            row = cursor.fetchone()
+            return None if row is None else (row[0] or 0)
+        finally:
+            cursor.close()
+
+    def iter_guides(self, chunk_size: int = 5000) -> Iterator[List[Dict]]:
+        return _iter_guides(self.conn, self.placeholder, chunk_size)
+
+    def _ensure_locus_column(self):
+        """Tables created before reference scans get the nullable locus column"""
+        if not self.has_table() or self._fetchall(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'crispr_guides_mega' AND COLUMN_NAME = 'locus'"
+        )[0][0]:
+            return
+        cursor = self.conn.cursor()
+        try:
+            # Appending a nullable column is an instant metadata change on MySQL 8
+            cursor.execute("ALTER TABLE crispr_guides_mega ADD COLUMN locus VARCHAR(100) NULL")
+        finally:
+            cursor.close()
+
+    def _table_exists(self, table: str) -> bool:
+        return bool(self._fetchall(
+            "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,)
+        )[0][0])
+
+    def rebuild_summaries(self) -> Dict[str, int]:
+        counts = {}
+        cursor = self.conn.cursor()
+        try:
+            for table in SUMMARY_TABLES:
+                for statement in rebuild_sql(table):
+                    cursor.execute(statement)
+                counts[table] = cursor.rowcount
+            self.conn.commit()
+            return counts
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _has_both_keys(self) -> bool:
+        """md5 writers fill guide_key once it exists; packed writers fill guide_hash while it is unique"""
+        if self.key_scheme == 'md5':
+            return self._has_schema_object('COLUMNS', 'COLUMN_NAME', 'guide_key')
+        return self._has_schema_object('STATISTICS', 'INDEX_NAME', 'guide_hash')
+
+    def _has_schema_object(self, table: str, column: str, name: str) -> bool:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM information_schema.{table} "
+                f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'crispr_guides_mega' "
+                f"AND {column} = %s",
+                (name,)
+            )
+            return cursor.fetchone()[0] > 0
+        finally:
+            cursor.close()
+
+    def migrate_keys(self, chunk_size: int = 10000, drop_hash_index: bool = False) -> Tuple[int, int]:
+        cursor = self.conn.cursor()
+        try:
+            if not self._has_schema_object('COLUMNS', 'COLUMN_NAME', 'guide_key'):
+                cursor.execute("ALTER TABLE crispr_guides_mega ADD COLUMN guide_key BIGINT NULL AFTER guide_hash")
+
+            counts = _backfill_keys(self.conn, self.placeholder, chunk_size)
+
+            if not self._has_schema_object('STATISTICS', 'INDEX_NAME', 'uq_guide_key'):
+                cursor.execute("ALTER TABLE crispr_guides_mega ADD UNIQUE INDEX uq_guide_key (guide_key)")
+            if drop_hash_index and self._has_schema_object('STATISTICS', 'INDEX_NAME', 'guide_hash'):
+                cursor.execute("ALTER TABLE crispr_guides_mega DROP INDEX guide_hash")
+            return counts
+        finally:
+            cursor.close()
+
+    def close(self):
+        if self.bulk_loader:
+            self.bulk_loader.close()
+        if self.pool is None:
+            self.conn.close()
+            return
+        try:
+            self.conn.rollback()
+        except Exception:
+            self.pool.release(self.conn, discard=True)
+        else:
+            self.pool.release(self.conn)
+
+
+class SQLiteStorage(GuideStorage):
+    """crispr_guides_mega in an embedded SQLite file"""
+
+    backend = 'sqlite'
+
+    def __init__(self, path: str, key_scheme: str = 'md5', summaries: bool = False):
+        super().__init__(key_scheme, summaries)
+        self.path = path
+        # Autocommit mode (every batch runs as one explicit transaction); parallel
+        # importers share the file, so wait on the write lock instead of failing.
+        # The monitor hands the connection to its writer thread (one user at a time).
+        self.conn = sqlite3.connect(path, isolation_level=None, cached_statements=256, timeout=60,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+        for statement in SQLITE_SCHEMA:
+            self.conn.execute(statement)
+        self._ensure_key_column()
+        self._ensure_locus_column()
+        # Both key columns always exist here, and the guide_hash autoindex cannot be dropped
+        self._set_both_keys(True)
+        if summaries:
+            self._ensure_summaries()
+
+        placeholders = ', '.join('?' * len(guide_columns(key_scheme, self.both_keys)))
+        self.insert_sql = (
+            f"INSERT OR IGNORE INTO crispr_guides_mega ({self.insert_columns}, created_at, updated_at) "
+            f"VALUES ({placeholders}, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        )
+
+    def _write_guides(self, guides: List[Dict]) -> Tuple[int, int]:
+        rows = self._rows(guides)
+        # IMMEDIATE takes the write lock up front, so the new-row check below stays exact
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            new_rows = self._new_rows(self.conn.cursor(), rows) if self.summaries else None
+            with self._timed('db_executemany_seconds'):
+                added = self.conn.executemany(self.insert_sql, rows).rowcount
+            if self.summaries:
+                if added < len(new_rows):
+                    # Some rows were ignored on the other key column
+                    new_rows = self._inserted_rows(self.conn.cursor(), new_rows)
+                apply_deltas(self.conn.cursor(), self.backend, self.placeholder, new_rows)
+            with self._timed('db_commit_seconds'):
+                self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added, len(guides) - added
+
+    def _scan_stats(self) -> Dict:
+        total, avg_efficiency = self.conn.execute(
+            "SELECT COUNT(*), AVG(efficiency) FROM crispr_guides_mega"
+        ).fetchone()
+        genes = self.conn.execute(
+            "SELECT COUNT(DISTINCT gene_symbol) FROM crispr_guides_mega WHERE gene_symbol != 'UNKNOWN'"
+        ).fetchone()[0]
+        return {'total': total, 'genes': genes, 'avg_efficiency': float(avg_efficiency or 0)}
+
+    def health_check(self) -> Optional[Dict]:
+        self.conn.execute("SELECT 1").fetchone()
+        if not self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'crispr_guides_mega'"
+        ).fetchone():
+            return None
+
+        total = self.conn.execute("SELECT COUNT(*) FROM crispr_guides_mega").fetchone()[0]
+        recent = self.conn.execute(
+            "SELECT COUNT(*) FROM crispr_guides_mega WHERE created_at >= datetime('now', '-24 hours')"
+        ).fetchone()[0]
+        return {'total': total, 'recent': recent}
+
+    def ping(self):
+        self.conn.execute("SELECT 1").fetchone()
+
+    def has_table(self) -> bool:
+        return self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'crispr_guides_mega'"
+        ).fetchone() is not None
+
+    def estimate_rows(self) -> int:
+        # INSERT OR IGNORE never burns ids, so MAX(id) is the row count unless rows were deleted
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM crispr_guides_mega").fetchone()[0]
+
+    def iter_guides(self, chunk_size: int = 5000) -> Iterator[List[Dict]]:
+        return _iter_guides(self.conn, self.placeholder, chunk_size)
+
+    def _table_exists(self, table: str) -> bool:
+        return self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def rebuild_summaries(self) -> Dict[str, int]:
+        counts = {}
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in SUMMARY_TABLES:
+                for statement in rebuild_sql(table):
+                    cursor = self.conn.execute(statement)
+                counts[table] = cursor.rowcount
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return counts
+
+    def _ensure_key_column(self):
+        """Files created before the packed key scheme get the column added (NULL until migrated)"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(crispr_guides_mega)")]
+        if 'guide_key' not in columns:
+            self.conn.execute("ALTER TABLE crispr_guides_mega ADD COLUMN guide_key INTEGER")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_guide_key ON crispr_guides_mega (guide_key)")
+
+    def _ensure_locus_column(self):
+        """Files created before reference scans get the nullable locus column"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(crispr_guides_mega)")]
+        if 'locus' not in columns:
+            self.conn.execute("ALTER TABLE crispr_guides_mega ADD COLUMN locus TEXT")
+
+    def migrate_keys(self, chunk_size: int = 10000, drop_hash_index: bool = False) -> Tuple[int, int]:
+        # The inline UNIQUE on guide_hash is an SQLite autoindex and cannot be
+        # dropped without rebuilding the table, so drop_hash_index is ignored here
+        return _backfill_keys(self.conn, self.placeholder, chunk_size)
+
+    def close(self):
+        self.conn.close()
+
+
+def _to_float(value) -> Optional[float]:
+    """DECIMAL -> float so rows can be written to any backend"""
+    return float(value) if value is not None else None
+
+
+def _iter_guides(conn, placeholder: str, chunk_size: int) -> Iterator[List[Dict]]:
+    """Keyset-paginate crispr_guides_mega on id and yield guide dicts"""
+    sql = (
+        "SELECT id, guide_sequence, gene_symbol, efficiency, gc_content, off_target_score, "
+        "validation_status, source_database, paper_title, publication_date, cell_line, locus "
+        f"FROM crispr_guides_mega WHERE id > {placeholder} ORDER BY id LIMIT {int(chunk_size)}"
+    )
+    last_id = 0
+    while True:
+        cursor = conn.cursor()
+        cursor.execute(sql, (last_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        if not rows:
+            return
+
+        last_id = rows[-1][0]
+        yield [
+            {
+                'sequence': row[1],
+                'gene': row[2],
+                'efficiency': _to_float(row[3]),
+                'gc_content': _to_float(row[4]),
+                'off_target': _to_float(row[5]),
+                'validation': row[6],
+                'source': row[7],
+                'paper_title': row[8],
+                'pub_date': str(row[9]) if row[9] is not None else None,
+                'cell_line': row[10],
+                'locus': row[11]
+            }
+            for row in rows
+        ]
+
+
+def _stored_keys(cursor, placeholder: str, column: str, keys: List) -> set:
+    """The given keys already in crispr_guides_mega.column, looked up UPDATE_CHUNK at a time"""
+    found = set()
+    for start in range(0, len(keys), UPDATE_CHUNK):
+        chunk = keys[start:start + UPDATE_CHUNK]
+        marks = ', '.join([placeholder] * len(chunk))
+        cursor.execute(f"SELECT {column} FROM crispr_guides_mega WHERE {column} IN ({marks})", chunk)
+        found.update(row[0] for row in cursor.fetchall())
+    return found
+
+
+def update_by_id(cursor, placeholder: str, column: str, ids: List[int], values: List,
+                 touch: bool = False):
+    """Set one column per id with CASE updates of UPDATE_CHUNK rows (caller commits)"""
+    for start in range(0, len(ids), UPDATE_CHUNK):
+        chunk = ids[start:start + UPDATE_CHUNK]
+        params = [value for pair in zip(chunk, values[start:start + UPDATE_CHUNK]) for value in pair] + chunk
+        cursor.execute(
+            f"UPDATE crispr_guides_mega SET {column} = CASE id "
+            f"{' '.join([f'WHEN {placeholder} THEN {placeholder}'] * len(chunk))} END"
+            f"{', updated_at = CURRENT_TIMESTAMP' if touch else ''} "
+            f"WHERE id IN ({', '.join([placeholder] * len(chunk))})",
+            params
+        )
+
+
+def _backfill_keys(conn, placeholder: str, chunk_size: int) -> Tuple[int, int]:
+    """Fill guide_key for rows that do not have one yet, one CASE update per chunk
+
+    A row whose packed key is already taken (a case-only variant of a
+    stored guide) is left NULL; returns (rows backfilled, rows left NULL).
+    """
+    select_sql = (
+        "SELECT id, guide_sequence FROM crispr_guides_mega "
+        f"WHERE id > {placeholder} AND guide_key IS NULL ORDER BY id LIMIT {int(chunk_size)}"
+    )
+    backfilled = 0
+    conflicts = 0
+    last_id = 0
+    while True:
+        cursor = conn.cursor()
+        cursor.execute(select_sql, (last_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            cursor.close()
+            return backfilled, conflicts
+
+        keys = pack_guides([row[1] for row in rows]).tolist()
+        taken = _stored_keys(cursor, placeholder, 'guide_key', keys)
+        ids, values = [], []
+        for row, key in zip(rows, keys):
+            if key in taken:
+                conflicts += 1
+                continue
+            taken.add(key)
+            ids.append(row[0])
+            values.append(key)
+        update_by_id(cursor, placeholder, 'guide_key', ids, values)
+        conn.commit()
+        cursor.close()
+
+        backfilled += len(ids)
+        last_id = rows[-1][0]
+
+
+def open_storage(storage_config: Dict, db_config: Dict,
+                 bulk_load: bool = False, bulk_rows: int = 100000, pool=None) -> GuideStorage:
+    """Open the backend selected by storage_config['backend'] (MySQL optionally from a pool)"""
+    backend = storage_config.get('backend', 'mysql')
+    key_scheme = storage_config.get('key_scheme', 'md5')
+    summaries = storage_config.get('summary_tables', False)
+    if key_scheme not in KEY_COLUMNS:
+        raise ValueError(f"Unknown key scheme: {key_scheme}")
+    if backend == 'mysql':
+        return MySQLStorage(db_config, key_scheme, bulk_load=bulk_load, bulk_rows=bulk_rows,
+                            pool=pool, summaries=summaries)
+    if backend == 'sqlite':
+        return SQLiteStorage(storage_config['sqlite_path'], key_scheme, summaries=summaries)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def sync_guides(source: GuideStorage, target: GuideStorage, chunk_size: int = 5000) -> Tuple[int, int]:
+    """Copy every guide from source into target (e.g. a local SQLite file into MySQL)"""
+    total_added = 0
+    total_dups = 0
+    for guides in source.iter_guides(chunk_size):
+        added, dups = target.insert_guides(guides)
+        total_added += added
+        total_dups += dups
+    added, dups = target.flush()
+    return total_added + added, total_dups + dups
@@ -0,0 +1,39 @@
+import pytest
+
+import benchmarks
+
+
+@pytest.fixture(scope='module')
+def ctx(tmp_path_factory):
+    import auto_scrapper
+
+    # Context points the monitor's configs at its workdir; keep that out of other tests
+    with pytest.MonkeyPatch.context() as patch:
+        for name in ('STORAGE_CONFIG', 'HTTP_CACHE_CONFIG', 'METRICS_CONFIG', 'SCRAPE_CONFIG'):
+            patch.setattr(auto_scrapper, name, dict(getattr(auto_scrapper, name)))
+        patch.setattr(auto_scrapper.signal, 'signal', lambda *args: None)
+        context = benchmarks.Context('sqlite', 'md5', str(tmp_path_factory.mktemp('bench')))
+        try:
+            yield context
+        finally:
+            context.monitor.session.close()
+            context.close()
+
+
+@pytest.mark.parametrize('name', list(benchmarks.BENCHMARKS))
+def test_benchmark_runs(ctx, name):
+    result = benchmarks.run_one(ctx, name, 50, rounds=1)
+    assert result['name'] == name
+    assert result['batch_size'] == 50
+    assert result['per_sec'] > 0
+
+
+def test_compare_flags_only_drops_past_the_tolerance():
+    baseline = {'results': [{'name': 'a', 'batch_size': 10, 'per_sec': 100.0},
+                            {'name': 'b', 'batch_size': 10, 'per_sec': 100.0}]}
+    results = [{'name': 'a', 'batch_size': 10, 'per_sec': 80.0},
+               {'name': 'b', 'batch_size': 10, 'per_sec': 90.0},
+               {'name': 'c', 'batch_size': 10, 'per_sec': 1.0}]
+    assert [r['name'] for r in benchmarks.compare(results, baseline, 0.15)] == ['a']
+    assert results[1]['ratio'] == 0.9
+    assert 'ratio' not in results[2]
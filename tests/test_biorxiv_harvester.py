@@ -0,0 +1,222 @@
+import json
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from biorxiv_harvester import HarvestError, iter_biorxiv
+from http_cache import CachedSession
+
+
+class StubBiorxiv:
+    """Local bioRxiv details API serving a fixed record list in cursor pages"""
+
+    def __init__(self, records, page_size=100):
+        self.records = records
+        self.page_size = page_size
+        self.requests = []           # (start, end, cursor) per request, in arrival order
+        self.fail_at = None          # cursor answered with HTTP 500
+        self.on_request = None       # callback(cursor) before a page is served
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                start, end, cursor = self.path.rstrip('/').split('/')[-3:]
+                cursor = int(cursor)
+                stub.requests.append((start, end, cursor))
+                if stub.on_request is not None:
+                    stub.on_request(cursor)
+                if cursor == stub.fail_at:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                page = stub.records[cursor:cursor + stub.page_size]
+                body = json.dumps({
+                    'messages': [{'status': 'ok', 'cursor': cursor, 'count': len(page),
+                                  'total': len(stub.records)}],
+                    'collection': page,
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/details/biorxiv"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def cursors(self):
+        return [cursor for _, _, cursor in self.requests]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def days_ago(days):
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+def make_records(n, crispr_every=3, dates=(days_ago(3), days_ago(2), days_ago(1))):
+    per_date = -(-n // len(dates))
+    return [
+        {
+            'doi': f'10.1101/{i:06d}',
+            'title': f"{'CRISPR screen' if i % crispr_every == 0 else 'Cell biology'} study {i}",
+            'date': dates[i // per_date],
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def stub():
+    server = StubBiorxiv(make_records(250))
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def session():
+    session = CachedSession(None)  # No cache: every page goes to the stub
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_walks_every_page_by_cursor(stub, session, prefetch):
+    stats = {}
+    records = list(iter_biorxiv(session, '2026-10-01', '2026-10-03', base_url=stub.url,
+                                prefetch=prefetch, stats=stats))
+
+    assert records == stub.records
+    assert stats == {'pages': 3, 'records': 250, 'total': 250}
+    assert stub.cursors() == [0, 100, 200]
+    assert {(start, end) for start, end, _ in stub.requests} == {('2026-10-01', '2026-10-03')}
+
+
+def test_empty_window_is_one_request(session):
+    server = StubBiorxiv([])
+    try:
+        stats = {}
+        assert list(iter_biorxiv(session, '2026-10-01', '2026-10-03', base_url=server.url, stats=stats)) == []
+        assert stats == {'pages': 1, 'records': 0, 'total': 0}
+        assert server.cursors() == [0]
+    finally:
+        server.close()
+
+
+def test_prefetch_requests_next_page_before_current_is_consumed(stub, session):
+    second_page = threading.Event()
+    stub.on_request = lambda cursor: second_page.set() if cursor == 100 else None
+
+    records = iter_biorxiv(session, '2026-10-01', '2026-10-03', base_url=stub.url, prefetch=True)
+    assert next(records) == stub.records[0]
+    assert second_page.wait(5)  # Requested while the consumer still holds the first page
+    assert len(list(records)) == 249
+
+
+def test_wait_is_called_after_every_page(stub, session):
+    responses = []
+    list(iter_biorxiv(session, '2026-10-01', '2026-10-03', base_url=stub.url, wait=responses.append))
+    assert [response.status_code for response in responses] == [200, 200, 200]
+
+
+def test_cancel_stops_without_error(stub, session):
+    cancel = threading.Event()
+    stats = {}
+    seen = 0
+    for _ in iter_biorxiv(session, '2026-10-01', '2026-10-03', base_url=stub.url,
+                          cancel=cancel, stats=stats):
+        seen += 1
+        if seen == 150:
+            cancel.set()
+
+    assert seen == 150
+    assert stats['records'] == 150 < stats['total']
+    assert 200 not in stub.cursors()
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_failed_page_raises_after_earlier_records(stub, session, prefetch):
+    stub.fail_at = 100
+    seen = []
+    with pytest.raises(HarvestError, match='HTTP 500 at cursor 100'):
+        for record in iter_biorxiv(session, '2026-10-01', '2026-10-03', base_url=stub.url,
+                                   prefetch=prefetch):
+            seen.append(record)
+    assert seen == stub.records[:100]
+
+
+# ==================== MONITOR WATERMARK ====================
+
+@pytest.fixture
+def monitor_factory(tmp_path, stub, monkeypatch):
+    import auto_scrapper
+
+    monkeypatch.setitem(auto_scrapper.SCRAPE_CONFIG, 'biorxiv_url', stub.url)
+    monkeypatch.setitem(auto_scrapper.SCRAPE_CONFIG, 'state_file', str(tmp_path / 'watermarks.json'))
+    monkeypatch.setitem(auto_scrapper.SCRAPE_CONFIG, 'rate_limit_delay', 0)
+    monkeypatch.setitem(auto_scrapper.HTTP_CACHE_CONFIG, 'enabled', False)
+    monkeypatch.setitem(auto_scrapper.METRICS_CONFIG, 'enabled', False)
+    monkeypatch.setattr(auto_scrapper.signal, 'signal', lambda *args: None)
+
+    monitors = []
+
+    def factory():
+        monitor = auto_scrapper.CRISPRMonitor()
+        monitors.append(monitor)
+        return monitor
+
+    yield factory
+    for monitor in monitors:
+        monitor.session.close()
+
+
+def test_watermark_resumes_from_last_date_and_skips_boundary_dois(stub, monitor_factory):
+    monitor = monitor_factory()
+    guides = monitor._run_source('BIORXIV', monitor.cancel_events['BIORXIV'])
+
+    crispr = [record for record in stub.records if 'CRISPR' in record['title']]
+    assert len(guides) == 5 * len(crispr)
+    last_date = stub.records[-1]['date']
+    assert monitor.pending_watermarks['BIORXIV'] == {
+        'last_date': last_date,
+        'boundary_dois': sorted(r['doi'] for r in stub.records if r['date'] == last_date),
+    }
+    monitor._commit_watermarks()
+
+    # The next run starts at the persisted date; only DOIs new on that date count
+    stub.records = [r for r in stub.records if r['date'] == last_date] + [
+        {'doi': '10.1101/new-1', 'title': 'CRISPR base editing', 'date': last_date},
+        {'doi': '10.1101/new-2', 'title': 'CRISPR prime editing', 'date': days_ago(0)},
+    ]
+    stub.requests.clear()
+    resumed = monitor_factory()
+    guides = resumed._run_source('BIORXIV', resumed.cancel_events['BIORXIV'])
+
+    assert stub.requests[0][0] == last_date
+    assert len(guides) == 5 * 2
+    assert resumed.pending_watermarks['BIORXIV'] == {'last_date': days_ago(0),
+                                                     'boundary_dois': ['10.1101/new-2']}
+
+
+def test_partly_read_window_keeps_the_old_watermark(stub, monitor_factory):
+    monitor = monitor_factory()
+    cancel = monitor.cancel_events['BIORXIV']
+    stub.on_request = lambda cursor: cancel.set() if cursor == 100 else None
+
+    monitor._run_source('BIORXIV', cancel)
+    assert 'BIORXIV' not in monitor.pending_watermarks
+
+    stub.on_request = None
+    stub.fail_at = 200
+    failing = monitor_factory()
+    failing._run_source('BIORXIV', failing.cancel_events['BIORXIV'])
+    assert 'BIORXIV' not in failing.pending_watermarks
@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+
+from guide_keys import (MAX_PACKED_LENGTH, batch_keys, guide_key, md5_key, pack_guides,
+                        pack_matrix, packed_key, unpack_key)
+
+
+def random_sequences(n, lengths=range(1, MAX_PACKED_LENGTH + 1), seed=7):
+    rng = random.Random(seed)
+    return [''.join(rng.choices('ACGT', k=rng.choice(lengths))) for _ in range(n)]
+
+
+def test_packed_keys_round_trip():
+    sequences = random_sequences(2000)
+    for sequence, key in zip(sequences, pack_guides(sequences).tolist()):
+        assert key >= 0
+        assert key == packed_key(sequence)
+        assert unpack_key(key) == sequence
+
+
+def test_length_is_part_of_the_key():
+    # Leading A's pack to zero bits; the length field keeps these apart
+    keys = pack_guides(['A', 'AA', 'AAA', 'C', 'AC'])
+    assert len(set(keys.tolist())) == 5
+    assert [unpack_key(key) for key in keys.tolist()] == ['A', 'AA', 'AAA', 'C', 'AC']
+
+
+def test_lowercase_packs_like_uppercase():
+    assert pack_guides(['acgt', 'ACGT']).tolist() == [packed_key('ACGT')] * 2
+
+
+@pytest.mark.parametrize('sequence', ['ACGTN', 'A' * (MAX_PACKED_LENGTH + 1), '', 'ACGU'])
+def test_unpackable_sequences_get_negative_hash_keys(sequence):
+    key = pack_guides([sequence])[0]
+    assert key < 0
+    assert key == packed_key(sequence)
+    assert unpack_key(int(key)) is None
+
+
+def test_mixed_batch_matches_scalar_keys():
+    sequences = random_sequences(300, lengths=range(18, 24)) + ['NNNN', 'G' * 30, 'acgtacgt']
+    random.Random(3).shuffle(sequences)
+    assert batch_keys(sequences) == [packed_key(sequence) for sequence in sequences]
+    assert batch_keys(sequences, 'md5') == [md5_key(sequence) for sequence in sequences]
+    assert guide_key(sequences[0], 'md5') == md5_key(sequences[0])
+
+
+def test_pack_matrix_matches_pack_guides():
+    sequences = random_sequences(500, lengths=[20])
+    codes = np.frombuffer(''.join(sequences).encode(), dtype=np.uint8).reshape(-1, 20)
+    assert np.array_equal(pack_matrix(codes), pack_guides(sequences))
+
+    with pytest.raises(ValueError):
+        pack_matrix(np.frombuffer(b'ACGN', dtype=np.uint8).reshape(1, 4))
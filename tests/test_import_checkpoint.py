@@ -0,0 +1,107 @@
+import json
+import sqlite3
+
+import pytest
+
+import onetime_scrapper
+from import_checkpoint import CheckpointMismatch
+from onetime_scrapper import LibraryImporter
+
+LIBRARY = 'TKOV3'
+GENES = 60  # 240 guides at 4 per gene
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setitem(onetime_scrapper.IMPORT_CONFIG, 'batch_size', 25)
+
+
+def make_importer(db_path, batch_mode, seed=1234):
+    storage_config = {'backend': 'sqlite', 'sqlite_path': str(db_path), 'key_scheme': 'packed',
+                      'known_guides_path': None, 'summary_tables': False}
+    importer = LibraryImporter(seed=seed, batch_mode=batch_mode, verbose=False,
+                               storage_config=storage_config)
+    importer.libraries = {LIBRARY: {**importer.libraries[LIBRARY], 'genes': GENES}}
+    return importer
+
+
+def stored_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT guide_sequence, gene_symbol, efficiency, gc_content, off_target_score, "
+            "validation_status, source_database, paper_title, publication_date, cell_line "
+            "FROM crispr_guides_mega ORDER BY guide_sequence"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def run_to_completion(importer):
+    try:
+        importer.import_library(LIBRARY)
+        return importer.stats['by_library'][LIBRARY]
+    finally:
+        importer.storage.close()
+
+
+def interrupt_after(importer, batches):
+    """Make the importer's storage raise KeyboardInterrupt on its (batches + 1)th insert"""
+    insert = importer.storage.insert_guides
+    calls = []
+
+    def interrupted(guides):
+        calls.append(len(guides))
+        if len(calls) > batches:
+            raise KeyboardInterrupt
+        return insert(guides)
+
+    importer.storage.insert_guides = interrupted
+
+
+@pytest.mark.parametrize('batch_mode', [False, True])
+@pytest.mark.parametrize('batches', [1, 4, 9])
+def test_resumed_import_matches_uninterrupted_run(tmp_path, batch_mode, batches):
+    reference = make_importer(tmp_path / 'reference.db', batch_mode)
+    reference.enable_checkpoint(str(tmp_path / 'reference.json'))
+    expected = run_to_completion(reference)
+
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    interrupted = make_importer(tmp_path / 'resumed.db', batch_mode)
+    interrupted.enable_checkpoint(checkpoint)
+    interrupt_after(interrupted, batches)
+    with pytest.raises(KeyboardInterrupt):
+        run_to_completion(interrupted)
+    with open(checkpoint) as f:
+        assert json.load(f)['libraries'][LIBRARY]['guide'] == batches * 25
+
+    resumed = make_importer(tmp_path / 'resumed.db', batch_mode)
+    resumed.enable_checkpoint(checkpoint, resume=True)
+    stats = run_to_completion(resumed)
+
+    assert stored_rows(tmp_path / 'resumed.db') == stored_rows(tmp_path / 'reference.db')
+    assert stats == expected
+    with open(checkpoint) as f:
+        assert json.load(f)['libraries'][LIBRARY]['complete']
+
+    # A completed library is skipped on the next resume
+    again = make_importer(tmp_path / 'resumed.db', batch_mode)
+    again.enable_checkpoint(checkpoint, resume=True)
+    try:
+        assert again.import_library(LIBRARY) is False
+    finally:
+        again.storage.close()
+
+
+def test_resume_with_different_settings_is_refused(tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    importer = make_importer(tmp_path / 'guides.db', False)
+    importer.enable_checkpoint(checkpoint)
+    importer.storage.close()
+
+    other = make_importer(tmp_path / 'guides.db', False, seed=99)
+    try:
+        with pytest.raises(CheckpointMismatch, match='seed'):
+            other.enable_checkpoint(checkpoint, resume=True)
+    finally:
+        other.storage.close()
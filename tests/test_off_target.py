@@ -0,0 +1,118 @@
+import random
+
+import numpy as np
+import pytest
+
+import off_target
+from off_target import MIT_WEIGHTS, OffTargetEngine
+
+COMPLEMENT = str.maketrans('ACGT', 'TGCA')
+
+
+def reverse_complement(sequence):
+    return sequence.translate(COMPLEMENT)[::-1]
+
+
+def mutate(rng, sequence, mismatches):
+    bases = list(sequence)
+    for position in rng.sample(range(len(bases)), mismatches):
+        bases[position] = rng.choice([b for b in 'ACGT' if b != bases[position]])
+    return ''.join(bases)
+
+
+def brute_force_sites(contigs):
+    """Every NGG protospacer on both strands, straight from the contig strings"""
+    sites = []
+    for sequence in contigs.values():
+        for i in range(len(sequence) - 22):
+            window = sequence[i:i + 23]
+            if window[21:] == 'GG' and 'N' not in window[:21]:
+                sites.append(window[:20])
+            if window[:2] == 'CC' and 'N' not in window[2:]:
+                sites.append(reverse_complement(window[3:]))
+    return sites
+
+
+def mit_hit_score(mismatched):
+    """Scalar MIT hit score from the mismatched protospacer positions (5' first)"""
+    if not mismatched:
+        return 100.0
+    score1 = float(np.prod([1 - MIT_WEIGHTS[p] for p in mismatched]))
+    n = len(mismatched)
+    mean_distance = (mismatched[-1] - mismatched[0]) / (n - 1) if n > 1 else 0
+    score2 = 1.0 / (((19 - mean_distance) / 19) * 4 + 1) if n > 1 else 1.0
+    return score1 * score2 / n ** 2 * 100
+
+
+def brute_force_scores(guides, sites, max_mismatches):
+    scores, hit_counts = [], []
+    for guide in guides:
+        total, hits, own = 0.0, 0, False
+        for site in sites:
+            mismatched = [p for p in range(20) if guide[p] != site[p]]
+            if len(mismatched) > max_mismatches:
+                continue
+            hits += 1
+            if not mismatched and not own:
+                own = True  # The guide's own site is excluded once
+                continue
+            total += mit_hit_score(mismatched)
+        scores.append(round(100.0 - 100.0 * 100.0 / (100.0 + total), 2))
+        hit_counts.append(hits)
+    return scores, hit_counts
+
+
+@pytest.fixture(scope='module')
+def reference(tmp_path_factory):
+    rng = random.Random(11)
+    motifs = [''.join(rng.choices('ACGT', k=20)) for _ in range(6)]
+    contigs = {}
+    for name in ('chr1', 'chr2'):
+        parts = []
+        for _ in range(120):
+            parts.append(''.join(rng.choices('ACGT', k=rng.randint(20, 120))))
+            # Near-copies of a few motifs make multi-mismatch off-targets
+            motif = mutate(rng, rng.choice(motifs), rng.randint(0, 3)) + rng.choice('ACGT') + 'GG'
+            parts.append(motif if rng.random() < 0.5 else reverse_complement(motif))
+        parts.insert(50, 'N' * 30)
+        contigs[name] = ''.join(parts)
+
+    path = tmp_path_factory.mktemp('reference') / 'ref.fa'
+    with open(path, 'w') as f:
+        for name, sequence in contigs.items():
+            f.write(f'>{name}\n')
+            f.writelines(sequence[i:i + 60] + '\n' for i in range(0, len(sequence), 60))
+
+    sites = brute_force_sites(contigs)
+    guides = (motifs + rng.sample(sites, 40)
+              + [mutate(rng, rng.choice(motifs), k) for k in (1, 2, 3, 4) for _ in range(5)]
+              + [''.join(rng.choices('ACGT', k=20)) for _ in range(10)])
+    return str(path), sites, guides
+
+
+@pytest.mark.parametrize('max_mismatches', [2, 3])
+@pytest.mark.parametrize('chunk', [off_target.CANDIDATE_CHUNK, 1000, 7])
+def test_scores_match_brute_force(reference, monkeypatch, max_mismatches, chunk):
+    path, sites, guides = reference
+    monkeypatch.setattr(off_target, 'CANDIDATE_CHUNK', chunk)
+    engine = OffTargetEngine(path, max_mismatches, workers=1)
+    try:
+        expected, hit_counts = brute_force_scores(guides, sites, max_mismatches)
+        assert engine.index.site_codes.size == len(sites)
+        assert engine.score_guides(guides) == pytest.approx(expected, abs=0.011)
+
+        guide_idx, _, _ = engine.index.hits(off_target.pack_guides(guides) & off_target._PAYLOAD)
+        assert np.bincount(guide_idx, minlength=len(guides)).tolist() == hit_counts
+    finally:
+        engine.close()
+
+
+def test_only_20nt_acgt_guides_are_scored(reference):
+    path, _, guides = reference
+    engine = OffTargetEngine(path, 2, workers=1)
+    try:
+        scores = engine.score_guides([guides[0], guides[0][:19], guides[0][:19] + 'N', guides[0] + 'A'])
+        assert scores[0] is not None
+        assert scores[1:] == [None, None, None]
+    finally:
+        engine.close()
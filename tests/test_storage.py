@@ -0,0 +1,105 @@
+import hashlib
+
+import pytest
+
+from storage import SQLiteStorage
+
+GUIDE = 'ACGTACGTACGTACGTACGG'
+
+
+def guide(sequence, gene='TP53'):
+    return {'sequence': sequence, 'gene': gene, 'efficiency': 90.0, 'gc_content': 50.0,
+            'off_target': 1.0, 'validation': 'predicted', 'source': 'test'}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'guides.db')
+
+
+def open_pair(db_path):
+    return SQLiteStorage(db_path, 'md5', summaries=True), SQLiteStorage(db_path, 'packed', summaries=True)
+
+
+@pytest.mark.parametrize('first', ['md5', 'packed'])
+def test_md5_and_packed_writers_dedupe_against_each_other(db_path, first):
+    md5, packed = open_pair(db_path)
+    writers = [md5, packed] if first == 'md5' else [packed, md5]
+    try:
+        assert writers[0].insert_guides([guide(GUIDE)]) == (1, 0)
+        assert writers[1].insert_guides([guide(GUIDE)]) == (0, 1)
+        assert md5.conn.execute(
+            "SELECT COUNT(*), COUNT(guide_hash), COUNT(guide_key) FROM crispr_guides_mega"
+        ).fetchone() == (1, 1, 1)
+        assert md5.summary('source')[0]['guides'] == 1
+    finally:
+        md5.close()
+        packed.close()
+
+
+def test_case_variant_counts_as_duplicate_and_not_in_summaries(db_path):
+    storage = SQLiteStorage(db_path, 'md5', summaries=True)
+    try:
+        assert storage.insert_guides([guide(GUIDE), guide(GUIDE.lower()), guide('GG' + GUIDE[2:])]) == (2, 1)
+        assert storage.summary('gene')[0]['guides'] == 2
+    finally:
+        storage.close()
+
+
+def test_migration_leaves_case_only_variants_without_a_key(db_path):
+    storage = SQLiteStorage(db_path, 'md5')
+    try:
+        # Rows written before the guide_key column was filled
+        sequences = [GUIDE, GUIDE.lower(), 'GGGGACGTACGTACGTACGT', 'AcGTACGTACGTACGTACGG']
+        storage.conn.executemany(
+            "INSERT INTO crispr_guides_mega (guide_hash, guide_sequence) VALUES (?, ?)",
+            [(hashlib.md5(sequence.encode()).hexdigest(), sequence) for sequence in sequences]
+        )
+        assert storage.migrate_keys(chunk_size=2) == (2, 2)
+        assert storage.conn.execute(
+            "SELECT guide_sequence FROM crispr_guides_mega WHERE guide_key IS NOT NULL ORDER BY id"
+        ).fetchall() == [(GUIDE,), ('GGGGACGTACGTACGTACGT',)]
+        assert storage.migrate_keys() == (0, 2)
+    finally:
+        storage.close()
+
+
+class RecordingCache:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate_genes(self, genes):
+        self.invalidated.append(set(genes))
+
+
+class MergeOnWriteStorage(SQLiteStorage):
+    """Stages like the bulk loader and merges inside the write that fills the stage"""
+
+    staging = True
+
+    def _write_guides(self, guides):
+        result = super()._write_guides(guides)
+        self._merged(True)
+        return result
+
+
+def test_merge_inside_a_write_invalidates_that_batchs_genes(db_path):
+    storage = MergeOnWriteStorage(db_path)
+    storage.query_cache = RecordingCache()
+    try:
+        storage.insert_guides([guide(GUIDE, 'TP53'), guide('GG' + GUIDE[2:], 'KRAS')])
+        assert storage.query_cache.invalidated == [{'TP53', 'KRAS'}]
+        assert storage.staged_genes == set()
+    finally:
+        storage.close()
+
+
+def test_backend_missing_an_override_fails_at_construction():
+    from storage import GuideStorage
+
+    class Incomplete(GuideStorage):
+        def _write_guides(self, guides):
+            return 0, 0
+
+    with pytest.raises(TypeError, match='abstract'):
+        Incomplete()